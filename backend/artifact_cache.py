@@ -0,0 +1,281 @@
+"""
+Shared cache of rendered book artifacts (PDF, DOCX, Markdown)
+Artifacts are keyed by book_id, format and a version hash of the book data
+and kept in an object storage backend under ``outputs/``. Their state lives
+in db.artifacts, so every worker process sees the same cache: a render is
+claimed with a lease and done at most once per key across workers (waiters
+poll until it is ready), and artifacts are evicted least recently used
+beyond a storage quota, tracked as a running total so checking it costs one
+read however many artifacts are stored.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import uuid
+from concurrent.futures import Executor
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from pymongo.errors import DuplicateKeyError
+
+from document_generator import DocumentGenerator
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+RENDER_LEASE_SECONDS = float(os.environ.get('ARTIFACT_RENDER_LEASE_SECONDS', '300'))
+RENDER_POLL_INTERVAL = float(os.environ.get('ARTIFACT_RENDER_POLL_INTERVAL', '0.25'))
+
+# Formats rendered as soon as a book is saved (empty disables pre-rendering)
+PRERENDER_FORMATS = [f for f in os.environ.get('PRERENDER_FORMATS', 'pdf,docx,md').split(',') if f]
+
+RENDERERS = {
+    "md": DocumentGenerator.generate_markdown,
+    "docx": DocumentGenerator.generate_docx,
+    "pdf": DocumentGenerator.generate_pdf,
+}
+
+
+RENDER_SECONDS = Histogram(
+    "render_duration_seconds",
+    "Time to render one book export",
+    ["format", "mode"]
+)
+
+
+# Artifact states as stored in db.artifacts.status
+RENDERING = "rendering"
+READY = "ready"
+
+# Record holding the total size of all ready artifacts
+TOTAL_KEY = "_total"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def data_version(book_data: Dict) -> str:
+    """Stable short hash of the book content; changes whenever the data does"""
+    encoded = json.dumps(book_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class ArtifactCache:
+    def __init__(
+        self,
+        storage,
+        collection,
+        scratch_dir: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        executor: Optional[Executor] = None,
+        lease_seconds: float = RENDER_LEASE_SECONDS,
+        poll_interval: float = RENDER_POLL_INTERVAL
+    ):
+        self.storage = storage
+        self.collection = collection
+        self.scratch_dir = scratch_dir  # renders are written here, then moved to storage
+        self.max_bytes = max_bytes
+        self.executor = executor  # None renders in the default thread pool
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = uuid.uuid4().hex
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index([("book_id", 1), ("version", 1)])
+        await self.collection.create_index([("status", 1), ("last_used_at", 1)])
+        await self.reconcile_total()
+
+    async def reconcile_total(self):
+        """Recompute the running size total from the artifact records"""
+        total = 0
+        async for row in self.collection.aggregate([
+            {"$match": {"status": READY}},
+            {"$group": {"_id": None, "size": {"$sum": "$size"}}}
+        ]):
+            total = row["size"]
+        await self.collection.update_one({"key": TOTAL_KEY}, {"$set": {"size": total}}, upsert=True)
+        return total
+
+    async def total_size(self) -> int:
+        doc = await self.collection.find_one({"key": TOTAL_KEY}, {"_id": 0, "size": 1})
+        return doc["size"] if doc else 0
+
+    async def _add_to_total(self, size: int):
+        await self.collection.update_one({"key": TOTAL_KEY}, {"$inc": {"size": size}}, upsert=True)
+
+    @staticmethod
+    def etag(fmt: str, version: str) -> str:
+        return f'"{version}-{fmt}"'
+
+    @staticmethod
+    def key_for(book_id: str, fmt: str, version: str) -> str:
+        return f"outputs/bollywood_cloud_book_{book_id}_{version}.{fmt}"
+
+    async def cached(self, book_id: str, fmt: str, version: str) -> Optional[Dict]:
+        """Record (key, size) of an already rendered artifact, marking it recently used"""
+        return await self.collection.find_one_and_update(
+            {"key": self.key_for(book_id, fmt, version), "status": READY},
+            {"$set": {"last_used_at": _now()}},
+            projection={"_id": 0, "key": 1, "size": 1}
+        )
+
+    async def ready_formats(self, book_id: str, version: str) -> List[str]:
+        """Formats already rendered for this book version"""
+        ready = set()
+        async for doc in self.collection.find(
+            {"book_id": book_id, "version": version, "status": READY},
+            {"_id": 0, "format": 1}
+        ):
+            ready.add(doc["format"])
+        return [fmt for fmt in RENDERERS if fmt in ready]
+
+    def prerender(self, book_id: str, version: str, book_data: Dict, formats: List[str] = PRERENDER_FORMATS):
+        """Render formats in the background, in parallel, so downloads find them in storage"""
+        for fmt in formats:
+            task = asyncio.create_task(self._prerender_one(book_id, fmt, version, book_data))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _prerender_one(self, book_id: str, fmt: str, version: str, book_data: Dict):
+        try:
+            await self.get_or_render(book_id, fmt, version, book_data)
+        except Exception as e:
+            # The download path will retry the render on demand
+            logger.warning(f"Pre-rendering {fmt} for book {book_id} failed: {str(e)}")
+
+    async def get_or_render(self, book_id: str, fmt: str, version: str, book_data: Dict) -> Dict:
+        """Return the artifact record, rendering it once even under concurrent requests"""
+        doc = await self.cached(book_id, fmt, version)
+        if doc is not None:
+            return doc
+
+        # Requests in this process share one wait; other processes coordinate through the lease
+        key = self.key_for(book_id, fmt, version)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            doc = await self._claim_or_wait(book_id, fmt, version, book_data)
+            future.set_result(doc)
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a render nobody else waited on doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        return doc
+
+    async def _claim(self, key: str) -> bool:
+        """Take the render lease of a key that is neither ready nor being rendered"""
+        now = _now()
+        try:
+            # Matches only an expired lease; otherwise the upsert inserts, which the
+            # unique key rejects while a ready artifact or a live lease exists
+            await self.collection.update_one(
+                {"key": key, "status": RENDERING, "lease_expires_at": {"$lt": now}},
+                {"$set": {
+                    "status": RENDERING,
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def _claim_or_wait(self, book_id: str, fmt: str, version: str, book_data: Dict) -> Dict:
+        key = self.key_for(book_id, fmt, version)
+        while True:
+            if await self._claim(key):
+                return await self._render(book_id, fmt, version, book_data)
+            doc = await self.cached(book_id, fmt, version)
+            if doc is not None:
+                return doc
+            await asyncio.sleep(self.poll_interval)
+
+    async def _render(self, book_id: str, fmt: str, version: str, book_data: Dict) -> Dict:
+        key = self.key_for(book_id, fmt, version)
+        try:
+            size = await asyncio.to_thread(self.storage.size, key)
+            if size is None:
+                size = await self._render_to_storage(key, fmt, book_data)
+                logger.info(f"Rendered {fmt} for book {book_id} ({version})")
+            # else: rendered before its record was written (or before db.artifacts existed)
+            result = await self.collection.update_one(
+                {"key": key, "worker_id": self.worker_id},
+                {
+                    "$set": {
+                        "book_id": book_id,
+                        "format": fmt,
+                        "version": version,
+                        "status": READY,
+                        "size": size,
+                        "last_used_at": _now()
+                    },
+                    "$unset": {"worker_id": "", "lease_expires_at": ""}
+                }
+            )
+        except BaseException:
+            # Let the next request (in any worker) try again
+            await asyncio.shield(self.collection.delete_one({"key": key, "worker_id": self.worker_id}))
+            raise
+
+        # Not counted when the lease expired and another worker took the key over
+        if result.matched_count:
+            await self._add_to_total(size)
+        await self.evict(keep=key)
+        return {"key": key, "size": size}
+
+    async def _render_to_storage(self, key: str, fmt: str, book_data: Dict) -> int:
+        fd, temp_name = tempfile.mkstemp(suffix=f".{fmt}", dir=self.scratch_dir)
+        os.close(fd)
+        temp_path = Path(temp_name)
+        loop = asyncio.get_running_loop()
+        try:
+            with RENDER_SECONDS.time(format=fmt, mode="cached"):
+                await loop.run_in_executor(self.executor, RENDERERS[fmt], book_data, temp_name)
+            size = temp_path.stat().st_size
+            await asyncio.to_thread(self.storage.put_file, key, temp_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return size
+
+    async def evict(self, keep: Optional[str] = None):
+        """Delete least recently used artifacts until the cache fits its quota"""
+        excess = await self.total_size() - self.max_bytes
+        if excess <= 0:
+            return
+
+        # Oldest first, reading only as many records as have to go
+        async for doc in self.collection.find(
+            {"status": READY, "key": {"$ne": keep}}, {"_id": 0, "key": 1, "size": 1, "last_used_at": 1}
+        ).sort("last_used_at", 1):
+            if excess <= 0:
+                break
+            # Only the worker whose delete wins removes the object
+            result = await self.collection.delete_one(
+                {"key": doc["key"], "status": READY, "last_used_at": doc["last_used_at"]}
+            )
+            if not result.deleted_count:
+                continue
+            size = doc.get("size", 0)
+            excess -= size
+            await self._add_to_total(-size)
+            try:
+                await asyncio.to_thread(self.storage.delete, doc["key"])
+            except Exception as e:
+                logger.warning(f"Could not delete evicted artifact {doc['key']}: {str(e)}")
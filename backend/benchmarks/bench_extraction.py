@@ -0,0 +1,72 @@
+"""
+Benchmark page-parallel PDF extraction against the serial extractor
+
+Generates a --pages PDF, extracts it serially (FileProcessor.extract_pdf_text)
+and through ExtractionPool at each worker count, checks the merged text is
+identical, then repeats with a warm page cache (mongomock) to show a
+re-requested extraction only reads cached pages.
+
+Usage:
+    python benchmarks/bench_extraction.py --pages 300 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import hashlib
+import tempfile
+import time
+from pathlib import Path
+
+from bench_upload_latency import make_pdf
+from common import BACKEND_DIR  # noqa: F401  (puts the backend on sys.path)
+
+from file_processor import ExtractionPool, FileProcessor
+
+
+async def run(args):
+    from mongomock_motor import AsyncMongoMockClient
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.pdf"
+        make_pdf(path, args.pages)
+        content_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+
+        start = time.perf_counter()
+        expected = FileProcessor.extract_pdf_text(str(path))
+        serial = time.perf_counter() - start
+        print(f"{args.pages} pages, {len(expected)} chars")
+        print(f"{'mode':<28} {'wall (s)':>9} {'speedup':>8}")
+        print(f"{'serial':<28} {serial:>9.2f} {1:>7.1f}x")
+
+        for workers in args.workers:
+            pool = ExtractionPool(max_workers=workers, pages_per_shard=args.shard)
+            start = time.perf_counter()
+            text = await pool.process_file(str(path), "pdf")
+            elapsed = time.perf_counter() - start
+            assert text == expected
+            print(f"{f'{workers} workers':<28} {elapsed:>9.2f} {serial / elapsed:>7.1f}x")
+            pool.shutdown()
+
+        page_cache = AsyncMongoMockClient()["bench"]["extracted_pages"]
+        pool = ExtractionPool(max_workers=max(args.workers), pages_per_shard=args.shard, page_cache=page_cache)
+        await pool.process_file(str(path), "pdf", content_hash)
+        # Simulate an extraction that failed halfway
+        await page_cache.delete_many({"page": {"$gte": args.pages // 2}})
+        for label in ("resume (half cached)", "repeat (fully cached)"):
+            start = time.perf_counter()
+            text = await pool.process_file(str(path), "pdf", content_hash)
+            elapsed = time.perf_counter() - start
+            assert text == expected
+            print(f"{label:<28} {elapsed:>9.2f} {serial / elapsed:>7.1f}x")
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--shard", type=int, default=20, help="pages per shard")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
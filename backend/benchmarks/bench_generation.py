@@ -0,0 +1,45 @@
+"""
+Benchmark full book generation against a stubbed LlmChat with injectable latency
+
+Usage:
+    python benchmarks/bench_generation.py --latency 0.5 --concurrency 1 2 4 8
+"""
+import argparse
+import asyncio
+import time
+
+from common import FakeLlmChat, install_fake_llm
+
+
+async def run(concurrency_levels, latency, jitter):
+    install_fake_llm()
+    from book_generator import BollywoodBookGenerator, DEFAULT_CHAPTERS
+
+    FakeLlmChat.latency = latency
+    FakeLlmChat.jitter = jitter
+    generator = BollywoodBookGenerator()
+    calls = len(DEFAULT_CHAPTERS) + 2
+
+    print(f"{calls} LLM calls per book, {latency:.2f}s latency (+{jitter:.2f}s jitter)")
+    print(f"{'concurrency':>12} {'wall (s)':>10} {'speedup':>8}")
+    baseline = None
+    for concurrency in concurrency_levels:
+        start = time.perf_counter()
+        book = await generator.generate_full_book("english", concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        assert [c["number"] for c in book["chapters"]] == [c["num"] for c in DEFAULT_CHAPTERS]
+        baseline = baseline or elapsed
+        print(f"{concurrency:>12} {elapsed:>10.2f} {baseline / elapsed:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per fake LLM call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 15])
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.latency, args.jitter))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark PDF rendering of a 60-page book
+
+Builds a synthetic book with the default chapter plan (60 "Page N" blocks of
+about --words words each) and renders it with the previous single-Paragraph
+layout, the per-paragraph flowables in one process, and the flowables with
+chapters rendered in parallel processes. Each variant runs in a fresh
+subprocess so its wall time and peak RSS (its own and its children's) are
+measured separately.
+
+Usage:
+    python benchmarks/bench_pdf.py --words 350 --workers 4 --repeat 3
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import install_fake_llm
+
+VARIANTS = ["before", "flowables", "parallel"]
+
+PAGE_TEMPLATE = """Page {page}
+━━━━━━━━━━━━━━━━━━━━━
+📖 Topic: {title} part {page}
+
+🎬 Bollywood Meme Prompt:
+Raju from Hera Pheri shocked face when seeing cloud bills
+
+💬 Dialogue:
+Raju: "Yeh cloud ka bill hai ya Sholay ka budget?"
+Shyam: "Auto-scaling off karna bhool gaye, Babu Bhaiya!"
+
+📚 Academic Explanation:
+{body}
+
+🎯 Key Points:
+• Elastic resources are billed per use
+• Autoscaling policies need upper limits
+• Monitoring & alerts catch runaway costs
+
+😄 Punchline/Joke:
+Cloud mein sab kuch possible hai, bas bill dekh ke <b>dil</b> mat todna!
+━━━━━━━━━━━━━━━━━━━━━
+"""
+
+
+def build_book(words: int) -> dict:
+    install_fake_llm()  # book_generator imports the LLM client
+    from book_generator import DEFAULT_CHAPTERS
+
+    sentence = "Cloud providers pool compute, storage & network resources behind APIs so tenants scale on demand. "
+    body = (sentence * (words // 14 + 1)).strip()
+    chapters = []
+    page = 1
+    for chapter in DEFAULT_CHAPTERS:
+        pages = []
+        for _ in range(chapter["pages"]):
+            pages.append(PAGE_TEMPLATE.format(page=page, title=chapter["title"], body=body))
+            page += 1
+        chapters.append({"number": chapter["num"], "title": chapter["title"], "content": "\n".join(pages)})
+    toc = "\n".join(f"Chapter {c['number']}: {c['title']}" for c in chapters)
+    return {"title_page": "Bollywood Cloud Computing\nA filmy guide to the cloud", "toc": toc, "chapters": chapters}
+
+
+def render_before(book_data: dict, output_path: str):
+    """The layout generate_pdf used before: each chapter is one Paragraph of <br/> runs"""
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+    doc = SimpleDocTemplate(output_path, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24,
+                                 textColor='#FF6B6B', spaceAfter=30, alignment=TA_CENTER)
+    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=16,
+                                   textColor='#4ECDC4', spaceAfter=12)
+    normal_style = styles['Normal']
+    normal_style.fontSize = 11
+    normal_style.leading = 14
+    elements = [
+        Paragraph("📚 Bollywood Cloud Computing Book", title_style),
+        Spacer(1, 0.2 * inch),
+        Paragraph(book_data["title_page"].replace('\n', '<br/>'), normal_style),
+        PageBreak(),
+        Paragraph("📖 Table of Contents", heading_style),
+        Paragraph(book_data["toc"].replace('\n', '<br/>'), normal_style),
+        PageBreak(),
+    ]
+    for chapter in book_data["chapters"]:
+        elements.append(Paragraph(f"Chapter {chapter['number']}: {chapter['title']}", heading_style))
+        elements.append(Spacer(1, 0.2 * inch))
+        content = chapter["content"].replace('\n\n', '<br/><br/>').replace('\n', '<br/>')
+        content = content.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        content = content.replace('&lt;br/&gt;', '<br/>')
+        elements.append(Paragraph(content, normal_style))
+        elements.append(PageBreak())
+    doc.build(elements)
+
+
+def run_variant(variant: str, words: int, workers: int) -> dict:
+    from document_generator import DocumentGenerator
+
+    book_data = build_book(words)
+    with tempfile.TemporaryDirectory() as out_dir:
+        output_path = os.path.join(out_dir, "book.pdf")
+        start = time.perf_counter()
+        if variant == "before":
+            render_before(book_data, output_path)
+        else:
+            DocumentGenerator.generate_pdf(book_data, output_path, workers=1 if variant == "flowables" else workers)
+        elapsed = time.perf_counter() - start
+        import PyPDF2
+        with open(output_path, "rb") as f:
+            pdf_pages = len(PyPDF2.PdfReader(f).pages)
+        size = os.path.getsize(output_path)
+    return {
+        "seconds": elapsed,
+        "pdf_pages": pdf_pages,
+        "bytes": size,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", type=int, default=350, help="words of explanation per book page")
+    parser.add_argument("--workers", type=int, default=4, help="processes for the parallel variant")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.words, args.workers)))
+        return
+
+    print(f"60-page book, ~{args.words} words per page, {os.cpu_count()} CPUs")
+    print(f"{'variant':<22} {'best (s)':>9} {'PDF pages':>10} {'size (KB)':>10} {'peak RSS (MB)':>14} {'workers RSS (MB)':>17}")
+    for variant in VARIANTS:
+        runs = []
+        for _ in range(args.repeat):
+            output = subprocess.run(
+                [sys.executable, __file__, "--variant", variant, "--words", str(args.words), "--workers", str(args.workers)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        best = min(runs, key=lambda r: r["seconds"])
+        label = f"parallel ({args.workers} procs)" if variant == "parallel" else variant
+        workers_rss = f"{best['children_peak_rss_mb']:.0f}" if variant == "parallel" else "-"
+        print(f"{label:<22} {best['seconds']:>9.2f} {best['pdf_pages']:>10} {best['bytes'] / 1024:>10.0f} "
+              f"{max(r['peak_rss_mb'] for r in runs):>14.0f} {workers_rss:>17}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Simulate peak load through the LLM rate limiter
+
+One heavy user starts --heavy-books full books while --light-users users each
+ask for a single chapter. Calls go to the stubbed LlmChat through
+BollywoodBookGenerator with a small RPM/TPM budget, so the run shows
+throughput pinned at the limit, light users served between the heavy user's
+calls (round-robin), and interactive calls rejected once the queue is full.
+
+Usage:
+    python benchmarks/bench_rate_limiter.py --rpm 120 --heavy-books 3 --light-users 5
+"""
+import argparse
+import asyncio
+import time
+
+from common import FakeLlmChat, install_fake_llm
+
+
+async def run(args):
+    install_fake_llm()
+    from book_generator import BollywoodBookGenerator, DEFAULT_CHAPTERS
+    from rate_limiter import Caller, LlmRateLimiter, RateLimitExceeded, current_caller
+
+    FakeLlmChat.latency = args.latency
+    limiter = LlmRateLimiter(rpm=args.rpm, tpm=args.tpm, max_queue=args.max_queue)
+    # Start from an empty bucket so the run measures the sustained rate
+    limiter._requests = 0
+    generator = BollywoodBookGenerator(limiter=limiter, concurrency=len(DEFAULT_CHAPTERS) + 2)
+    start = time.perf_counter()
+
+    async def heavy_book(n):
+        current_caller.set(Caller("heavy", reject_when_full=False))
+        await generator.generate_full_book("english")
+        return time.perf_counter() - start
+
+    async def light_chapter(n):
+        await asyncio.sleep(0.5)  # arrive after the heavy user's books are queued
+        current_caller.set(Caller(f"light-{n}"))
+        try:
+            await generator.generate_chapter(1, "Introduction to Cloud Computing", "english")
+            return time.perf_counter() - start
+        except RateLimitExceeded as e:
+            return f"429 (retry after {e.retry_after}s)"
+
+    heavy = [asyncio.create_task(heavy_book(n)) for n in range(args.heavy_books)]
+    light = [asyncio.create_task(light_chapter(n)) for n in range(args.light_users)]
+    light_results = await asyncio.gather(*light)
+    heavy_results = await asyncio.gather(*heavy)
+    elapsed = time.perf_counter() - start
+
+    stats = limiter.stats()
+    calls = stats["granted"]
+    print(f"budget {args.rpm:.0f} RPM / {args.tpm:.0f} TPM, {calls} LLM calls in {elapsed:.1f}s "
+          f"= {calls * 60 / elapsed:.0f} calls/min")
+    for n, result in enumerate(light_results):
+        print(f"light user {n}: " + (f"done at {result:.1f}s" if isinstance(result, float) else result))
+    for n, result in enumerate(heavy_results):
+        print(f"heavy book {n}: done at {result:.1f}s")
+    print(f"queued {stats['queued']}, rejected {stats['rejected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rpm", type=float, default=120)
+    parser.add_argument("--tpm", type=float, default=1_000_000)
+    parser.add_argument("--max-queue", type=int, default=100)
+    parser.add_argument("--heavy-books", type=int, default=3)
+    parser.add_argument("--light-users", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake LLM call")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
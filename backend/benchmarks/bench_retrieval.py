@@ -0,0 +1,77 @@
+"""
+Benchmark per-chapter retrieval latency on the local chunk index
+
+Builds a ChunkIndex of --chunks synthetic lecture chunks spread over --sources
+uploads, then times ChunkIndex.context for every default chapter title, both
+over the whole index and restricted to a handful of sources (one session).
+
+Usage:
+    python benchmarks/bench_retrieval.py --chunks 10000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from common import install_fake_llm
+
+install_fake_llm()  # book_generator imports the LLM client at module level
+
+from book_generator import DEFAULT_CHAPTERS  # noqa: E402
+from retrieval import ChunkIndex, chunk_text  # noqa: E402
+
+VOCABULARY = (
+    "cloud virtualization hypervisor container kubernetes docker storage object block "
+    "file network latency bandwidth load balancer autoscaling elasticity serverless "
+    "function lambda security encryption identity access compliance pricing billing "
+    "reserved spot instance region availability zone replication consistency database "
+    "sql nosql cache cdn monitoring logging devops pipeline microservices api gateway "
+    "multi tenant saas paas iaas migration hybrid edge computing trends service model"
+).split()
+
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        n = min(words, rng.randint(8, 20))
+        sentences.append(" ".join(rng.choice(VOCABULARY) for _ in range(n)).capitalize() + ".")
+        words -= n
+    return " ".join(sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--sources", type=int, default=500)
+    parser.add_argument("--session-sources", type=int, default=5, help="uploads visible to one request")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index = ChunkIndex()
+    per_source = max(1, args.chunks // args.sources)
+    start = time.perf_counter()
+    for n in range(args.sources):
+        # ~200 words per chunk, the size chunk_text produces by default
+        index.add(f"blob:{n}", chunk_text(synthetic_text(rng, 200 * per_source))[:per_source])
+    print(f"indexed {len(index)} chunks from {args.sources} sources in {time.perf_counter() - start:.2f}s")
+
+    session = {f"blob:{n}" for n in rng.sample(range(args.sources), args.session_sources)}
+    index.context(DEFAULT_CHAPTERS[0]["title"])  # build the lazy arrays once
+
+    for label, sources in (("all sources", None), (f"{len(session)} session sources", session)):
+        samples = []
+        for _ in range(args.runs):
+            for chapter in DEFAULT_CHAPTERS:
+                start = time.perf_counter()
+                index.context(chapter["title"], sources)
+                samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(
+            f"{label:<22} p50 {statistics.median(samples):6.2f}ms  "
+            f"p99 {samples[int(len(samples) * 0.99) - 1]:6.2f}ms  max {samples[-1]:6.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Reproducible benchmark suite for the backend hot paths
+
+Runs, against generated corpora, the stubbed LlmChat and mongomock (or a
+local mongod with --mongo-url):
+  ingestion   FileProcessor extraction of PDF, DOCX, PPTX and TXT files of several sizes
+  generation  generate_full_book at several concurrency levels, fixed fake LLM latency
+  rendering   DocumentGenerator Markdown, DOCX and PDF of a 60-page book
+  api         request throughput of the status, chapter and download endpoints
+
+Results are written as JSON (environment, settings and one record per case)
+so two runs can be compared:
+
+Usage:
+    python benchmarks/bench_suite.py --output baseline.json
+    python benchmarks/bench_suite.py --quick --suites ingestion rendering
+    python benchmarks/bench_suite.py --output new.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from bench_pdf import build_book
+from bench_upload_latency import make_pdf, percentile
+from common import BACKEND_DIR, FakeLlmChat, install_fake_llm, use_mock_mongo
+
+SUITES = ["ingestion", "generation", "rendering", "api"]
+
+# Corpus sizes: pages (PDF), paragraphs/10 (DOCX), slides (PPTX), lines/50 (TXT)
+SIZES = {"small": 10, "medium": 100, "large": 300}
+QUICK_SIZES = {"small": 5, "medium": 25}
+
+LINE = "Virtualization, containers and load balancing explained with Bollywood analogies"
+
+
+def make_docx(path: Path, size: int):
+    from docx import Document
+
+    doc = Document()
+    for n in range(size * 10):
+        doc.add_paragraph(f"Paragraph {n}: {LINE}. " * 4)
+    doc.save(str(path))
+
+
+def make_pptx(path: Path, size: int):
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    deck = Presentation()
+    for n in range(size):
+        slide = deck.slides.add_slide(deck.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {n}"
+        body = slide.placeholders[1].text_frame
+        body.text = LINE
+        for line in range(8):
+            body.add_paragraph().text = f"Point {line}: {LINE}"
+        slide.shapes.add_textbox(Inches(1), Inches(6), Inches(8), Inches(1)).text_frame.text = f"Notes {n}"
+    deck.save(str(path))
+
+
+def make_txt(path: Path, size: int):
+    path.write_text("".join(f"Line {n}: {LINE}\n" for n in range(size * 50)), encoding="utf-8")
+
+
+MAKERS = {"pdf": make_pdf, "docx": make_docx, "pptx": make_pptx, "txt": make_txt}
+
+
+def timings(fn: Callable, repeat: int) -> Dict:
+    """Run ``fn`` ``repeat`` times; the last result is returned alongside the timings"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return {"seconds": min(samples), "median_seconds": statistics.median(samples), "runs": repeat, "_result": result}
+
+
+async def async_timings(fn: Callable, repeat: int) -> Dict:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn()
+        samples.append(time.perf_counter() - start)
+    return {"seconds": min(samples), "median_seconds": statistics.median(samples), "runs": repeat, "_result": result}
+
+
+def record(suite: str, name: str, stats: Dict, **extra) -> Dict:
+    result = {key: value for key, value in stats.items() if not key.startswith("_")}
+    for key in ("seconds", "median_seconds"):
+        if key in result:
+            result[key] = round(result[key], 6)
+    entry = {"suite": suite, "name": name, **result, **extra}
+    print(f"  {name:<36} " + "  ".join(f"{k}={v}" for k, v in entry.items() if k not in ("suite", "name")))
+    return entry
+
+
+def bench_ingestion(args, tmp: Path) -> List[Dict]:
+    from file_processor import FileProcessor
+
+    results = []
+    for file_type, maker in MAKERS.items():
+        for size_name, size in (QUICK_SIZES if args.quick else SIZES).items():
+            path = tmp / f"corpus_{size_name}.{file_type}"
+            maker(path, size)
+            stats = timings(lambda: FileProcessor.process_file(str(path), file_type), args.repeat)
+            chars = len(stats["_result"])
+            results.append(record(
+                "ingestion", f"{file_type}/{size_name}", stats,
+                file_bytes=path.stat().st_size,
+                chars=chars,
+                chars_per_second=round(chars / stats["seconds"])
+            ))
+    return results
+
+
+async def bench_generation(args) -> List[Dict]:
+    from book_generator import BollywoodBookGenerator, DEFAULT_CHAPTERS
+
+    FakeLlmChat.latency = args.llm_latency
+    FakeLlmChat.jitter = 0.0
+    results = []
+    for concurrency in ([1, 4] if args.quick else [1, 4, 8, 16]):
+        # No response cache, so every run makes every call
+        generator = BollywoodBookGenerator(concurrency=concurrency)
+        stats = await async_timings(lambda: generator.generate_full_book("english"), args.repeat)
+        results.append(record(
+            "generation", f"full_book/concurrency_{concurrency}", stats,
+            llm_calls=len(DEFAULT_CHAPTERS) + 2,
+            llm_latency=args.llm_latency
+        ))
+    return results
+
+
+def bench_rendering(args, tmp: Path) -> List[Dict]:
+    from document_generator import DocumentGenerator
+
+    book_data = build_book(args.words)
+    renderers = {
+        "md": DocumentGenerator.generate_markdown,
+        "docx": DocumentGenerator.generate_docx,
+        "pdf": lambda data, path: DocumentGenerator.generate_pdf(data, path, workers=1),
+    }
+    results = []
+    for fmt, render in renderers.items():
+        path = tmp / f"book.{fmt}"
+        stats = timings(lambda: render(book_data, str(path)), args.repeat)
+        results.append(record("rendering", f"{fmt}/60_pages", stats, output_bytes=path.stat().st_size))
+    return results
+
+
+async def bench_api(args) -> List[Dict]:
+    import httpx
+    import server
+
+    await server.ensure_indexes()
+    book_data = build_book(args.words)
+    await server.save_book("bench-book", "english", book_data, {})
+    await server.db.generations.replace_one(
+        {"book_id": "bench-book"},
+        {"book_id": "bench-book", "status": "completed", "progress": 100},
+        upsert=True
+    )
+    # Let the pre-renders finish so they don't compete with the measured requests
+    await asyncio.gather(*server.artifact_cache._background, return_exceptions=True)
+
+    endpoints = {
+        "generation_status": "/api/generation/status/bench-book",
+        "chapter_list": "/api/books/bench-book/chapters",
+        "chapter": "/api/books/bench-book/chapters/5",
+        "download_md": "/api/download/md/bench-book",
+        "download_pdf": "/api/download/pdf/bench-book",
+    }
+    requests = args.api_requests // (4 if args.quick else 1)
+    results = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name, url in endpoints.items():
+            latencies = []
+            queue = iter(range(requests))
+
+            async def worker():
+                for _ in queue:
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    latencies.append(time.perf_counter() - start)
+                    assert response.status_code == 200, response.text
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.api_concurrency)))
+            elapsed = time.perf_counter() - start
+            results.append(record(
+                "api", name, {"seconds": elapsed},
+                requests=requests,
+                concurrency=args.api_concurrency,
+                rps=round(requests / elapsed, 1),
+                p50_ms=round(percentile(latencies, 50) * 1000, 2),
+                p99_ms=round(percentile(latencies, 99) * 1000, 2)
+            ))
+
+    if args.mongo_url:
+        await server.client.drop_database(server.db.name)
+    server.extraction_pool.shutdown()
+    server.render_pool.shutdown(wait=True)
+    return results
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict], baseline_path: str):
+    """Print each case's change against a previous run (time: lower is better; rps: higher)"""
+    baseline = {(r["suite"], r["name"]): r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    print(f"{'case':<48} {'baseline':>10} {'current':>10} {'change':>8}")
+    for result in results:
+        previous = baseline.get((result["suite"], result["name"]))
+        if previous is None:
+            continue
+        metric = "rps" if "rps" in result else "seconds"
+        before, after = previous[metric], result[metric]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = change < 0 if metric == "rps" else change > 0
+        flag = " !" if worse and abs(change) >= 10 else ""
+        print(f"{result['suite'] + '/' + result['name']:<48} {before:>10} {after:>10} {change:>+7.1f}%{flag}")
+
+
+async def run(args):
+    if "api" in args.suites:
+        if args.mongo_url:
+            os.environ["MONGO_URL"] = args.mongo_url
+            os.environ["DB_NAME"] = f"benchmark_{os.getpid()}"
+        else:
+            use_mock_mongo()
+    install_fake_llm()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for suite in args.suites:
+            print(f"{suite}:")
+            if suite == "ingestion":
+                results += bench_ingestion(args, Path(tmp))
+            elif suite == "generation":
+                results += await bench_generation(args)
+            elif suite == "rendering":
+                results += bench_rendering(args, Path(tmp))
+            elif suite == "api":
+                results += await bench_api(args)
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    report = {"environment": environment(), "settings": settings, "results": results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--quick", action="store_true", help="smaller corpora and fewer cases")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case (the fastest is reported)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--words", type=int, default=350, help="words per page of the rendered book")
+    parser.add_argument("--api-requests", type=int, default=400, help="requests per API endpoint")
+    parser.add_argument("--api-concurrency", type=int, default=16)
+    parser.add_argument("--mongo-url", help="run the API suite against this mongod instead of mongomock")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Load test: /api/generation/status latency while large PDFs are uploaded in parallel
+
+Runs the app in-process (stubbed LLM, mongomock) and probes the status
+endpoint continuously while uploads are in flight. Compare
+EXTRACTION_WORKERS=0 (inline parsing, the old behaviour) against the pool.
+
+Usage:
+    python benchmarks/bench_upload_latency.py --pages 300 --uploads 4 --workers 0 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from common import install_fake_llm, use_mock_mongo
+
+
+def make_pdf(path: Path, pages: int, tag: str = ""):
+    """A text PDF; a distinct ``tag`` gives distinct bytes, so uploads are not deduplicated"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(str(path), pagesize=A4)
+    for page in range(pages):
+        for line in range(50):
+            pdf.drawString(40, 800 - line * 15, f"Page {page} line {line}: virtualization, containers and load balancing {tag}")
+        pdf.showPage()
+    pdf.save()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def probe(client, book_id, stop, samples, interval=0.01):
+    # Latency is measured from when the probe was due, so time spent waiting
+    # for a blocked event loop counts against the endpoint
+    while not stop.is_set():
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await client.get(f"/api/generation/status/{book_id}")
+        samples.append((time.perf_counter() - due) * 1000)
+
+
+async def run_case(server, pdfs, workers):
+    import httpx
+    from file_processor import ExtractionPool
+
+    # The upload store holds its own reference to the pool
+    server.extraction_pool.shutdown()
+    server.extraction_pool = ExtractionPool(
+        max_workers=workers, max_concurrent=max(1, workers), page_cache=server.db.extracted_pages
+    )
+    server.upload_store.extraction_pool = server.extraction_pool
+    await server.db.generations.insert_one({"book_id": "probe", "status": "completed", "progress": 100})
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        idle = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, "probe", stop, idle))
+        await asyncio.sleep(0.5)
+        stop.set()
+        await prober
+
+        busy = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, "probe", stop, busy))
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/upload/slides", files={"file": (f"deck{n}.pdf", pdf_bytes, "application/pdf")})
+            for n, pdf_bytes in enumerate(pdfs)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+    label = "inline" if workers == 0 else f"pool({workers})"
+    print(
+        f"{label:>10} uploads {elapsed:6.2f}s | status p50 idle {statistics.median(idle):6.1f}ms"
+        f" busy {statistics.median(busy):7.1f}ms p99 busy {percentile(busy, 99):7.1f}ms"
+        f" max {max(busy):7.1f}ms ({len(busy)} probes)"
+    )
+
+
+def make_pdfs(tmp: str, pages: int, count: int, case: int):
+    """``count`` different PDFs, none seen by an earlier case (identical bytes hit the sha256 dedupe)"""
+    pdfs = []
+    for n in range(count):
+        path = Path(tmp) / f"deck_{case}_{n}.pdf"
+        make_pdf(path, pages, tag=f"case {case} deck {n}")
+        pdfs.append(path.read_bytes())
+    return pdfs
+
+
+async def main(pages, uploads, worker_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [make_pdfs(tmp, pages, uploads, case) for case in range(len(worker_counts))]
+        print(f"{uploads} parallel uploads of a {pages}-page PDF ({len(cases[0][0]) / 1e6:.1f} MB)")
+
+        install_fake_llm()
+        use_mock_mongo()
+        import server
+
+        for workers, pdfs in zip(worker_counts, cases):
+            await run_case(server, pdfs, workers)
+        server.extraction_pool.shutdown()
+        server.render_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, os.cpu_count() or 2])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(main(args.pages, args.uploads, args.workers))
@@ -0,0 +1,105 @@
+"""
+Benchmark upload retrieval for generation against a large uploads collection
+
+Seeds a real MongoDB (MONGO_URL, default localhost) with --uploads records
+spread over --owners sessions, then compares the old unscoped query
+(db.uploads.find({}).to_list(100)) with the scoped, projected, indexed
+UploadStore.find. Requires a running mongod; mongomock has no query planner.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_upload_query.py --uploads 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from common import BACKEND_DIR
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ServerSelectionTimeoutError
+from object_storage import LocalStorage
+from upload_store import UploadStore
+
+
+async def seed(db, uploads: int, owners: int, batch: int = 10000):
+    owner_ids = [str(uuid.uuid4()) for _ in range(owners)]
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    body = "cloud computing lecture notes " * 150  # ~4.5 KB, like the stored 5000-char previews
+    inserted = 0
+    while inserted < uploads:
+        docs = []
+        for n in range(inserted, min(uploads, inserted + batch)):
+            docs.append({
+                "id": str(uuid.uuid4()),
+                "owner_id": random.choice(owner_ids),
+                "type": "notes",
+                "filename": f"notes_{n}.txt",
+                "content_hash": f"{n:064x}",
+                "content": body,
+                "word_count": 600,
+                "created_at": (start + timedelta(seconds=n)).isoformat()
+            })
+        await db.uploads.insert_many(docs, ordered=False)
+        inserted += len(docs)
+        print(f"\rseeded {inserted}/{uploads}", end="", flush=True)
+    print()
+    return owner_ids
+
+
+async def timed(label, query, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await query()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<40} p50 {statistics.median(samples):8.2f}ms  max {max(samples):8.2f}ms  ({len(result)} docs)")
+
+
+async def main(args):
+    mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
+    try:
+        await client.admin.command("ping")
+    except ServerSelectionTimeoutError:
+        raise SystemExit(f"No MongoDB server at {mongo_url}; start mongod or set MONGO_URL")
+    db = client[args.db]
+    store = UploadStore(db, LocalStorage(BACKEND_DIR), extraction_pool=None)
+
+    if args.reseed or await db.uploads.estimated_document_count() < args.uploads:
+        await db.uploads.drop()
+        owner_ids = await seed(db, args.uploads, args.owners)
+    else:
+        owner_ids = await db.uploads.distinct("owner_id")
+
+    owner = random.choice(owner_ids)
+    some_ids = [u["id"] for u in await db.uploads.find({"owner_id": owner}, {"id": 1}).to_list(5)]
+
+    await db.uploads.drop_indexes()
+    await timed("unscoped find({}).to_list(100)", lambda: db.uploads.find({}, {"_id": 0}).to_list(100), args.runs)
+    await timed("scoped, no index", lambda: store.find(owner), args.runs)
+
+    start = time.perf_counter()
+    await store.ensure_indexes()
+    print(f"index build {time.perf_counter() - start:.1f}s")
+    await timed("scoped + projected + indexed", lambda: store.find(owner), args.runs)
+    await timed("selected upload_ids", lambda: store.find(owner, some_ids), args.runs)
+
+    plan = await db.uploads.find({"owner_id": owner}).sort("created_at", -1).limit(100).explain()
+    stats = plan.get("executionStats", {})
+    print(f"explain: docsExamined={stats.get('totalDocsExamined')} keysExamined={stats.get('totalKeysExamined')}")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--db", default="upload_query_benchmark")
+    parser.add_argument("--reseed", action="store_true")
+    asyncio.run(main(parser.parse_args()))
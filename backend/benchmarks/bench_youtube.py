@@ -0,0 +1,75 @@
+"""
+Benchmark YouTube playlist ingestion with a local stand-in for the transcript API
+
+Each fake transcript fetch sleeps --latency seconds (like a real round trip)
+and every --fail-every'th video has no transcript. Compares fetch
+concurrency levels, then repeats with a warm transcript cache (mongomock).
+
+Usage:
+    python benchmarks/bench_youtube.py --videos 50 --latency 1.0 --concurrency 1 8 16
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from common import BACKEND_DIR  # noqa: F401  (puts the backend on sys.path)
+
+from youtube_ingest import TranscriptFetcher
+
+
+class FakeTranscriptApi:
+    """Blocking stand-in for YouTubeTranscriptApi.fetch"""
+
+    def __init__(self, latency: float, fail_every: int):
+        self.latency = latency
+        self.fail_every = fail_every
+
+    def fetch(self, video_id: str):
+        time.sleep(self.latency)
+        if self.fail_every and video_id[-3:].isdigit() and int(video_id[-3:]) % self.fail_every == 0:
+            raise RuntimeError(f"Subtitles are disabled for this video ({video_id})")
+        return [{"text": f"{video_id} lecture on cloud computing"}] * 50
+
+
+async def run(args):
+    from mongomock_motor import AsyncMongoMockClient
+
+    video_ids = [f"video{n:06d}" for n in range(1, args.videos + 1)]
+
+    async def resolver(playlist_id):
+        return video_ids
+
+    api = FakeTranscriptApi(args.latency, args.fail_every)
+    logging.getLogger("youtube_ingest").setLevel(logging.ERROR)  # expected per-video failures
+    print(f"{args.videos} videos, {args.latency:.2f}s per transcript fetch")
+    print(f"{'mode':<22} {'wall (s)':>9} {'ok':>4} {'failed':>7}")
+    for concurrency in args.concurrency:
+        fetcher = TranscriptFetcher(transcript_api=api, playlist_resolver=resolver, concurrency=concurrency)
+        start = time.perf_counter()
+        result = await fetcher.get_playlist("PLbench")
+        elapsed = time.perf_counter() - start
+        print(f"{f'concurrency {concurrency}':<22} {elapsed:>9.2f} {len(result['videos']):>4} {len(result['failed']):>7}")
+        fetcher.shutdown()
+
+    cache = AsyncMongoMockClient()["bench"]["youtube_transcripts"]
+    fetcher = TranscriptFetcher(cache, api, resolver, concurrency=max(args.concurrency))
+    for label in ("cold cache", "warm cache"):
+        start = time.perf_counter()
+        result = await fetcher.get_playlist("PLbench")
+        elapsed = time.perf_counter() - start
+        print(f"{label:<22} {elapsed:>9.2f} {len(result['videos']):>4} {len(result['failed']):>7}")
+    fetcher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per fake transcript fetch")
+    parser.add_argument("--fail-every", type=int, default=10, help="every Nth video has no transcript (0: none)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 16])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
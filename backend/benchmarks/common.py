@@ -0,0 +1,55 @@
+"""
+Shared helpers for the benchmark scripts: a stubbed LLM client and an
+optional in-memory Mongo so benchmarks run without external services
+"""
+import asyncio
+import os
+import random
+import sys
+import types
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+class FakeLlmChat:
+    """Stand-in for emergentintegrations LlmChat that sleeps instead of calling the LLM"""
+    latency = 0.5
+    jitter = 0.0
+
+    def __init__(self, api_key, session_id, system_message):
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        return f"[{self.session_id}] {message.text[:40]}"
+
+
+class FakeUserMessage:
+    def __init__(self, text):
+        self.text = text
+
+
+def install_fake_llm():
+    """Register the fake LLM client under the emergentintegrations import path"""
+    chat_module = types.ModuleType("emergentintegrations.llm.chat")
+    chat_module.LlmChat = FakeLlmChat
+    chat_module.UserMessage = FakeUserMessage
+    sys.modules["emergentintegrations"] = types.ModuleType("emergentintegrations")
+    sys.modules["emergentintegrations.llm"] = types.ModuleType("emergentintegrations.llm")
+    sys.modules["emergentintegrations.llm.chat"] = chat_module
+    os.environ.setdefault("EMERGENT_LLM_KEY", "benchmark")
+
+
+def use_mock_mongo():
+    """Swap motor for mongomock_motor (pip install mongomock-motor) before server import"""
+    import motor.motor_asyncio
+    import mongomock_motor
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "benchmark")
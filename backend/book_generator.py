@@ -3,9 +3,61 @@ Bollywood Cloud Computing Book Generator
 Handles content generation using LLM
 """
 import asyncio
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import os
-from typing import List, Dict
+import re
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional, Set, Tuple
+from llm_cache import LlmResponseCache, make_cache_key
+from llm_client import LlmClientPool, record_usage
+from metrics import Counter, Histogram
+from rate_limiter import LlmRateLimiter
+from retrieval import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Concurrency settings for full book generation (overridable via environment)
+DEFAULT_CONCURRENCY = int(os.environ.get('BOOK_GEN_CONCURRENCY', '4'))
+DEFAULT_CALL_TIMEOUT = float(os.environ.get('BOOK_GEN_CALL_TIMEOUT', '180'))
+DEFAULT_MAX_RETRIES = int(os.environ.get('BOOK_GEN_MAX_RETRIES', '2'))
+DEFAULT_RETRY_BACKOFF = float(os.environ.get('BOOK_GEN_RETRY_BACKOFF', '2'))
+
+# Expected answer sizes, used to reserve rate limiter budget before a call
+DEFAULT_COMPLETION_TOKENS = int(os.environ.get('LLM_COMPLETION_TOKENS', '1000'))
+COMPLETION_TOKENS_PER_PAGE = int(os.environ.get('LLM_COMPLETION_TOKENS_PER_PAGE', '700'))
+
+# Use GPT-4o for best creative content generation
+LLM_PROVIDER = "openai"
+LLM_MODEL = "gpt-4o"
+
+# OpenAI-compatible endpoint used for token streaming (unset: no token streaming)
+LLM_STREAM_API_BASE = os.environ.get('LLM_STREAM_API_BASE')
+
+# Characters of user material quoted in prompts when no retrieved references are given
+TOC_REFERENCE_CHARS = 500
+CHAPTER_REFERENCE_CHARS = 300
+
+# Call purposes look like title_hindi, chapter_3_hindi or translate_chapter_3_hindi
+PURPOSE_PATTERN = re.compile(r'^(?P<section>.+?)(?:_(?P<chapter>\d+))?_(?P<language>[a-z]+)$')
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of one LLM call attempt",
+    ["language", "section", "chapter", "outcome"]
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Estimated tokens sent to and received from the LLM",
+    ["language", "kind"]
+)
+SECTION_SECONDS = Histogram(
+    "book_section_duration_seconds",
+    "Time to produce one book section, including cache lookups and retries",
+    ["language", "section", "chapter", "source"]
+)
+
+# Start of a "Page N" block in generated chapters
+PAGE_MARKER = re.compile(r'^[ \t#*]*Page\s+\d+\b', re.MULTILINE)
 
 # Language-specific system messages
 LANGUAGE_CONFIGS = {
@@ -51,30 +103,285 @@ LANGUAGE_CONFIGS = {
     }
 }
 
+# Default chapter plan for a full book (can be customized based on user content)
+DEFAULT_CHAPTERS = [
+    {"num": 1, "title": "Introduction to Cloud Computing", "pages": 5},
+    {"num": 2, "title": "Virtualization Magic", "pages": 4},
+    {"num": 3, "title": "Virtual Machines - The Copy Machine", "pages": 4},
+    {"num": 4, "title": "Containers: Docker Ka Jadoo", "pages": 5},
+    {"num": 5, "title": "Service Models: IaaS, PaaS, SaaS", "pages": 5},
+    {"num": 6, "title": "Deployment Models", "pages": 4},
+    {"num": 7, "title": "Cloud Storage", "pages": 4},
+    {"num": 8, "title": "Cloud Networking", "pages": 4},
+    {"num": 9, "title": "Load Balancing & Auto-Scaling", "pages": 5},
+    {"num": 10, "title": "Cloud Security", "pages": 5},
+    {"num": 11, "title": "Serverless Computing", "pages": 4},
+    {"num": 12, "title": "Cloud Providers (AWS, Azure, GCP)", "pages": 6},
+    {"num": 13, "title": "Real-World Case Studies", "pages": 5},
+]
+
+def split_pages(text: str) -> List[str]:
+    """Split chapter text at its ``Page N`` markers
+    
+    Any preamble before the first marker stays with the first page. The last
+    element is whatever follows the final marker, which may still be growing
+    when the text is streamed.
+    """
+    starts = [m.start() for m in PAGE_MARKER.finditer(text)][1:]
+    bounds = [0] + starts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+def purpose_labels(purpose: str) -> Dict[str, str]:
+    """Metric labels (section, chapter) of a call purpose such as ``chapter_3_hindi``"""
+    match = PURPOSE_PATTERN.match(purpose)
+    if not match:
+        return {"section": purpose, "chapter": ""}
+    return {"section": match["section"], "chapter": match["chapter"] or ""}
+
+def book_sections(book_data: Dict[str, Any]) -> Dict[str, str]:
+    """Flatten book data into section key -> text (keys as used by generate_full_book)"""
+    sections = {
+        "title_page": book_data.get("title_page", ""),
+        "toc": book_data.get("toc", "")
+    }
+    for chapter in book_data.get("chapters", []):
+        sections[f"chapter_{chapter['number']}"] = chapter["content"]
+    return sections
+
+def assemble_book(sections: Dict[str, str], chapters: List[Tuple[int, str]]) -> Dict[str, Any]:
+    """Build book data from section texts, with chapters in the given order"""
+    return {
+        "title_page": sections["title_page"],
+        "toc": sections["toc"],
+        "chapters": [
+            {
+                "number": number,
+                "title": title,
+                "content": sections[f"chapter_{number}"]
+            }
+            for number, title in chapters
+        ]
+    }
+
 class BollywoodBookGenerator:
-    def __init__(self):
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        call_timeout: float = DEFAULT_CALL_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        cache: Optional[LlmResponseCache] = None,
+        client_pool: Optional[LlmClientPool] = None,
+        limiter: Optional[LlmRateLimiter] = None
+    ):
         self.api_key = os.environ.get('EMERGENT_LLM_KEY')
         if not self.api_key:
             raise ValueError("EMERGENT_LLM_KEY not found in environment")
+        self.client_pool = client_pool or LlmClientPool(self.api_key, LLM_PROVIDER, LLM_MODEL)
+        self.limiter = limiter
+        self.concurrency = max(1, concurrency)
+        self.call_timeout = call_timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.cache = cache
     
-    def _get_chat_instance(self, language: str, session_id: str):
-        """Create LLM chat instance with language-specific system message"""
+    @staticmethod
+    def _system_message(language: str) -> str:
         lang_config = LANGUAGE_CONFIGS.get(language.lower(), LANGUAGE_CONFIGS["english"])
+        return lang_config["system_msg"]
+    
+    def _cache_key(self, language: str, prompt: str) -> str:
+        return make_cache_key(f"{LLM_PROVIDER}/{LLM_MODEL}", self._system_message(language), prompt)
+    
+    async def _complete(
+        self,
+        language: str,
+        purpose: str,
+        prompt: str,
+        use_cache: bool = True,
+        completion_tokens: int = DEFAULT_COMPLETION_TOKENS
+    ) -> str:
+        """Answer a prompt from the response cache, or from the LLM on a miss
         
-        chat = LlmChat(
-            api_key=self.api_key,
-            session_id=session_id,
-            system_message=lang_config["system_msg"]
-        )
-        # Use GPT-4o for best creative content generation
-        chat.with_model("openai", "gpt-4o")
-        return chat
+        ``use_cache=False`` forces a fresh answer (which still refreshes the cache).
+        ``purpose`` prefixes the per-call session ID (e.g. ``chapter_3_hindi``).
+        """
+        started = time.perf_counter()
+        labels = {"language": language, **purpose_labels(purpose)}
+        if self.cache is None:
+            response = await self._send_message(language, purpose, prompt, completion_tokens)
+            SECTION_SECONDS.observe(time.perf_counter() - started, source="llm", **labels)
+            return response
+        
+        key = self._cache_key(language, prompt)
+        cached = await self.cache.get(key) if use_cache else None
+        if cached is not None:
+            record_usage(
+                estimate_tokens(self._system_message(language) + prompt), estimate_tokens(cached), cached=True
+            )
+            SECTION_SECONDS.observe(time.perf_counter() - started, source="cache", **labels)
+            return cached
+        
+        response = await self._send_message(language, purpose, prompt, completion_tokens)
+        await self.cache.set(key, response)
+        SECTION_SECONDS.observe(time.perf_counter() - started, source="llm", **labels)
+        return response
+    
+    async def _stream_complete(
+        self,
+        language: str,
+        purpose: str,
+        prompt: str,
+        completion_tokens: int = DEFAULT_COMPLETION_TOKENS
+    ) -> AsyncIterator[str]:
+        """Yield the answer to a prompt incrementally
+        
+        Token streaming goes through litellm to the OpenAI-compatible endpoint
+        in LLM_STREAM_API_BASE. Without one, the answer arrives in one piece from
+        the regular LlmChat path. Cached answers are yielded immediately.
+        """
+        if not LLM_STREAM_API_BASE:
+            yield await self._complete(language, purpose, prompt, completion_tokens=completion_tokens)
+            return
+        
+        key = self._cache_key(language, prompt)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                record_usage(
+                    estimate_tokens(self._system_message(language) + prompt), estimate_tokens(cached), cached=True
+                )
+                yield cached
+                return
+        
+        parts = []
+        system_message = self._system_message(language)
+        estimate = estimate_tokens(system_message + prompt) + completion_tokens
+        if self.limiter is not None:
+            await self.limiter.acquire(estimate)
+        labels = {"language": language, **purpose_labels(purpose)}
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async for delta in self._stream_chunks(system_message, prompt):
+                parts.append(delta)
+                yield delta
+            outcome = "ok"
+        finally:
+            # Also when the stream fails or the client goes away: account for what
+            # was sent and received, and return the unused reservation
+            elapsed = time.perf_counter() - started
+            LLM_REQUEST_SECONDS.observe(elapsed, outcome=outcome, **labels)
+            prompt_tokens = estimate_tokens(system_message + prompt)
+            completion = estimate_tokens("".join(parts)) if parts else 0
+            self._account(language, prompt_tokens, completion, elapsed)
+            if self.limiter is not None:
+                self.limiter.settle(estimate, prompt_tokens + completion)
+        
+        # Only complete answers are cached
+        if self.cache is not None:
+            await self.cache.set(key, "".join(parts))
+    
+    async def _stream_chunks(self, system_message: str, prompt: str) -> AsyncIterator[str]:
+        import litellm
+        async with self.client_pool.slot():
+            response = await asyncio.wait_for(
+                litellm.acompletion(
+                    model=f"{LLM_PROVIDER}/{LLM_MODEL}",
+                    api_base=LLM_STREAM_API_BASE,
+                    api_key=self.api_key,
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": prompt}
+                    ],
+                    stream=True
+                ),
+                timeout=self.call_timeout
+            )
+            chunks = response.__aiter__()
+            while True:
+                # Bound the gap between chunks rather than the whole generation
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.call_timeout)
+                except StopAsyncIteration:
+                    break
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    yield delta
     
-    async def generate_table_of_contents(self, language: str, user_content: str = "") -> str:
-        """Generate table of contents based on syllabus"""
-        chat = self._get_chat_instance(language, f"toc_{language}")
+    @staticmethod
+    def _account(language: str, prompt_tokens: int, completion_tokens: int, seconds: float):
+        record_usage(prompt_tokens, completion_tokens, seconds)
+        LLM_TOKENS.inc(prompt_tokens, language=language, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, language=language, kind="completion")
+    
+    async def _send_message(
+        self,
+        language: str,
+        purpose: str,
+        prompt: str,
+        completion_tokens: int = DEFAULT_COMPLETION_TOKENS
+    ) -> str:
+        """Send a prompt with a per-call timeout, retrying with exponential backoff
         
-        prompt = f"""Generate a detailed Table of Contents for a 60-page Bollywood-style Cloud Computing book.
+        Each attempt first waits for rate limiter budget; a full limiter queue
+        raises ``RateLimitExceeded`` without retrying.
+        """
+        system_message = self._system_message(language)
+        estimate = estimate_tokens(system_message + prompt) + completion_tokens
+        labels = {"language": language, **purpose_labels(purpose)}
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                await self.limiter.acquire(estimate)
+            started = time.perf_counter()
+            prompt_tokens = estimate_tokens(system_message + prompt)
+            used = prompt_tokens  # what a failed attempt is charged
+            try:
+                response = await self.client_pool.send(
+                    system_message,
+                    purpose,
+                    prompt,
+                    timeout=self.call_timeout
+                )
+                elapsed = time.perf_counter() - started
+                LLM_REQUEST_SECONDS.observe(elapsed, outcome="ok", **labels)
+                completion = estimate_tokens(response)
+                used += completion
+                self._account(language, prompt_tokens, completion, elapsed)
+                return response
+            except Exception as e:
+                error = e
+                outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome=outcome, **labels)
+            finally:
+                # Failed, timed-out and cancelled attempts return their unused reservation too
+                if self.limiter is not None:
+                    self.limiter.settle(estimate, used)
+            if attempt >= self.max_retries:
+                raise Exception(f"LLM call failed after {attempt + 1} attempts: {str(error) or type(error).__name__}") from error
+            delay = self.retry_backoff * (2 ** attempt)
+            logger.warning(f"LLM call failed (attempt {attempt + 1}), retrying in {delay:.1f}s: {str(error) or type(error).__name__}")
+            await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _title_prompt(language: str) -> str:
+        return f"""Create a Bollywood-style title page for the Cloud Computing book in {language}.
+
+Include:
+- 🎬 Main Title (creative and filmy)
+- 📚 Subtitle
+- 💫 Tagline (Bollywood dialogue style)
+- 🎭 Visual description for cover design
+
+Make it exciting and appealing to B.Tech CSE students!"""
+    
+    async def generate_title_page(self, language: str, use_cache: bool = True) -> str:
+        """Generate the Bollywood-style title page"""
+        return await self._complete(language, f"title_{language}", self._title_prompt(language), use_cache)
+    
+    @staticmethod
+    def _toc_prompt(reference: str) -> str:
+        return f"""Generate a detailed Table of Contents for a 60-page Bollywood-style Cloud Computing book.
         
 Base syllabus topics (adapt as needed):
 1. Introduction to Cloud Computing
@@ -95,27 +402,30 @@ Base syllabus topics (adapt as needed):
 16. Real-world Case Studies
 17. Pricing & SLAs
 
-{f'Additional context from user materials: {user_content[:500]}' if user_content else ''}
+{f'Additional context from user materials: {reference}' if reference else ''}
 
 Generate a structured TOC with chapter numbers, topics, and page numbers (for 60-page book).
 Make it fun and Bollywood-themed but academically complete."""
-
-        message = UserMessage(text=prompt)
-        response = await chat.send_message(message)
-        return response
     
-    async def generate_chapter(
-        self, 
-        chapter_num: int, 
-        chapter_title: str, 
+    async def generate_table_of_contents(
+        self,
         language: str,
         user_content: str = "",
-        pages: int = 5
+        use_cache: bool = True,
+        reference: Optional[str] = None
     ) -> str:
-        """Generate a single chapter with multiple pages"""
-        chat = self._get_chat_instance(language, f"chapter_{chapter_num}_{language}")
+        """Generate table of contents based on syllabus
         
-        prompt = f"""Generate Chapter {chapter_num}: {chapter_title}
+        ``reference`` is the user material quoted in the prompt; by default the
+        start of ``user_content``.
+        """
+        if reference is None:
+            reference = user_content[:TOC_REFERENCE_CHARS]
+        return await self._complete(language, f"toc_{language}", self._toc_prompt(reference), use_cache)
+    
+    @staticmethod
+    def _chapter_prompt(chapter_num: int, chapter_title: str, reference: str, pages: int) -> str:
+        return f"""Generate Chapter {chapter_num}: {chapter_title}
 
 This chapter should have approximately {pages} pages in Bollywood comic-style format.
 
@@ -148,7 +458,7 @@ Page [Number]
 
 ━━━━━━━━━━━━━━━━━━━━━
 
-{f'Reference material: {user_content[:300]}' if user_content else ''}
+{f'Reference material: {reference}' if reference else ''}
 
 **REQUIREMENTS:**
 1. Use simple, student-friendly language
@@ -160,72 +470,245 @@ Page [Number]
 7. Make it engaging and memorable
 
 Generate all {pages} pages now."""
-
-        message = UserMessage(text=prompt)
-        response = await chat.send_message(message)
-        return response
     
-    async def generate_full_book(
+    async def generate_chapter(
+        self, 
+        chapter_num: int, 
+        chapter_title: str, 
+        language: str,
+        user_content: str = "",
+        pages: int = 5,
+        use_cache: bool = True,
+        reference: Optional[str] = None
+    ) -> str:
+        """Generate a single chapter with multiple pages
+        
+        ``reference`` is the user material quoted in the prompt (e.g. chunks
+        retrieved for this chapter); by default the start of ``user_content``.
+        """
+        if reference is None:
+            reference = user_content[:CHAPTER_REFERENCE_CHARS]
+        prompt = self._chapter_prompt(chapter_num, chapter_title, reference, pages)
+        return await self._complete(
+            language,
+            f"chapter_{chapter_num}_{language}",
+            prompt,
+            use_cache,
+            pages * COMPLETION_TOKENS_PER_PAGE
+        )
+    
+    async def stream_chapter(
+        self,
+        chapter_num: int,
+        chapter_title: str,
+        language: str,
+        user_content: str = "",
+        pages: int = 5,
+        reference: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Generate a single chapter, yielding each page as soon as it is complete"""
+        if reference is None:
+            reference = user_content[:CHAPTER_REFERENCE_CHARS]
+        prompt = self._chapter_prompt(chapter_num, chapter_title, reference, pages)
+        buffer = ""
+        async for delta in self._stream_complete(
+            language,
+            f"chapter_{chapter_num}_{language}",
+            prompt,
+            pages * COMPLETION_TOKENS_PER_PAGE
+        ):
+            buffer += delta
+            *finished, buffer = split_pages(buffer)
+            for page in finished:
+                yield page
+        if buffer.strip():
+            yield buffer
+    
+    @staticmethod
+    def _section_reference(
+        key: str,
+        user_content: str,
+        references: Optional[Dict[str, str]],
+        limit: int
+    ) -> str:
+        if references is not None and key in references:
+            return references[key]
+        return user_content[:limit]
+    
+    def section_fingerprints(
         self,
         language: str,
         user_content: str = "",
-        total_pages: int = 60
+        references: Optional[Dict[str, str]] = None
     ) -> Dict[str, str]:
-        """Generate complete book with all chapters"""
-        result = {
-            "title_page": "",
-            "toc": "",
-            "chapters": []
-        }
-        
-        # Generate title page
-        chat = self._get_chat_instance(language, f"title_{language}")
-        title_prompt = f"""Create a Bollywood-style title page for the Cloud Computing book in {language}.
-
-Include:
-- 🎬 Main Title (creative and filmy)
-- 📚 Subtitle
-- 💫 Tagline (Bollywood dialogue style)
-- 🎭 Visual description for cover design
-
-Make it exciting and appealing to B.Tech CSE students!"""
+        """Hash of the exact prompt behind each book section
         
-        title_msg = UserMessage(text=title_prompt)
-        result["title_page"] = await chat.send_message(title_msg)
-        
-        # Generate TOC
-        result["toc"] = await self.generate_table_of_contents(language, user_content)
-        
-        # Define chapters (can be customized based on user content)
-        chapters = [
-            {"num": 1, "title": "Introduction to Cloud Computing", "pages": 5},
-            {"num": 2, "title": "Virtualization Magic", "pages": 4},
-            {"num": 3, "title": "Virtual Machines - The Copy Machine", "pages": 4},
-            {"num": 4, "title": "Containers: Docker Ka Jadoo", "pages": 5},
-            {"num": 5, "title": "Service Models: IaaS, PaaS, SaaS", "pages": 5},
-            {"num": 6, "title": "Deployment Models", "pages": 4},
-            {"num": 7, "title": "Cloud Storage", "pages": 4},
-            {"num": 8, "title": "Cloud Networking", "pages": 4},
-            {"num": 9, "title": "Load Balancing & Auto-Scaling", "pages": 5},
-            {"num": 10, "title": "Cloud Security", "pages": 5},
-            {"num": 11, "title": "Serverless Computing", "pages": 4},
-            {"num": 12, "title": "Cloud Providers (AWS, Azure, GCP)", "pages": 6},
-            {"num": 13, "title": "Real-World Case Studies", "pages": 5},
-        ]
-        
-        # Generate each chapter
-        for chapter in chapters:
-            chapter_content = await self.generate_chapter(
+        A section whose fingerprint is unchanged between two runs would be
+        generated from identical inputs (language, chapter spec and the user
+        content that reaches its prompt), so its previous text can be reused.
+        """
+        prompts = {
+            "title_page": self._title_prompt(language),
+            "toc": self._toc_prompt(
+                self._section_reference("toc", user_content, references, TOC_REFERENCE_CHARS)
+            ),
+        }
+        for chapter in DEFAULT_CHAPTERS:
+            key = f"chapter_{chapter['num']}"
+            prompts[key] = self._chapter_prompt(
                 chapter["num"],
                 chapter["title"],
-                language,
-                user_content,
+                self._section_reference(key, user_content, references, CHAPTER_REFERENCE_CHARS),
                 chapter["pages"]
             )
-            result["chapters"].append({
-                "number": chapter["num"],
-                "title": chapter["title"],
-                "content": chapter_content
-            })
+        return {key: self._cache_key(language, prompt) for key, prompt in prompts.items()}
+    
+    def translation_fingerprints(self, source_fingerprints: Dict[str, str], language: str) -> Dict[str, str]:
+        """Fingerprints of sections translated into ``language`` from a pivot book
+        
+        A translated section depends only on its pivot section and the target
+        language, so it is unchanged exactly when the pivot fingerprint is.
+        """
+        return {
+            key: self._cache_key(language, f"translate:{fingerprint}")
+            for key, fingerprint in source_fingerprints.items()
+        }
+    
+    async def generate_full_book(
+        self,
+        language: str,
+        user_content: str = "",
+        total_pages: int = 60,
+        concurrency: Optional[int] = None,
+        completed: Optional[Dict[str, str]] = None,
+        on_section: Optional[Callable[[str, str, int, int], Awaitable[None]]] = None,
+        regenerate: Optional[Set[str]] = None,
+        references: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        """Generate complete book with all chapters
+        
+        The title page, TOC and chapters are generated concurrently, bounded by
+        ``concurrency`` (defaults to the generator setting; 1 means sequential).
+        Chapters are always assembled in chapter order.
+        
+        Sections are keyed ``title_page``, ``toc`` and ``chapter_<n>``. Sections
+        already present in ``completed`` are reused, which lets an interrupted
+        book resume; ``on_section(key, content, done, total)`` is awaited as
+        each new section finishes. Sections in ``regenerate`` bypass the
+        response cache so they get new text. ``references`` maps section keys
+        to the user material quoted in their prompts (see ``retrieval``).
+        """
+        regenerate = regenerate or set()
+        sections = [
+            (
+                "title_page",
+                lambda: self.generate_title_page(language, "title_page" not in regenerate)
+            ),
+            (
+                "toc",
+                lambda: self.generate_table_of_contents(
+                    language,
+                    user_content,
+                    "toc" not in regenerate,
+                    self._section_reference("toc", user_content, references, TOC_REFERENCE_CHARS)
+                )
+            ),
+        ] + [
+            (
+                f"chapter_{chapter['num']}",
+                lambda chapter=chapter: self.generate_chapter(
+                    chapter["num"],
+                    chapter["title"],
+                    language,
+                    user_content,
+                    chapter["pages"],
+                    f"chapter_{chapter['num']}" not in regenerate,
+                    self._section_reference(
+                        f"chapter_{chapter['num']}", user_content, references, CHAPTER_REFERENCE_CHARS
+                    )
+                )
+            )
+            for chapter in DEFAULT_CHAPTERS
+        ]
+        contents = await self._generate_sections(sections, concurrency, completed, on_section)
+        return assemble_book(contents, [(chapter["num"], chapter["title"]) for chapter in DEFAULT_CHAPTERS])
+    
+    async def _generate_sections(
+        self,
+        sections: List[Tuple[str, Callable[[], Awaitable[str]]]],
+        concurrency: Optional[int] = None,
+        completed: Optional[Dict[str, str]] = None,
+        on_section: Optional[Callable[[str, str, int, int], Awaitable[None]]] = None
+    ) -> Dict[str, str]:
+        """Run section generators concurrently, skipping sections already completed"""
+        limit = asyncio.Semaphore(max(1, concurrency or self.concurrency))
+        completed = dict(completed or {})
+        keys = [key for key, _ in sections]
+        total = len(sections)
+        done = sum(1 for key in completed if key in keys)
         
-        return result
+        async def section(key: str, generate: Callable[[], Awaitable[str]]) -> str:
+            nonlocal done
+            if key in completed:
+                return completed[key]
+            async with limit:
+                content = await generate()
+            done += 1
+            if on_section:
+                await on_section(key, content, done, total)
+            return content
+        
+        tasks = [asyncio.ensure_future(section(key, generate)) for key, generate in sections]
+        try:
+            contents = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return dict(zip(keys, contents))
+    
+    @staticmethod
+    def _translation_prompt(text: str, language: str) -> str:
+        language_name = LANGUAGE_CONFIGS.get(language.lower(), LANGUAGE_CONFIGS["english"])["name"]
+        return f"""Rewrite the following section of our Bollywood-style Cloud Computing book in {language_name}.
+
+**RULES:**
+1. Keep the exact structure: headings, "Page N" markers, lists, tables and emojis
+2. Keep technical terms (AWS, IaaS, Kubernetes, etc.) in English where students would
+3. Keep every technical statement 100% accurate - do not add or drop content
+4. Adapt jokes, memes and filmy dialogues so they land naturally for {language_name} readers
+5. Output only the rewritten section
+
+**SECTION:**
+{text}"""
+    
+    async def translate_section(self, key: str, text: str, language: str, use_cache: bool = True) -> str:
+        """Produce one section in another language from its pivot-language text"""
+        return await self._complete(
+            language,
+            f"translate_{key}_{language}",
+            self._translation_prompt(text, language),
+            use_cache,
+            estimate_tokens(text)
+        )
+    
+    async def translate_book(
+        self,
+        pivot_book: Dict[str, Any],
+        language: str,
+        concurrency: Optional[int] = None,
+        completed: Optional[Dict[str, str]] = None,
+        on_section: Optional[Callable[[str, str, int, int], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Produce a book in ``language`` from a finished book in a pivot language
+        
+        The pivot book fixes the structure (sections, chapter list, page
+        layout); only the text of each section is generated for the target
+        language. Resuming and progress work as in ``generate_full_book``.
+        """
+        sections = [
+            (key, lambda key=key, text=text: self.translate_section(key, text, language))
+            for key, text in book_sections(pivot_book).items()
+        ]
+        contents = await self._generate_sections(sections, concurrency, completed, on_section)
+        return assemble_book(contents, [(c["number"], c["title"]) for c in pivot_book.get("chapters", [])])
@@ -0,0 +1,146 @@
+"""
+Storage of generated books, one document per chapter
+db.books holds each book's metadata, front matter and chapter list (number,
+title, size); chapter texts live in db.book_chapters and are only read when a
+chapter or the whole book is needed. Large text fields are stored
+zlib-compressed. Books saved before the split keep their nested ``data``
+document and are read transparently.
+"""
+import os
+import zlib
+from typing import Dict, List, Optional
+
+from bson.binary import Binary
+
+BOOK_COMPRESS_MIN_BYTES = int(os.environ.get('BOOK_COMPRESS_MIN_BYTES', '4096'))
+BOOK_COMPRESS_LEVEL = int(os.environ.get('BOOK_COMPRESS_LEVEL', '6'))
+
+
+def pack_text(field: str, text: str, min_bytes: int = BOOK_COMPRESS_MIN_BYTES) -> Dict:
+    """``{field: text}``, or ``{field_z: zlib bytes}`` when the text is large enough to compress"""
+    encoded = text.encode("utf-8")
+    if min_bytes < 0 or len(encoded) < min_bytes:
+        return {field: text}
+    return {f"{field}_z": Binary(zlib.compress(encoded, BOOK_COMPRESS_LEVEL))}
+
+
+def unpack_text(doc: Dict, field: str) -> str:
+    if f"{field}_z" in doc:
+        return zlib.decompress(doc[f"{field}_z"]).decode("utf-8")
+    return doc.get(field, "")
+
+
+def _chapter_summary(chapter: Dict) -> Dict:
+    return {"number": chapter["number"], "title": chapter["title"], "chars": len(chapter["content"])}
+
+
+class BookStore:
+    def __init__(self, db, compress_min_bytes: int = BOOK_COMPRESS_MIN_BYTES):
+        self.books = db.books
+        self.chapters = db.book_chapters
+        self.compress_min_bytes = compress_min_bytes  # negative disables compression
+
+    async def ensure_indexes(self):
+        await self.books.create_index("book_id", unique=True)
+        await self.books.create_index([("root_book_id", 1), ("revision", 1)])
+        await self.chapters.create_index([("book_id", 1), ("number", 1)], unique=True)
+
+    async def save(self, book_doc: Dict, book_data: Dict):
+        """Store a book: chapters first, so a visible book never misses one"""
+        book_id = book_doc["book_id"]
+        chapters = book_data.get("chapters", [])
+        for chapter in chapters:
+            await self.chapters.replace_one(
+                {"book_id": book_id, "number": chapter["number"]},
+                {
+                    "book_id": book_id,
+                    "number": chapter["number"],
+                    "title": chapter["title"],
+                    **pack_text("content", chapter["content"], self.compress_min_bytes)
+                },
+                upsert=True
+            )
+        # A resumed or replaced book may have had more chapters
+        await self.chapters.delete_many({
+            "book_id": book_id,
+            "number": {"$nin": [chapter["number"] for chapter in chapters]}
+        })
+
+        doc = {
+            **{key: value for key, value in book_doc.items() if key != "data"},
+            **pack_text("title_page", book_data.get("title_page", ""), self.compress_min_bytes),
+            **pack_text("toc", book_data.get("toc", ""), self.compress_min_bytes),
+            "chapters": [_chapter_summary(chapter) for chapter in chapters],
+            "storage": "chapters"
+        }
+        await self.books.replace_one({"book_id": book_id}, doc, upsert=True)
+
+    async def get(self, book_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """Book metadata (only ``fields`` when given), without any text"""
+        projection = {"_id": 0, "data": 0, "title_page": 0, "title_page_z": 0, "toc": 0, "toc_z": 0}
+        if fields is not None:
+            projection = {"_id": 0, **{field: 1 for field in fields}}
+        return await self.books.find_one({"book_id": book_id}, projection)
+
+    async def front_matter(self, book_id: str) -> Optional[Dict]:
+        """Title page, table of contents and chapter list (no chapter texts)"""
+        doc = await self.books.find_one(
+            {"book_id": book_id},
+            {"_id": 0, "book_id": 1, "language": 1, "storage": 1, "chapters": 1,
+             "title_page": 1, "title_page_z": 1, "toc": 1, "toc_z": 1, "data": 1}
+        )
+        if doc is None:
+            return None
+        if doc.get("storage") != "chapters":
+            data = doc.get("data", {})
+            return {
+                "title_page": data.get("title_page", ""),
+                "toc": data.get("toc", ""),
+                "chapters": [_chapter_summary(chapter) for chapter in data.get("chapters", [])]
+            }
+        return {
+            "title_page": unpack_text(doc, "title_page"),
+            "toc": unpack_text(doc, "toc"),
+            "chapters": doc.get("chapters", [])
+        }
+
+    async def get_chapter(self, book_id: str, number: int) -> Optional[Dict]:
+        doc = await self.chapters.find_one({"book_id": book_id, "number": number}, {"_id": 0})
+        if doc is not None:
+            return {"number": doc["number"], "title": doc["title"], "content": unpack_text(doc, "content")}
+
+        # Books stored before the split
+        legacy = await self.books.find_one(
+            {"book_id": book_id, "storage": {"$exists": False}},
+            {"_id": 0, "data.chapters": 1}
+        )
+        for chapter in (legacy or {}).get("data", {}).get("chapters", []):
+            if chapter["number"] == number:
+                return chapter
+        return None
+
+    async def load(self, book_id: str) -> Optional[Dict]:
+        """Full book data (title_page, toc, chapters with content), as generate_full_book returns it"""
+        doc = await self.books.find_one(
+            {"book_id": book_id},
+            {"_id": 0, "storage": 1, "chapters": 1, "title_page": 1, "title_page_z": 1,
+             "toc": 1, "toc_z": 1, "data": 1}
+        )
+        if doc is None:
+            return None
+        if doc.get("storage") != "chapters":
+            return doc.get("data")
+
+        order = [chapter["number"] for chapter in doc.get("chapters", [])]
+        texts = {}
+        async for chapter in self.chapters.find({"book_id": book_id}, {"_id": 0, "book_id": 0}):
+            texts[chapter["number"]] = {
+                "number": chapter["number"],
+                "title": chapter["title"],
+                "content": unpack_text(chapter, "content")
+            }
+        return {
+            "title_page": unpack_text(doc, "title_page"),
+            "toc": unpack_text(doc, "toc"),
+            "chapters": [texts[number] for number in order if number in texts]
+        }
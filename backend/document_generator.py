@@ -4,49 +4,222 @@ Document generation utilities for PDF, DOCX, and Markdown
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, HRFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+from xml.sax.saxutils import escape
+import PyPDF2
 import markdown
 import os
-from typing import Dict
+import re
+import tempfile
+
+# Processes rendering the chapters of one PDF (1 renders in the calling process)
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Books with fewer chapters are not worth the process round trips
+PDF_PARALLEL_MIN_CHAPTERS = int(os.environ.get('PDF_PARALLEL_MIN_CHAPTERS', '4'))
+PDF_FONT_DIRS = os.environ.get('PDF_FONT_DIRS', '/usr/share/fonts:/usr/local/share/fonts').split(':')
+
+# Rendered documents go to a path or an open binary file
+Output = Union[str, BinaryIO]
+
+# Start of a "Page N" block (same markers book_generator.split_pages uses)
+PAGE_MARKER = re.compile(r'^[ \t#*]*Page\s+\d+\b', re.MULTILINE)
+SEPARATOR_LINE = re.compile(r'^\s*[━─=_-]{5,}\s*$')
+
+# Unicode block and Noto font files for each Indic script the book languages use
+SCRIPT_FONTS = {
+    "devanagari": ((0x0900, 0x097F), ["NotoSansDevanagari-Regular.ttf", "Lohit-Devanagari.ttf"]),
+    "bengali": ((0x0980, 0x09FF), ["NotoSansBengali-Regular.ttf", "Lohit-Bengali.ttf"]),
+    "gurmukhi": ((0x0A00, 0x0A7F), ["NotoSansGurmukhi-Regular.ttf", "Lohit-Gurmukhi.ttf"]),
+    "gujarati": ((0x0A80, 0x0AFF), ["NotoSansGujarati-Regular.ttf", "Lohit-Gujarati.ttf"]),
+    "tamil": ((0x0B80, 0x0BFF), ["NotoSansTamil-Regular.ttf", "Lohit-Tamil.ttf"]),
+    "telugu": ((0x0C00, 0x0C7F), ["NotoSansTelugu-Regular.ttf", "Lohit-Telugu.ttf"]),
+    "kannada": ((0x0C80, 0x0CFF), ["NotoSansKannada-Regular.ttf", "Lohit-Kannada.ttf"]),
+    "malayalam": ((0x0D00, 0x0D7F), ["NotoSansMalayalam-Regular.ttf", "Lohit-Malayalam.ttf"]),
+}
+
+def detect_script(text: str, sample_chars: int = 4000) -> Optional[str]:
+    """Most common Indic script in the start of ``text`` (None for Latin-only text)"""
+    counts = dict.fromkeys(SCRIPT_FONTS, 0)
+    for char in text[:sample_chars]:
+        code = ord(char)
+        if code < 0x0900 or code > 0x0D7F:
+            continue
+        for script, ((low, high), _) in SCRIPT_FONTS.items():
+            if low <= code <= high:
+                counts[script] += 1
+                break
+    script = max(counts, key=counts.get)
+    return script if counts[script] else None
+
+
+@lru_cache(maxsize=None)
+def register_script_font(script: Optional[str]) -> str:
+    """Name of a registered font covering ``script``, registered once per process
+
+    Falls back to Helvetica when no font file for the script is installed.
+    """
+    if script is None:
+        return "Helvetica"
+    for font_dir in PDF_FONT_DIRS:
+        root = Path(font_dir)
+        if not root.is_dir():
+            continue
+        for file_name in SCRIPT_FONTS[script][1]:
+            match = next(root.rglob(file_name), None)
+            if match is not None:
+                font_name = match.stem
+                pdfmetrics.registerFont(TTFont(font_name, str(match)))
+                return font_name
+    return "Helvetica"
+
+
+@lru_cache(maxsize=None)
+def pdf_styles(font_name: str = "Helvetica") -> Dict[str, ParagraphStyle]:
+    """Paragraph styles for book PDFs, built once per font"""
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor='#FF6B6B',
+            spaceAfter=30,
+            alignment=TA_CENTER,
+        ),
+        "heading": ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor='#4ECDC4',
+            spaceAfter=12,
+        ),
+        "page": ParagraphStyle(
+            'PageHeading',
+            parent=styles['Normal'],
+            fontName=font_name if font_name != "Helvetica" else "Helvetica-Bold",
+            fontSize=12,
+            leading=15,
+            spaceBefore=10,
+            spaceAfter=4,
+            keepWithNext=True,
+        ),
+        "body": ParagraphStyle(
+            'BookBody',
+            parent=styles['Normal'],
+            fontName=font_name,
+            fontSize=11,
+            leading=14,
+            spaceAfter=6,
+        ),
+    }
+
+
+def text_flowables(text: str, styles: Dict[str, ParagraphStyle]) -> List:
+    """One flowable per paragraph of ``text``, with ``Page N`` markers and rules as their own"""
+    elements = []
+    for para in text.split('\n\n'):
+        lines = []
+        for line in para.split('\n'):
+            if SEPARATOR_LINE.match(line) or PAGE_MARKER.match(line):
+                if any(l.strip() for l in lines):
+                    elements.append(Paragraph('<br/>'.join(lines), styles["body"]))
+                lines = []
+                if PAGE_MARKER.match(line):
+                    elements.append(Paragraph(escape(line.strip(' \t#*')), styles["page"]))
+                else:
+                    elements.append(HRFlowable(width="100%", thickness=0.5, color='#CCCCCC', spaceBefore=2, spaceAfter=4))
+            else:
+                lines.append(escape(line))
+        if any(l.strip() for l in lines):
+            elements.append(Paragraph('<br/>'.join(lines), styles["body"]))
+    return elements
+
+
+def _pdf_template(output_path: Output) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
+        output_path,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=18,
+    )
+
+
+def _front_matter_flowables(book_data: Dict, styles: Dict[str, ParagraphStyle]) -> List:
+    elements = [
+        Paragraph("📚 Bollywood Cloud Computing Book", styles["title"]),
+        Spacer(1, 0.2 * inch),
+        *text_flowables(book_data.get("title_page", ""), styles),
+        PageBreak(),
+        Paragraph("📖 Table of Contents", styles["heading"]),
+        *text_flowables(book_data.get("toc", ""), styles),
+        PageBreak(),
+    ]
+    return elements
+
+
+def _chapter_flowables(chapter: Dict, styles: Dict[str, ParagraphStyle]) -> List:
+    return [
+        Paragraph(escape(f"Chapter {chapter['number']}: {chapter['title']}"), styles["heading"]),
+        Spacer(1, 0.2 * inch),
+        *text_flowables(chapter["content"], styles),
+        PageBreak(),
+    ]
+
+
+def render_pdf_part(book_data: Dict, chapters: List[Dict], script: Optional[str], output_path: Output, front_matter: bool) -> Output:
+    """Render the front matter and/or some chapters to their own PDF (also run in worker processes)"""
+    styles = pdf_styles(register_script_font(script))
+    elements = _front_matter_flowables(book_data, styles) if front_matter else []
+    for chapter in chapters:
+        elements.extend(_chapter_flowables(chapter, styles))
+    _pdf_template(output_path).build(elements)
+    return output_path
+
 
 class DocumentGenerator:
+    @staticmethod
+    def iter_markdown(book_data: Dict) -> Iterator[str]:
+        """Markdown of the book as a sequence of chunks, one per section"""
+        yield "# 📚 Bollywood Cloud Computing Book\n\n"
+        yield book_data.get("title_page", "") + "\n"
+        yield "\n---\n\n"
+        
+        yield "## 📖 Table of Contents\n\n"
+        yield book_data.get("toc", "") + "\n"
+        yield "\n---\n"
+        
+        for chapter in book_data.get("chapters", []):
+            yield f"\n\n## Chapter {chapter['number']}: {chapter['title']}\n\n"
+            yield chapter["content"] + "\n"
+            yield "\n---\n"
+    
     @staticmethod
     def generate_markdown(book_data: Dict, output_path: str) -> str:
         """Generate Markdown file from book data"""
         try:
-            md_content = []
-            
-            # Title Page
-            md_content.append("# " + "📚 Bollywood Cloud Computing Book\n")
-            md_content.append(book_data.get("title_page", ""))
-            md_content.append("\n---\n")
-            
-            # Table of Contents
-            md_content.append("## 📖 Table of Contents\n")
-            md_content.append(book_data.get("toc", ""))
-            md_content.append("\n---\n")
-            
-            # Chapters
-            for chapter in book_data.get("chapters", []):
-                md_content.append(f"\n## Chapter {chapter['number']}: {chapter['title']}\n")
-                md_content.append(chapter["content"])
-                md_content.append("\n---\n")
-            
-            # Write to file
             with open(output_path, 'w', encoding='utf-8') as f:
-                f.write("\n".join(md_content))
+                for chunk in DocumentGenerator.iter_markdown(book_data):
+                    f.write(chunk)
             
             return output_path
         except Exception as e:
             raise Exception(f"Error generating Markdown: {str(e)}")
     
     @staticmethod
-    def generate_docx(book_data: Dict, output_path: str) -> str:
-        """Generate DOCX file from book data"""
+    def generate_docx(book_data: Dict, output_path: Output) -> Output:
+        """Generate DOCX file from book data (``output_path`` may also be a binary file object)"""
         try:
             doc = Document()
             
@@ -94,80 +267,50 @@ class DocumentGenerator:
             raise Exception(f"Error generating DOCX: {str(e)}")
     
     @staticmethod
-    def generate_pdf(book_data: Dict, output_path: str) -> str:
-        """Generate PDF file from book data"""
+    def generate_pdf(book_data: Dict, output_path: Output, workers: int = PDF_RENDER_WORKERS) -> Output:
+        """Generate PDF file from book data (``output_path`` may also be a binary file object)
+        
+        Chapters are laid out as one flowable per paragraph. With several
+        workers, the front matter and groups of chapters are rendered in
+        parallel processes and the parts merged in order.
+        """
         try:
-            doc = SimpleDocTemplate(
-                output_path,
-                pagesize=A4,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=18,
-            )
-            
-            # Container for the 'Flowable' objects
-            elements = []
-            
-            # Define styles
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor='#FF6B6B',
-                spaceAfter=30,
-                alignment=TA_CENTER,
-            )
+            chapters = book_data.get("chapters", [])
+            sample = book_data.get("title_page", "") + "".join(c["content"][:1000] for c in chapters[:3])
+            script = detect_script(sample)
             
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=16,
-                textColor='#4ECDC4',
-                spaceAfter=12,
-            )
+            if workers <= 1 or len(chapters) < PDF_PARALLEL_MIN_CHAPTERS:
+                return render_pdf_part(book_data, chapters, script, output_path, front_matter=True)
             
-            normal_style = styles['Normal']
-            normal_style.fontSize = 11
-            normal_style.leading = 14
+            # Contiguous chapter groups, one per worker, so parts merge in book order
+            per_group = -(-len(chapters) // workers)
+            groups = [chapters[i:i + per_group] for i in range(0, len(chapters), per_group)]
             
-            # Title Page
-            elements.append(Paragraph("📚 Bollywood Cloud Computing Book", title_style))
-            elements.append(Spacer(1, 0.2 * inch))
-            
-            title_text = book_data.get("title_page", "").replace('\n', '<br/>')
-            elements.append(Paragraph(title_text, normal_style))
-            elements.append(PageBreak())
-            
-            # Table of Contents
-            elements.append(Paragraph("📖 Table of Contents", heading_style))
-            toc_text = book_data.get("toc", "").replace('\n', '<br/>')
-            elements.append(Paragraph(toc_text, normal_style))
-            elements.append(PageBreak())
-            
-            # Chapters
-            for chapter in book_data.get("chapters", []):
-                chapter_title = f"Chapter {chapter['number']}: {chapter['title']}"
-                elements.append(Paragraph(chapter_title, heading_style))
-                elements.append(Spacer(1, 0.2 * inch))
-                
-                # Add chapter content
-                content = chapter["content"].replace('\n\n', '<br/><br/>')
-                content = content.replace('\n', '<br/>')
+            # A pool per render: this already runs in a render worker, which must not keep children alive
+            part_root = os.path.dirname(output_path) or None if isinstance(output_path, str) else None
+            with tempfile.TemporaryDirectory(dir=part_root) as part_dir, \
+                    ProcessPoolExecutor(max_workers=len(groups)) as pool:
+                futures = [
+                    pool.submit(
+                        render_pdf_part,
+                        book_data if n == 0 else {},
+                        group,
+                        script,
+                        os.path.join(part_dir, f"part_{n:03d}.pdf"),
+                        n == 0
+                    )
+                    for n, group in enumerate(groups)
+                ]
+                parts = [future.result() for future in futures]
                 
-                # Handle special characters
-                content = content.replace('&', '&amp;')
-                content = content.replace('<', '&lt;').replace('>', '&gt;')
-                content = content.replace('<br/>', '<br/>').replace('&lt;br/&gt;', '<br/>')
-                
-                elements.append(Paragraph(content, normal_style))
-                elements.append(PageBreak())
-            
-            # Build PDF
-            doc.build(elements)
+                writer = PyPDF2.PdfWriter()
+                for part in parts:
+                    writer.append(part)
+                if isinstance(output_path, str):
+                    with open(output_path, 'wb') as f:
+                        writer.write(f)
+                else:
+                    writer.write(output_path)
             return output_path
         except Exception as e:
             raise Exception(f"Error generating PDF: {str(e)}")
@@ -4,21 +4,80 @@ File processing utilities for slides, notes, and YouTube transcripts
 import PyPDF2
 from docx import Document
 from pptx import Presentation
-from youtube_transcript_api import YouTubeTranscriptApi
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
 import re
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Set
+
+from pymongo.errors import BulkWriteError
+
+from metrics import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Extraction pool settings (EXTRACTION_WORKERS=0 extracts inline on the event loop)
+DEFAULT_EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', str(min(4, os.cpu_count() or 1))))
+DEFAULT_EXTRACTION_CONCURRENCY = int(os.environ.get('EXTRACTION_MAX_CONCURRENT', str(DEFAULT_EXTRACTION_WORKERS or 1)))
+DEFAULT_EXTRACTION_TIMEOUT = float(os.environ.get('EXTRACTION_TIMEOUT', '120'))
+DEFAULT_PAGES_PER_SHARD = int(os.environ.get('EXTRACTION_PAGES_PER_SHARD', '20'))
+
+# Formats extracted page by page (PDF pages, PPTX slides)
+PAGED_FORMATS = {"pdf", "pptx"}
+
+# Workers are forked from a clean server process (or spawned where there is
+# none), never from the threaded server process itself
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _MP_CONTEXT = multiprocessing.get_context("forkserver")
+    _MP_CONTEXT.set_forkserver_preload([__name__])
+else:
+    _MP_CONTEXT = multiprocessing.get_context("spawn")
+
+EXTRACTION_SECONDS = Histogram(
+    "extraction_duration_seconds",
+    "Time to extract the text of one uploaded file, waiting for a pool slot included",
+    ["file_type"]
+)
+EXTRACTIONS_IN_PROGRESS = Gauge(
+    "extractions_in_progress",
+    "Files whose text is being extracted",
+    ["file_type"]
+)
+
+# The last paged document parsed in this process, as ((path, type, mtime, size), pages)
+_last_parsed: Optional[tuple] = None
+
+
+def _parsed_pages(file_path: str, file_type: str):
+    """Pages (PDF) or slides (PPTX) of a file, parsing it only once per process and version
+
+    Counting and every shard of one file that run in the same process share
+    the parse; the PDF is read into memory so no file handle outlives the call.
+    """
+    global _last_parsed
+    stat = os.stat(file_path)
+    key = (file_path, file_type, stat.st_mtime_ns, stat.st_size)
+    if _last_parsed is None or _last_parsed[0] != key:
+        _last_parsed = None
+        if file_type == "pdf":
+            with open(file_path, 'rb') as file:
+                pages = PyPDF2.PdfReader(io.BytesIO(file.read())).pages
+        elif file_type == "pptx":
+            pages = Presentation(file_path).slides
+        else:
+            raise ValueError(f"Unsupported paged file type: {file_type}")
+        _last_parsed = (key, pages)
+    return _last_parsed[1]
+
 
 class FileProcessor:
     @staticmethod
     def extract_pdf_text(file_path: str) -> str:
         """Extract text from PDF file"""
         try:
-            text = []
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text.append(page.extract_text())
-            return "\n".join(text)
+            return FileProcessor.join_pages("pdf", FileProcessor.iter_pages(file_path, "pdf"))
         except Exception as e:
             raise Exception(f"Error extracting PDF: {str(e)}")
     
@@ -39,16 +98,48 @@ class FileProcessor:
     def extract_pptx_text(file_path: str) -> str:
         """Extract text from PowerPoint file"""
         try:
-            prs = Presentation(file_path)
-            text = []
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        text.append(shape.text)
-            return "\n".join(text)
+            return FileProcessor.join_pages("pptx", FileProcessor.iter_pages(file_path, "pptx"))
         except Exception as e:
             raise Exception(f"Error extracting PPTX: {str(e)}")
     
+    @staticmethod
+    def count_pages(file_path: str, file_type: str) -> int:
+        """Number of pages (PDF) or slides (PPTX) in a file"""
+        if file_type not in PAGED_FORMATS:
+            raise ValueError(f"Unsupported paged file type: {file_type}")
+        try:
+            return len(_parsed_pages(file_path, file_type))
+        except Exception as e:
+            raise Exception(f"Error extracting {file_type.upper()}: {str(e)}")
+    
+    @staticmethod
+    def iter_pages(file_path: str, file_type: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Yield the text of pages (PDF) or slides (PPTX) start..end-1 one at a time"""
+        pages = _parsed_pages(file_path, file_type)
+        for n in range(start, len(pages) if end is None else min(end, len(pages))):
+            if file_type == "pdf":
+                yield pages[n].extract_text() or ""
+            else:
+                yield "\n".join(
+                    shape.text for shape in pages[n].shapes
+                    if hasattr(shape, "text") and shape.text.strip()
+                )
+    
+    @staticmethod
+    def extract_pages(file_path: str, file_type: str, start: int, end: int) -> List[str]:
+        """Extract a range of pages; one shard of a page-parallel extraction"""
+        try:
+            return list(FileProcessor.iter_pages(file_path, file_type, start, end))
+        except Exception as e:
+            raise Exception(f"Error extracting {file_type.upper()} pages {start + 1}-{end}: {str(e)}")
+    
+    @staticmethod
+    def join_pages(file_type: str, pages) -> str:
+        """Merge page texts into the document text (slides without text are skipped)"""
+        if file_type == "pptx":
+            return "\n".join(page for page in pages if page)
+        return "\n".join(pages)
+    
     @staticmethod
     def extract_txt_text(file_path: str) -> str:
         """Extract text from TXT file"""
@@ -81,25 +172,14 @@ class FileProcessor:
     
     @staticmethod
     async def get_youtube_transcript(url: str) -> str:
-        """Get transcript from YouTube video or playlist"""
+        """Get transcript from YouTube video or playlist (uncached; see youtube_ingest)"""
+        from youtube_ingest import TranscriptFetcher
+        
+        fetcher = TranscriptFetcher()
         try:
-            # Check if it's a playlist
-            playlist_id = FileProcessor.extract_playlist_id(url)
-            if playlist_id:
-                return f"Playlist processing not fully implemented yet. Playlist ID: {playlist_id}\nNote: Extract individual video IDs from playlist and process each."
-            
-            # Single video
-            video_id = FileProcessor.extract_youtube_video_id(url)
-            if not video_id:
-                raise ValueError("Invalid YouTube URL")
-            
-            # Get transcript
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-            transcript_text = " ".join([entry['text'] for entry in transcript_list])
-            
-            return transcript_text
-        except Exception as e:
-            raise Exception(f"Error getting YouTube transcript: {str(e)}")
+            return await fetcher.get_transcript(url)
+        finally:
+            fetcher.shutdown()
     
     @staticmethod
     def process_file(file_path: str, file_type: str) -> str:
@@ -114,3 +194,222 @@ class FileProcessor:
             return FileProcessor.extract_txt_text(file_path)
         else:
             raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def _worker_main(conn):
+    """Run the (fn, args) jobs received on conn one at a time, sending back (ok, result or error)"""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        fn, args = job
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+class _WorkerProcess:
+    """One extraction process; a job that has to be stopped is stopped by killing its process"""
+    
+    def __init__(self):
+        self._conn, child_conn = _MP_CONTEXT.Pipe()
+        self.process = _MP_CONTEXT.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+    
+    async def run(self, fn, *args) -> tuple:
+        """Send one job and wait (without a thread) until its outcome can be read"""
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = self._conn.fileno()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            self._conn.send((fn, args))
+            await readable
+        finally:
+            loop.remove_reader(fd)
+        try:
+            return self._conn.recv()
+        except EOFError:
+            raise Exception(f"Extraction worker exited with code {self.process.exitcode}")
+    
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self._conn.close()
+    
+    def close(self):
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self._conn.close()
+
+
+class ExtractionPool:
+    """Runs FileProcessor.process_file in worker processes so parsing never blocks the event loop
+    
+    PDFs are split into page ranges that are extracted in parallel and merged
+    in order. With a ``page_cache`` collection, each
+    extracted page is saved by file hash and page index, so a failed or
+    repeated extraction only redoes the pages it is missing. A file that runs
+    past the timeout has its jobs killed along with their worker processes;
+    the other workers, and the files they are extracting, are not affected.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_EXTRACTION_WORKERS,
+        max_concurrent: int = DEFAULT_EXTRACTION_CONCURRENCY,
+        timeout: float = DEFAULT_EXTRACTION_TIMEOUT,
+        pages_per_shard: int = DEFAULT_PAGES_PER_SHARD,
+        page_cache=None
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.pages_per_shard = max(1, pages_per_shard)
+        self.page_cache = page_cache
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        # Worker processes are started on first use and reused until killed
+        self._workers = asyncio.Semaphore(max(1, max_workers))
+        self._idle: List[_WorkerProcess] = []
+        self._shards: Set[asyncio.Task] = set()
+    
+    async def ensure_indexes(self):
+        if self.page_cache is not None:
+            await self.page_cache.create_index([("content_hash", 1), ("page", 1)], unique=True)
+    
+    async def process_file(self, file_path: str, file_type: str, content_hash: Optional[str] = None) -> str:
+        """Extract text in the pool, waiting for a free slot and enforcing the per-file timeout"""
+        with EXTRACTIONS_IN_PROGRESS.track_inprogress(file_type=file_type), \
+                EXTRACTION_SECONDS.time(file_type=file_type):
+            return await self._process_file(file_path, file_type, content_hash)
+    
+    async def _process_file(self, file_path: str, file_type: str, content_hash: Optional[str] = None) -> str:
+        async with self._semaphore:
+            deadline = asyncio.get_running_loop().time() + self.timeout
+            if file_type in PAGED_FORMATS:
+                pages = await self._extract_paged(deadline, file_path, file_type, content_hash)
+                return FileProcessor.join_pages(file_type, pages)
+            return await self._call(deadline, FileProcessor.process_file, file_path, file_type)
+    
+    async def _extract_paged(
+        self,
+        deadline: float,
+        file_path: str,
+        file_type: str,
+        content_hash: Optional[str] = None
+    ) -> List[str]:
+        """Page texts in order, with runs of uncached PDF pages extracted in parallel
+        
+        Workers keep the file they parsed last, and the worker that counted the
+        pages is the next one handed out, so the first shard reuses its parse.
+        Loading a PPTX parses the whole package, so its slides are one shard.
+        """
+        total = await self._call(deadline, FileProcessor.count_pages, file_path, file_type)
+        cached = await self._cached_pages(content_hash)
+        pages_per_shard = self.pages_per_shard if file_type == "pdf" else max(1, total)
+        
+        # Cached pages are served as is; runs of missing pages become shards
+        plan = []
+        page = 0
+        while page < total:
+            if page in cached:
+                plan.append((page, None))
+                page += 1
+                continue
+            end = page + 1
+            while end < total and end not in cached and end - page < pages_per_shard:
+                end += 1
+            shard = asyncio.ensure_future(
+                self._extract_shard(deadline, file_path, file_type, content_hash, page, end)
+            )
+            # Finished shards are cached even if this extraction fails or is abandoned
+            self._shards.add(shard)
+            shard.add_done_callback(self._shards.discard)
+            plan.append((page, shard))
+            page = end
+        
+        pages = []
+        try:
+            for page, shard in plan:
+                pages.extend([cached[page]] if shard is None else await asyncio.shield(shard))
+        except Exception:
+            # The file has failed; stop its other shards instead of letting them run to the deadline
+            for _, shard in plan:
+                if shard is not None:
+                    shard.cancel()
+            raise
+        return pages
+    
+    async def _call(self, deadline: float, fn, *args):
+        """Run fn(*args) in a worker process, killing the process if the job is still running at the deadline"""
+        if self.max_workers <= 0:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        async with self._workers:
+            worker = self._idle.pop() if self._idle else _WorkerProcess()
+            try:
+                ok, result = await asyncio.wait_for(worker.run(fn, *args), timeout=max(0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                logger.warning(f"Extraction timed out; stopping worker {worker.process.pid}")
+                worker.kill()
+                raise Exception(f"Extraction timed out after {self.timeout:.0f}s")
+            except BaseException:
+                # Cancelled mid-job or the worker died: it cannot take another job
+                worker.kill()
+                raise
+            self._idle.append(worker)
+        if not ok:
+            raise result
+        return result
+    
+    async def _extract_shard(
+        self,
+        deadline: float,
+        file_path: str,
+        file_type: str,
+        content_hash: Optional[str],
+        start: int,
+        end: int
+    ) -> List[str]:
+        pages = await self._call(deadline, FileProcessor.extract_pages, file_path, file_type, start, end)
+        if content_hash and self.page_cache is not None:
+            try:
+                await self.page_cache.insert_many(
+                    [{"content_hash": content_hash, "page": start + n, "text": text} for n, text in enumerate(pages)],
+                    ordered=False
+                )
+            except BulkWriteError:
+                # Cached by a concurrent extraction of the same file
+                pass
+            except Exception as e:
+                logger.warning(f"Could not cache extracted pages: {str(e)}")
+        return pages
+    
+    async def _cached_pages(self, content_hash: Optional[str]) -> Dict[int, str]:
+        if not content_hash or self.page_cache is None:
+            return {}
+        try:
+            return {
+                doc["page"]: doc["text"]
+                async for doc in self.page_cache.find({"content_hash": content_hash}, {"_id": 0, "page": 1, "text": 1})
+            }
+        except Exception as e:
+            logger.warning(f"Could not read cached pages: {str(e)}")
+            return {}
+    
+    async def discard_pages(self, content_hash: str):
+        """Drop the cached pages of a file that is no longer stored"""
+        if self.page_cache is not None:
+            await self.page_cache.delete_many({"content_hash": content_hash})
+    
+    def shutdown(self):
+        for shard in list(self._shards):
+            shard.cancel()
+        while self._idle:
+            self._idle.pop().close()
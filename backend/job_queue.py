@@ -0,0 +1,182 @@
+"""
+Background job queue for book generation
+Jobs live in db.generations so their state survives restarts and is visible
+through the status endpoint
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.environ.get('BOOK_JOB_WORKERS', '2'))
+DEFAULT_LEASE_SECONDS = float(os.environ.get('BOOK_JOB_LEASE_SECONDS', '120'))
+DEFAULT_POLL_INTERVAL = float(os.environ.get('BOOK_JOB_POLL_INTERVAL', '5'))
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get('BOOK_JOB_MAX_ATTEMPTS', '3'))
+
+# Job states as stored in db.generations.status
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+JobHandler = Callable[[Dict, Callable[[Dict], Awaitable[None]]], Awaitable[None]]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class BookJobQueue:
+    """Mongo-backed work queue with leases
+
+    A worker claims a job by atomically flipping it from ``queued`` to
+    ``running`` and taking a lease. The lease is renewed while the job runs;
+    a job whose lease expires (e.g. the process was restarted mid-book) is
+    claimed again and the handler resumes from the partial results it saved.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handler: JobHandler,
+        workers: int = DEFAULT_WORKERS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    ):
+        self.collection = collection
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max(1, max_attempts)
+        self.worker_id = uuid.uuid4().hex
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def enqueue(self, book_id: str, fields: Dict) -> Dict:
+        """Insert a queued job and wake up an idle worker"""
+        job = {
+            **fields,
+            "book_id": book_id,
+            "status": QUEUED,
+            "progress": 0,
+            "attempts": 0,
+            "created_at": _now().isoformat()
+        }
+        await self.collection.insert_one(job)
+        self._wakeup.set()
+        return job
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("book_id", unique=True)
+        await self.collection.create_index([("status", 1), ("created_at", 1)])
+
+    def start(self):
+        """Start worker tasks on the running event loop"""
+        if self._tasks:
+            return
+        for n in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker_loop(n)))
+        logger.info(f"Started {self.workers} book job workers ({self.worker_id})")
+
+    async def stop(self):
+        """Cancel worker tasks; running jobs are picked up again after their lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self) -> Optional[Dict]:
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED},
+                    {"status": RUNNING, "lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "started_at": now.isoformat()
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _worker_loop(self, n: int):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {n} could not claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _update(self, book_id: str, fields: Dict):
+        await self.collection.update_one(
+            {"book_id": book_id, "worker_id": self.worker_id},
+            {"$set": {
+                **fields,
+                "lease_expires_at": _now() + timedelta(seconds=self.lease_seconds)
+            }}
+        )
+
+    async def _heartbeat(self, book_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self._update(book_id, {})
+
+    async def _run(self, job: Dict):
+        book_id = job["book_id"]
+        if job.get("attempts", 1) > self.max_attempts:
+            await self._update(book_id, {
+                "status": FAILED,
+                "error": f"Gave up after {self.max_attempts} attempts"
+            })
+            return
+
+        logger.info(f"Running book job {book_id} (attempt {job.get('attempts', 1)})")
+        heartbeat = asyncio.create_task(self._heartbeat(book_id))
+        try:
+            await self.handler(job, lambda fields: self._update(book_id, fields))
+            await self.collection.update_one(
+                {"book_id": book_id, "worker_id": self.worker_id},
+                {
+                    "$set": {
+                        "status": COMPLETED,
+                        "progress": 100,
+                        "completed_at": _now().isoformat()
+                    },
+                    "$unset": {"partial": "", "lease_expires_at": ""}
+                }
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Book job {book_id} failed: {str(e)}")
+            await self._update(book_id, {"status": FAILED, "error": str(e)})
+        finally:
+            heartbeat.cancel()
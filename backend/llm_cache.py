@@ -0,0 +1,187 @@
+"""
+Content-addressed cache for LLM responses
+Responses are keyed by a hash of the model, system message and prompt, so an
+identical title page, TOC or chapter request is served without an LLM call
+"""
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = float(os.environ.get('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+DEFAULT_MEMORY_ENTRIES = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES', '512'))
+DEFAULT_MEMORY_BYTES = int(os.environ.get('LLM_CACHE_MEMORY_BYTES', str(64 * 1024 * 1024)))
+DEFAULT_MONGO_ENTRIES = int(os.environ.get('LLM_CACHE_MONGO_ENTRIES', '50000'))
+
+
+def make_cache_key(model: str, system_message: str, prompt: str) -> str:
+    """Hash the full request so any change in model, language or prompt misses"""
+    digest = hashlib.sha256()
+    for part in (model, system_message, prompt):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so boundaries can't be shifted between fields
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class MemoryCacheTier:
+    """In-process LRU tier bounded by entry count and total response bytes"""
+    name = "memory"
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_bytes: int = DEFAULT_MEMORY_BYTES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, size = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MongoCacheTier:
+    """Persistent tier shared by all workers, expired by a Mongo TTL index"""
+    name = "mongo"
+
+    def __init__(
+        self,
+        collection,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MONGO_ENTRIES,
+        trim_every: int = 100
+    ):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.trim_every = trim_every
+        self._writes = 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("last_used_at")
+
+    async def get(self, key: str) -> Optional[str]:
+        now = datetime.now(timezone.utc)
+        doc = await self.collection.find_one_and_update(
+            {"key": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used_at": now}},
+            projection={"_id": 0, "value": 1}
+        )
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value: str):
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"key": key},
+            {"$set": {
+                "value": value,
+                "last_used_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            }},
+            upsert=True
+        )
+        self._writes += 1
+        if self._writes % self.trim_every == 0:
+            await self._trim()
+
+    async def _trim(self):
+        """Evict least recently used entries beyond max_entries"""
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        stale = await self.collection.find(
+            {}, {"_id": 1}
+        ).sort("last_used_at", 1).limit(excess).to_list(excess)
+        await self.collection.delete_many({"_id": {"$in": [d["_id"] for d in stale]}})
+
+
+class LlmResponseCache:
+    """Read-through cache over ordered tiers (fastest first)
+
+    A hit in a slower tier is copied into the faster tiers. Tier failures are
+    logged and treated as misses so the cache can never break generation.
+    """
+
+    def __init__(self, tiers: List):
+        self.tiers = tiers
+        self.hits: Dict[str, int] = {tier.name: 0 for tier in tiers}
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        for n, tier in enumerate(self.tiers):
+            try:
+                value = await tier.get(key)
+            except Exception as e:
+                logger.warning(f"LLM cache {tier.name} read failed: {str(e)}")
+                continue
+            if value is not None:
+                self.hits[tier.name] += 1
+                for faster in self.tiers[:n]:
+                    await self._set(faster, key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        for tier in self.tiers:
+            await self._set(tier, key, value)
+
+    async def _set(self, tier, key: str, value: str):
+        try:
+            await tier.set(key, value)
+        except Exception as e:
+            logger.warning(f"LLM cache {tier.name} write failed: {str(e)}")
+
+    async def ensure_indexes(self):
+        for tier in self.tiers:
+            if hasattr(tier, "ensure_indexes"):
+                await tier.ensure_indexes()
+
+    def stats(self) -> Dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "hits_by_tier": dict(self.hits),
+            "memory_entries": sum(len(t) for t in self.tiers if isinstance(t, MemoryCacheTier))
+        }
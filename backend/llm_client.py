@@ -0,0 +1,181 @@
+"""
+Pooled LLM client layer
+Every LLM call goes through one keep-alive HTTP connection pool (installed as
+litellm's shared async client, which LlmChat and the token-streaming path both
+use), in-flight calls are bounded by the pool size, and each call gets its
+own session ID so concurrent requests never share chat history
+
+Pooling relies on LlmChat (emergentintegrations, pinned in requirements.txt
+with litellm) calling litellm without a client of its own, so that litellm
+uses ``litellm.aclient_session``. tests/test_llm_client.py checks this when
+both packages are installed; re-run it after upgrading either of them.
+"""
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', '16'))
+LLM_KEEPALIVE_CONNECTIONS = int(os.environ.get('LLM_KEEPALIVE_CONNECTIONS', str(LLM_POOL_SIZE)))
+LLM_KEEPALIVE_SECONDS = float(os.environ.get('LLM_KEEPALIVE_SECONDS', '90'))
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', '10'))
+
+
+@dataclass
+class LlmUsage:
+    """LLM work done on behalf of one job or request (token counts are estimates)"""
+    calls: int = 0
+    cached: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # what the answers served from the cache would have cost
+    seconds: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def sections(self) -> int:
+        """Prompts answered, by the LLM or from the cache"""
+        return self.calls + self.cached
+
+    @property
+    def uncached_tokens(self) -> int:
+        """Tokens the same work costs without the response cache"""
+        return self.tokens + self.cached_tokens
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "tokens": self.tokens, "seconds": round(self.seconds, 2)}
+
+
+current_usage: ContextVar[Optional[LlmUsage]] = ContextVar("llm_usage", default=None)
+
+
+def track_usage() -> LlmUsage:
+    """Start accounting the LLM calls made from the current task (and tasks it starts)"""
+    usage = LlmUsage()
+    current_usage.set(usage)
+    return usage
+
+
+def record_usage(prompt_tokens: int = 0, completion_tokens: int = 0, seconds: float = 0.0, cached: bool = False):
+    usage = current_usage.get()
+    if usage is None:
+        return
+    if cached:
+        usage.cached += 1
+        usage.cached_tokens += prompt_tokens + completion_tokens
+        return
+    usage.calls += 1
+    usage.prompt_tokens += prompt_tokens
+    usage.completion_tokens += completion_tokens
+    usage.seconds += seconds
+
+
+def new_session_id(purpose: str) -> str:
+    """Session ID unique to one call, e.g. ``chapter_3_hindi_<uuid>``"""
+    return f"{purpose}_{uuid.uuid4().hex}"
+
+
+class LlmClientPool:
+    """Bounded, connection-reusing access to the LLM backend
+
+    LlmChat keeps the message history of its session on the instance, so chat
+    objects are cheap per-call wrappers and are never shared between calls;
+    the expensive part (TCP/TLS setup) is what the shared HTTP client keeps
+    warm across calls.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        provider: str,
+        model: str,
+        pool_size: int = LLM_POOL_SIZE,
+        keepalive_connections: int = LLM_KEEPALIVE_CONNECTIONS,
+        keepalive_seconds: float = LLM_KEEPALIVE_SECONDS
+    ):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+        self.pool_size = max(1, pool_size)
+        self.keepalive_connections = keepalive_connections
+        self.keepalive_seconds = keepalive_seconds
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._in_flight = 0
+        self._calls = 0
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    def http_client(self) -> httpx.AsyncClient:
+        """The shared keep-alive client, created (and handed to litellm) on first use"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.keepalive_connections,
+                    keepalive_expiry=self.keepalive_seconds
+                ),
+                # Per-call deadlines are enforced by the caller
+                timeout=httpx.Timeout(None, connect=LLM_CONNECT_TIMEOUT)
+            )
+            self._install()
+        return self._http_client
+
+    def _install(self):
+        try:
+            import litellm
+        except ImportError:
+            return
+        litellm.aclient_session = self._http_client
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the pool's in-flight call slots"""
+        async with self._slots:
+            self.http_client()
+            self._in_flight += 1
+            self._calls += 1
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+
+    def chat(self, system_message: str, purpose: str) -> LlmChat:
+        """A chat for a single call, with a session ID no other call uses"""
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=new_session_id(purpose),
+            system_message=system_message
+        )
+        chat.with_model(self.provider, self.model)
+        return chat
+
+    async def send(self, system_message: str, purpose: str, prompt: str, timeout: Optional[float] = None) -> str:
+        """Send one prompt; waiting for a free slot does not count towards ``timeout``"""
+        async with self.slot():
+            return await asyncio.wait_for(
+                self.chat(system_message, purpose).send_message(UserMessage(text=prompt)),
+                timeout=timeout
+            )
+
+    def stats(self) -> Dict:
+        return {
+            "pool_size": self.pool_size,
+            "in_flight": self._in_flight,
+            "calls": self._calls,
+            "keepalive_connections": self.keepalive_connections,
+            "keepalive_seconds": self.keepalive_seconds
+        }
+
+    async def aclose(self):
+        if self._http_client is not None:
+            client, self._http_client = self._http_client, None
+            self._install()
+            await client.aclose()
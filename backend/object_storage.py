@@ -0,0 +1,166 @@
+"""
+Pluggable storage for uploaded files, extracted text and rendered exports
+Objects are addressed by slash-separated keys (``uploads/<hash>.pdf``). The
+local backend maps keys to files under a root directory (a volume shared by
+all workers of a node, or a network mount); the S3 backend stores them in a
+bucket of any S3-compatible service (AWS, MinIO, localstack), so every worker
+on every node sees the same objects. Methods block and are called off the
+event loop.
+"""
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional
+
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+STORAGE_ROOT = os.environ.get('STORAGE_ROOT', '')
+S3_BUCKET = os.environ.get('S3_BUCKET', '')
+S3_PREFIX = os.environ.get('S3_PREFIX', '')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') or None
+S3_REGION = os.environ.get('S3_REGION') or None
+
+CHUNK_BYTES = 64 * 1024
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = root_dir
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root_dir / key).resolve()
+        if not path.is_relative_to(self.root_dir.resolve()):
+            raise ValueError(f"Storage key {key!r} leaves the storage root")
+        return path
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Filesystem path of the object, for responses the server can send directly"""
+        return self._path(key)
+
+    def put_file(self, key: str, source: Path):
+        """Store a local file under key, consuming it; readers never see a partial object"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{uuid.uuid4().hex}.part")
+        try:
+            # A rename when source is on the same filesystem, else a copy
+            shutil.move(str(source), str(temp_path))
+            os.replace(temp_path, path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Bytes [start, end) of the object"""
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+
+class S3Storage:
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        client=None
+    ):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        if client is None:
+            # boto3 is only needed when this backend is configured
+            import boto3
+
+            # Credentials come from the standard AWS environment variables or config files
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self._client_error = client.exceptions.ClientError
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def _missing(self, e: Exception) -> bool:
+        return e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    def put_file(self, key: str, source: Path):
+        try:
+            self.client.upload_file(str(source), self.bucket, self._key(key))
+        finally:
+            Path(source).unlink(missing_ok=True)
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))["ContentLength"]
+        except self._client_error as e:
+            if self._missing(e):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    def _get(self, key: str, **kwargs):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key), **kwargs)["Body"]
+        except self._client_error as e:
+            if self._missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        if end is not None and end <= start:
+            return b""
+        body = self._get(key, Range=f"bytes={start}-{'' if end is None else end - 1}")
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+        body = self._get(key)
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+def storage_from_env(default_root: Path):
+    """The backend selected by STORAGE_BACKEND (``local`` or ``s3``)"""
+    if STORAGE_BACKEND == "s3":
+        if not S3_BUCKET:
+            raise ValueError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3Storage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION)
+    if STORAGE_BACKEND != "local":
+        raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}; use local or s3")
+    return LocalStorage(Path(STORAGE_ROOT) if STORAGE_ROOT else default_root)
@@ -0,0 +1,274 @@
+"""
+Opt-in per-request profiling
+Requests under the profiled path prefixes can be profiled when asked for by
+header, picked by sample rate, or kept after the fact when they turn out to
+be slower than a threshold. Sampling and slow capture are off unless
+configured, and never apply to streaming routes (long by design). Two
+profilers:
+  sample    a background thread samples the event loop thread's stack every
+            few milliseconds (cheap, so it can watch every covered request
+            and keep only the slow ones)
+  cprofile  deterministic cProfile, on explicit request only, one at a time
+Both observe the whole event loop thread, so work of other requests running
+concurrently shows up too. Profiles go to a bounded directory, oldest evicted.
+"""
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_SECONDS = float(os.environ.get('PROFILE_SLOW_MS', '0')) / 1000  # 0 disables
+PROFILE_INTERVAL_SECONDS = float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000
+PROFILE_PATHS = [p for p in os.environ.get('PROFILE_PATHS', '/api/download/,/api/generate/').split(',') if p]
+# Streaming responses: only profiled when asked for by header
+PROFILE_STREAM_PATHS = [p for p in os.environ.get('PROFILE_STREAM_PATHS', '/api/generate/chapter/stream').split(',') if p]
+PROFILE_STORE_MAX = int(os.environ.get('PROFILE_STORE_MAX', '100'))
+
+PROFILE_HEADER = "x-profile"  # "1"/"sample" or "cprofile"
+TOP_FUNCTIONS = 40
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's stack while at least one recording is active"""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._recordings: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._target: Optional[int] = None
+
+    def start_recording(self) -> Counter:
+        """Start collecting stacks of the calling thread into a new Counter"""
+        stacks: Counter = Counter()
+        with self._lock:
+            self._target = threading.get_ident()
+            self._recordings[id(stacks)] = stacks
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        return stacks
+
+    def stop_recording(self, stacks: Counter):
+        with self._lock:
+            self._recordings.pop(id(stacks), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._recordings:
+                    self._thread = None
+                    return
+                recordings = list(self._recordings.values())
+                target = self._target
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            # Collapsed-stack format: root first, frames joined by ";"
+            key = ";".join(reversed(stack))
+            for stacks in recordings:
+                stacks[key] += 1
+
+
+def summarize_stacks(stacks: Counter, interval: float) -> Dict:
+    """Top functions by self and total samples"""
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+    samples = sum(stacks.values())
+    return {
+        "samples": samples,
+        "interval_ms": interval * 1000,
+        "top_self": [{"function": f, "samples": n} for f, n in self_counts.most_common(TOP_FUNCTIONS)],
+        "top_total": [{"function": f, "samples": n} for f, n in total_counts.most_common(TOP_FUNCTIONS)],
+    }
+
+
+class ProfileStore:
+    """Profiles on local disk: ``<id>.json`` (metadata and summary) plus a raw file, oldest evicted
+
+    The directory is created when the first profile is saved.
+    """
+
+    def __init__(self, root_dir: Path, max_profiles: int = PROFILE_STORE_MAX):
+        self.root_dir = root_dir
+        self.max_profiles = max(1, max_profiles)
+
+    def save(self, meta: Dict, summary: Dict, raw: bytes, raw_ext: str) -> str:
+        profile_id = meta["id"]
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        (self.root_dir / f"{profile_id}.{raw_ext}").write_bytes(raw)
+        doc = {**meta, "raw_format": raw_ext, "summary": summary}
+        temp = self.root_dir / f".{profile_id}.json"
+        temp.write_text(json.dumps(doc))
+        os.replace(temp, self.root_dir / f"{profile_id}.json")
+        self.evict()
+        return profile_id
+
+    def _entries(self) -> List[Path]:
+        return sorted(self.root_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+
+    def evict(self):
+        entries = self._entries()
+        for path in entries[:max(0, len(entries) - self.max_profiles)]:
+            for related in self.root_dir.glob(f"{path.stem}.*"):
+                related.unlink(missing_ok=True)
+
+    def list(self) -> List[Dict]:
+        """Metadata of stored profiles, newest first"""
+        profiles = []
+        for path in reversed(self._entries()):
+            try:
+                doc = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            doc.pop("summary", None)
+            profiles.append(doc)
+        return profiles
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        path = self.root_dir / f"{Path(profile_id).name}.json"
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def raw_path(self, profile_id: str) -> Optional[Path]:
+        doc = self.get(profile_id)
+        if doc is None:
+            return None
+        path = self.root_dir / f"{doc['id']}.{doc['raw_format']}"
+        return path if path.exists() else None
+
+
+class ProfileSession:
+    """Profiling of one request; ``finish`` decides whether to keep it"""
+
+    def __init__(self, profiler: "RequestProfiler", mode: str, reason: Optional[str], method: str, path: str):
+        self.profiler = profiler
+        self.mode = mode
+        self.reason = reason  # None: kept only if slow
+        self.method = method
+        self.path = path
+        self.profile_id = uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self._stacks: Optional[Counter] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        if mode == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._stacks = profiler.sampler.start_recording()
+
+    def finish(self, status: int) -> Optional[str]:
+        """Stop profiling; store the profile and return its ID if it should be kept"""
+        elapsed = time.perf_counter() - self.started
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self.profiler._release_cprofile()
+        else:
+            self.profiler.sampler.stop_recording(self._stacks)
+
+        reason = self.reason
+        if reason is None and self.profiler.slow_seconds and elapsed >= self.profiler.slow_seconds:
+            reason = "slow"
+        if reason is None:
+            return None
+
+        meta = {
+            "id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 1),
+            "mode": self.mode,
+            "reason": reason,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            if self._cprofile is not None:
+                text = io.StringIO()
+                stats = pstats.Stats(self._cprofile, stream=text)
+                stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+                # Same bytes as Stats.dump_stats, loadable with pstats.Stats(path)
+                raw = marshal.dumps(stats.stats)
+                self.profiler.store.save(meta, {"text": text.getvalue()}, raw, "prof")
+            else:
+                summary = summarize_stacks(self._stacks, self.profiler.sampler.interval)
+                collapsed = "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+                self.profiler.store.save(meta, summary, collapsed.encode("utf-8"), "collapsed")
+        except Exception as e:
+            logger.warning(f"Could not store profile of {self.method} {self.path}: {str(e)}")
+            return None
+        logger.info(f"Stored {self.mode} profile {self.profile_id} of {self.method} {self.path} ({reason}, {elapsed:.2f}s)")
+        return self.profile_id
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        store: ProfileStore,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        slow_seconds: float = PROFILE_SLOW_SECONDS,
+        interval: float = PROFILE_INTERVAL_SECONDS,
+        path_prefixes: Sequence[str] = PROFILE_PATHS,
+        stream_prefixes: Sequence[str] = PROFILE_STREAM_PATHS
+    ):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.path_prefixes = tuple(path_prefixes)
+        self.stream_prefixes = tuple(stream_prefixes)
+        self.sampler = StackSampler(interval)
+        self._cprofile_busy = threading.Lock()
+
+    def _acquire_cprofile(self) -> bool:
+        # Only one cProfile can be active per thread
+        return self._cprofile_busy.acquire(blocking=False)
+
+    def _release_cprofile(self):
+        self._cprofile_busy.release()
+
+    def start(self, method: str, path: str, requested: Optional[str] = None) -> Optional[ProfileSession]:
+        """Begin profiling a request if it is covered; ``requested`` is the profile header value"""
+        if not path.startswith(self.path_prefixes):
+            return None
+        if requested:
+            mode = "cprofile" if requested.lower() == "cprofile" and self._acquire_cprofile() else "sample"
+            return ProfileSession(self, mode, "requested", method, path)
+        if path.startswith(self.stream_prefixes):
+            return None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return ProfileSession(self, "sample", "sampled", method, path)
+        if self.slow_seconds:
+            return ProfileSession(self, "sample", None, method, path)
+        return None
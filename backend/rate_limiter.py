@@ -0,0 +1,192 @@
+"""
+Admission control for LLM calls
+Calls draw from requests-per-minute and tokens-per-minute buckets (estimated
+prompt plus completion tokens, corrected once the answer is known). Calls that
+cannot start yet wait in per-user queues served round-robin, so one user's
+book cannot starve everyone else; when the queue is full, interactive callers
+are turned away with a retry hint instead of piling up.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+# The budgets are for the whole deployment; each worker process enforces an
+# equal share (defaults to the worker count uvicorn and gunicorn read)
+LLM_RATE_LIMIT_PROCESSES = max(1, int(os.environ.get('LLM_RATE_LIMIT_PROCESSES', os.environ.get('WEB_CONCURRENCY', '1'))))
+LLM_RATE_LIMIT_RPM = float(os.environ.get('LLM_RATE_LIMIT_RPM', '500')) / LLM_RATE_LIMIT_PROCESSES
+LLM_RATE_LIMIT_TPM = float(os.environ.get('LLM_RATE_LIMIT_TPM', '200000')) / LLM_RATE_LIMIT_PROCESSES
+LLM_QUEUE_MAX = int(os.environ.get('LLM_QUEUE_MAX', '200'))
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM request queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Caller:
+    """Who an LLM call is made for; set per request or job with ``current_caller``"""
+    user: str = "anonymous"
+    reject_when_full: bool = True  # background jobs wait instead
+
+
+current_caller: ContextVar[Caller] = ContextVar("llm_caller", default=Caller())
+
+
+@dataclass(eq=False)
+class _Waiter:
+    tokens: float
+    future: asyncio.Future
+
+
+class LlmRateLimiter:
+    def __init__(
+        self,
+        rpm: float = LLM_RATE_LIMIT_RPM,
+        tpm: float = LLM_RATE_LIMIT_TPM,
+        max_queue: int = LLM_QUEUE_MAX
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_queue = max_queue
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._waiting = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._granted = 0
+        self._rejected = 0
+        self._queued = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _fits(self, tokens: float) -> bool:
+        # A call larger than the whole minute budget runs once the bucket is full
+        return self._requests >= 1 and self._tokens >= min(tokens, self.tpm)
+
+    def _wait_time(self, tokens: float) -> float:
+        return max(
+            (1 - self._requests) * 60 / self.rpm,
+            (min(tokens, self.tpm) - self._tokens) * 60 / self.tpm,
+            0.001
+        )
+
+    def _take(self, tokens: float):
+        self._requests -= 1
+        self._tokens -= tokens
+        self._granted += 1
+
+    def queue_full(self) -> bool:
+        return self._waiting >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        self._refill()
+        queued_tokens = sum(w.tokens for queue in self._queues.values() for w in queue)
+        seconds = max(
+            (self._waiting + 1 - self._requests) * 60 / self.rpm,
+            (queued_tokens - self._tokens) * 60 / self.tpm,
+            1
+        )
+        return math.ceil(seconds)
+
+    async def acquire(self, tokens: float, caller: Optional[Caller] = None):
+        """Wait for budget for one call of about ``tokens`` tokens"""
+        caller = caller or current_caller.get()
+        if caller.reject_when_full and self.queue_full():
+            self._rejected += 1
+            raise RateLimitExceeded(self.retry_after())
+
+        self._refill()
+        if not self._waiting and self._fits(tokens):
+            self._take(tokens)
+            return
+
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(caller.user, deque()).append(waiter)
+        self._waiting += 1
+        self._queued += 1
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller gave up: return the budget
+                self.settle(tokens, 0)
+            else:
+                self._remove(caller.user, waiter)
+            raise
+
+    def _remove(self, user: str, waiter: _Waiter):
+        queue = self._queues.get(user)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._waiting -= 1
+        if not queue:
+            del self._queues[user]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant waiting calls round-robin across users while the budget allows"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while self._queues:
+            user, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():
+                # Cancelled; its caller has not run its cleanup yet
+                queue.popleft()
+                self._waiting -= 1
+                if not queue:
+                    del self._queues[user]
+                continue
+            if not self._fits(waiter.tokens):
+                self._timer = asyncio.get_running_loop().call_later(
+                    self._wait_time(waiter.tokens), self._dispatch
+                )
+                return
+            queue.popleft()
+            self._waiting -= 1
+            self._take(waiter.tokens)
+            waiter.future.set_result(None)
+            # Move this user behind everyone else who is waiting
+            del self._queues[user]
+            if queue:
+                self._queues[user] = queue
+
+    def settle(self, estimated: float, actual: float):
+        """Correct the token bucket once a call's real size is known"""
+        self._refill()
+        self._tokens = min(self.tpm, self._tokens + estimated - actual)
+        if self._waiting:
+            self._dispatch()
+
+    def stats(self) -> Dict:
+        self._refill()
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "requests_available": round(self._requests, 1),
+            "tokens_available": round(self._tokens),
+            "waiting": self._waiting,
+            "waiting_users": len(self._queues),
+            "max_queue": self.max_queue,
+            "granted": self._granted,
+            "queued": self._queued,
+            "rejected": self._rejected
+        }
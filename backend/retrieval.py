@@ -0,0 +1,245 @@
+"""
+Local relevance retrieval over uploaded material
+Extracted text is split into overlapping chunks at ingestion and indexed
+incrementally with BM25 (NumPy, no network); each chapter prompt gets the
+top-ranked chunks for its title within a token budget. The index is a
+bounded, per-process cache: least recently used sources are evicted (and
+indexed again from db.upload_chunks when a request needs them).
+"""
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+CHUNK_CHARS = int(os.environ.get('RETRIEVAL_CHUNK_CHARS', '1200'))
+CHUNK_OVERLAP = int(os.environ.get('RETRIEVAL_CHUNK_OVERLAP', '200'))
+DEFAULT_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', '4'))
+DEFAULT_TOKEN_BUDGET = int(os.environ.get('RETRIEVAL_TOKEN_BUDGET', '800'))
+INDEX_MAX_CHUNKS = int(os.environ.get('RETRIEVAL_INDEX_MAX_CHUNKS', '20000'))
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about 4 UTF-8 bytes per token, so Indic scripts count higher)"""
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into ~chunk_chars pieces, preferring paragraph and line breaks"""
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            # Break at the last paragraph/line/sentence boundary in the second half
+            window = text[start + chunk_chars // 2:end]
+            for sep in ("\n\n", "\n", ". "):
+                cut = window.rfind(sep)
+                if cut != -1:
+                    end = start + chunk_chars // 2 + cut + len(sep)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+class ChunkIndex:
+    """Incremental BM25 index of text chunks grouped by source
+
+    A source is one piece of material (an upload blob, a transcript); queries
+    can be restricted to a set of sources so each request only sees its own
+    uploads. Beyond ``max_chunks`` the least recently used sources are
+    evicted. Evicted and removed sources are dropped from results at once and
+    their chunks are compacted away in batches, so a removal never rebuilds
+    the index on its own.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_chunks: int = INDEX_MAX_CHUNKS):
+        self.k1 = k1
+        self.b = b
+        self.max_chunks = max(1, max_chunks)
+        # source ID -> its chunks, least recently used first
+        self._texts: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._reset()
+
+    def _reset(self):
+        self.chunks: List[str] = []
+        self._sources: Dict[str, int] = {}
+        self._ranges: Dict[str, range] = {}  # source ID -> its chunk ids
+        self._next_source = 0
+        self._chunk_source: List[int] = []
+        self._offsets: List[int] = []  # position of each chunk within its source
+        self._lengths: List[int] = []
+        self._postings: Dict[str, tuple] = {}  # term -> ([chunk ids], [term freqs])
+        self._arrays: Optional[tuple] = None
+        self._term_arrays: Dict[str, tuple] = {}
+        self._dead = 0  # chunks of evicted or removed sources still in the arrays
+
+    def __len__(self) -> int:
+        """Chunks of the sources currently indexed"""
+        return len(self.chunks) - self._dead
+
+    def has_source(self, source_id: str) -> bool:
+        """Whether the source is indexed (and, if so, mark it recently used)"""
+        if source_id not in self._texts:
+            return False
+        self._texts.move_to_end(source_id)
+        return True
+
+    def add(self, source_id: str, chunks: Iterable[str]):
+        """Index a source's chunks; adding a known source again is a no-op"""
+        if self.has_source(source_id):
+            return
+        chunks = list(chunks)
+        if len(self) + len(chunks) > self.max_chunks:
+            # Evict down to three quarters of the bound so compactions stay rare
+            target = max(0, self.max_chunks * 3 // 4 - len(chunks))
+            while self._texts and len(self) > target:
+                self._drop(next(iter(self._texts)))
+        self._texts[source_id] = chunks
+        self._index(source_id, chunks)
+        self._maybe_compact()
+
+    def remove(self, source_id: str):
+        """Forget a source (e.g. its last upload was deleted)"""
+        if source_id in self._texts:
+            self._drop(source_id)
+            self._maybe_compact()
+
+    def _drop(self, source_id: str):
+        del self._texts[source_id]
+        del self._sources[source_id]
+        chunk_ids = self._ranges.pop(source_id)
+        self._dead += len(chunk_ids)
+        for chunk_id in chunk_ids:
+            self.chunks[chunk_id] = ""
+
+    def _maybe_compact(self):
+        if self._dead and (self._dead * 4 > len(self.chunks) or len(self.chunks) > self.max_chunks):
+            texts = list(self._texts.items())
+            self._reset()
+            for source_id, chunks in texts:
+                self._index(source_id, chunks)
+
+    def _index(self, source_id: str, chunks: List[str]):
+        source = self._sources[source_id] = self._next_source
+        self._next_source += 1
+        self._ranges[source_id] = range(len(self.chunks), len(self.chunks) + len(chunks))
+        for chunk in chunks:
+            chunk_id = len(self.chunks)
+            tokens = tokenize(chunk)
+            self.chunks.append(chunk)
+            self._chunk_source.append(source)
+            self._offsets.append(chunk_id - self._ranges[source_id].start)
+            self._lengths.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                ids, freqs = self._postings.setdefault(token, ([], []))
+                ids.append(chunk_id)
+                freqs.append(count)
+        self._arrays = None
+        self._term_arrays.clear()
+
+    def _prepare(self):
+        if self._arrays is None:
+            self._arrays = (
+                np.asarray(self._chunk_source, dtype=np.int32),
+                np.asarray(self._lengths, dtype=np.float64),
+                np.asarray(self._offsets, dtype=np.int32)
+            )
+        return self._arrays
+
+    def _term(self, term: str) -> Optional[tuple]:
+        cached = self._term_arrays.get(term)
+        if cached is None:
+            posting = self._postings.get(term)
+            if posting is None:
+                return None
+            cached = self._term_arrays[term] = (
+                np.asarray(posting[0], dtype=np.int32),
+                np.asarray(posting[1], dtype=np.float64)
+            )
+        return cached
+
+    def search(
+        self,
+        query: str,
+        source_ids: Optional[Set[str]] = None,
+        top_k: int = DEFAULT_TOP_K
+    ) -> List[int]:
+        """Chunk ids ranked by BM25 score for the query, best first
+
+        Chunk counts, document frequencies and the average chunk length are
+        taken over the allowed sources only, and ties are broken by source ID
+        and position, so the ranking depends on nothing but the query and
+        those sources: not on what else this process has indexed, or in
+        which order.
+        """
+        if source_ids is None:
+            names = sorted(self._sources)
+        else:
+            names = sorted(s for s in source_ids if s in self._sources)
+        if not names:
+            return []
+        chunk_source, lengths, offsets = self._prepare()
+        # Rank of each allowed source in ID order, -1 for every other source
+        rank = np.full(self._next_source, -1, dtype=np.int32)
+        rank[[self._sources[s] for s in names]] = np.arange(len(names), dtype=np.int32)
+        allowed = rank[chunk_source] >= 0
+        n = int(allowed.sum())
+        avg = max(float(lengths[allowed].mean()), 1.0)
+
+        scores = np.zeros(len(self.chunks), dtype=np.float64)
+        # Sorted so the floating-point sums do not depend on set order
+        for term in sorted(set(tokenize(query))):
+            arrays = self._term(term)
+            if arrays is None:
+                continue
+            ids, freqs = arrays
+            keep = allowed[ids]
+            ids, freqs = ids[keep], freqs[keep]
+            if not len(ids):
+                continue
+            idf = np.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norms = self.k1 * (1 - self.b + self.b * lengths[ids] / avg)
+            scores[ids] += idf * freqs * (self.k1 + 1) / (freqs + norms)
+
+        candidates = np.flatnonzero(scores > 0)
+        order = np.lexsort((offsets[candidates], rank[chunk_source[candidates]], -scores[candidates]))
+        return [int(i) for i in candidates[order[:top_k]]]
+
+    def context(
+        self,
+        query: str,
+        source_ids: Optional[Set[str]] = None,
+        top_k: int = DEFAULT_TOP_K,
+        token_budget: int = DEFAULT_TOKEN_BUDGET
+    ) -> str:
+        """Best matching chunks joined into prompt context, cut to the token budget"""
+        parts = []
+        used = 0
+        for chunk_id in self.search(query, source_ids, top_k):
+            chunk = self.chunks[chunk_id]
+            cost = estimate_tokens(chunk)
+            if used + cost > token_budget:
+                remaining = (token_budget - used) * 4
+                if remaining > 200:
+                    parts.append(chunk[:remaining])
+                break
+            parts.append(chunk)
+            used += cost
+        return "\n\n---\n\n".join(parts)
@@ -1,26 +1,45 @@
-from fastapi import FastAPI, APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, Form, Header, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import hmac
 import os
+import json
 import logging
+import tempfile
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
-import shutil
-from book_generator import BollywoodBookGenerator
-from file_processor import FileProcessor
+from book_generator import BollywoodBookGenerator, DEFAULT_CHAPTERS, LANGUAGE_CONFIGS, book_sections
+from file_processor import ExtractionPool
+from artifact_cache import ArtifactCache, RENDERERS, RENDER_SECONDS, data_version
+from book_store import BookStore
+from object_storage import storage_from_env
 from document_generator import DocumentGenerator
+from llm_cache import LlmResponseCache, MemoryCacheTier, MongoCacheTier
+from llm_client import track_usage
+from metrics import REGISTRY, Counter, Gauge, Histogram, MongoCommandMetrics
+from profiling import PROFILE_HEADER, ProfileStore, RequestProfiler
+from rate_limiter import Caller, LlmRateLimiter, RateLimitExceeded, current_caller
+from retrieval import ChunkIndex
+from text_store import TextStore
+from upload_stream import receive_upload
+from upload_store import UploadStore
+from youtube_ingest import TranscriptFetcher
+from job_queue import BookJobQueue, QUEUED, RUNNING, COMPLETED, FAILED
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -29,14 +48,59 @@ app = FastAPI()
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Create uploads and outputs directories
-UPLOAD_DIR = ROOT_DIR / "uploads"
-OUTPUT_DIR = ROOT_DIR / "outputs"
-UPLOAD_DIR.mkdir(exist_ok=True)
-OUTPUT_DIR.mkdir(exist_ok=True)
+# Uploads belong to the client session that sent them
+SESSION_HEADER = "x-session-id"
 
-# Initialize book generator
-book_generator = BollywoodBookGenerator()
+def require_session(session_id: Optional[str]) -> str:
+    """The caller's session ID; upload endpoints refuse requests without one"""
+    if not session_id:
+        raise HTTPException(status_code=400, detail="X-Session-Id header is required")
+    return session_id
+
+# Uploaded files, extracted text and rendered exports go to the storage backend
+# (STORAGE_BACKEND=local or s3), shared by all workers. Files in progress
+# (streamed uploads, renders) are written to a local scratch directory first.
+# Request profiles stay on the local disk of the worker that took them.
+storage = storage_from_env(ROOT_DIR)
+SCRATCH_DIR = Path(os.environ.get('SCRATCH_DIR', str(ROOT_DIR / "scratch")))
+SCRATCH_DIR.mkdir(parents=True, exist_ok=True)
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', str(ROOT_DIR / "profiles")))
+
+# Initialize LLM response cache; the Mongo tier is shared by all workers
+llm_cache = LlmResponseCache([
+    MemoryCacheTier(),
+    MongoCacheTier(db.llm_cache)
+])
+# LLM calls share one rate limiter (RPM/TPM budgets, fair queue across sessions)
+llm_limiter = LlmRateLimiter()
+
+# Created on first use in each worker process, not at import (which a
+# pre-forking server would do once in the parent)
+_book_generator: Optional[BollywoodBookGenerator] = None
+
+def get_book_generator() -> BollywoodBookGenerator:
+    global _book_generator
+    if _book_generator is None:
+        _book_generator = BollywoodBookGenerator(cache=llm_cache, limiter=llm_limiter)
+    return _book_generator
+
+# Text extraction runs in worker processes, off the event loop
+extraction_pool = ExtractionPool(page_cache=db.extracted_pages)
+
+# Uploaded text is chunked and indexed so prompts quote the passages relevant to each section
+chunk_index = ChunkIndex()
+upload_store = UploadStore(db, storage, extraction_pool, chunk_index, TextStore(storage, scratch_dir=SCRATCH_DIR))
+TOC_TOKEN_BUDGET = int(os.environ.get('RETRIEVAL_TOC_TOKEN_BUDGET', '400'))
+
+# YouTube transcripts are fetched off the event loop and cached by video ID
+transcript_fetcher = TranscriptFetcher(db.youtube_transcripts)
+
+# Books are stored one document per chapter so readers fetch only what they show
+book_store = BookStore(db)
+
+# Rendered downloads are cached in storage by book data version and rendered in worker processes
+render_pool = ProcessPoolExecutor(max_workers=int(os.environ.get('RENDER_WORKERS', '3')))
+artifact_cache = ArtifactCache(storage, db.artifacts, scratch_dir=SCRATCH_DIR, executor=render_pool)
 
 # Configure logging
 logging.basicConfig(
@@ -53,6 +117,7 @@ class BookRequest(BaseModel):
     chapter_number: Optional[int] = None
     chapter_title: Optional[str] = None
     use_uploaded_content: bool = False
+    upload_ids: Optional[List[str]] = None  # restrict to these uploads (default: all of the session's)
     youtube_url: Optional[str] = None
 
 class BookResponse(BaseModel):
@@ -66,12 +131,146 @@ class ChapterRequest(BaseModel):
     chapter_number: int
     chapter_title: str
     use_uploaded_content: bool = False
+    upload_ids: Optional[List[str]] = None
+
+class RevisionRequest(BaseModel):
+    chapters: List[int] = []  # chapter numbers to regenerate even if their inputs are unchanged
+    regenerate_title_page: bool = False
+    regenerate_toc: bool = False
+    use_uploaded_content: bool = False
+    upload_ids: Optional[List[str]] = None
+    youtube_url: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    languages: Optional[List[str]] = None  # default: every supported language
+    pivot_language: str = "english"
+    use_uploaded_content: bool = False
+    upload_ids: Optional[List[str]] = None
+    youtube_url: Optional[str] = None
 
 class GenerationStatus(BaseModel):
     book_id: str
     status: str
     progress: int
     message: str
+    formats_ready: List[str] = []
+
+# Metrics served at /metrics; values other components already track are read at scrape time
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests until the response starts",
+    ["method", "route", "status"]
+)
+GENERATIONS_IN_PROGRESS = Gauge(
+    "generations_in_progress",
+    "Books, revisions, batches and chapters being generated by this process",
+    ["kind"]
+)
+GENERATION_JOBS = Gauge(
+    "generation_jobs",
+    "Book generation jobs by status (all workers)",
+    ["status"]
+)
+Counter(
+    "llm_cache_lookups_total",
+    "LLM response cache lookups by result",
+    ["result", "tier"],
+    collect=lambda: {
+        **{("hit", tier): hits for tier, hits in llm_cache.hits.items()},
+        ("miss", ""): llm_cache.misses
+    }
+)
+Gauge("llm_cache_hit_ratio", "Share of LLM cache lookups answered from the cache", collect=lambda: llm_cache.stats()["hit_rate"])
+Gauge("llm_pool_in_flight", "LLM calls holding a client pool slot", collect=lambda: _book_generator.client_pool.stats()["in_flight"] if _book_generator else 0)
+Gauge("llm_rate_limiter_waiting", "LLM calls waiting for rate limiter budget", collect=lambda: llm_limiter.stats()["waiting"])
+Counter(
+    "llm_rate_limiter_decisions_total",
+    "LLM calls granted by the rate limiter, or rejected because its queue was full",
+    ["decision"],
+    collect=lambda: {("granted",): llm_limiter.stats()["granted"], ("rejected",): llm_limiter.stats()["rejected"]}
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status
+        )
+
+# Download and generation requests can be profiled (see profiling.py); admin endpoints need ADMIN_TOKEN
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+request_profiler = RequestProfiler(ProfileStore(PROFILE_DIR))
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    # Profiling on demand is an admin feature: it slows the whole event loop down
+    requested = request.headers.get(PROFILE_HEADER)
+    if requested and not is_admin(request.headers.get("x-admin-token")):
+        requested = None
+    session = request_profiler.start(request.method, request.url.path, requested)
+    if session is None:
+        return await call_next(request)
+    
+    try:
+        response = await call_next(request)
+    except BaseException:
+        session.finish(500)
+        raise
+    if requested:
+        response.headers["X-Profile-Id"] = session.profile_id
+    
+    # Keep profiling until the body (e.g. a streamed export) has been sent
+    body = response.body_iterator
+    async def profiled_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            session.finish(response.status_code)
+    response.body_iterator = profiled_body()
+    return response
+
+# Job counts come from the database, so scrapes within this many seconds share one count
+JOB_METRICS_TTL_SECONDS = float(os.environ.get('JOB_METRICS_TTL_SECONDS', '5'))
+_job_metrics_expire_at = 0.0
+
+async def refresh_job_metrics():
+    """Count jobs by status in one aggregation, at most once per JOB_METRICS_TTL_SECONDS"""
+    global _job_metrics_expire_at
+    now = time.monotonic()
+    if now < _job_metrics_expire_at:
+        return
+    _job_metrics_expire_at = now + JOB_METRICS_TTL_SECONDS
+    counts = {status: 0 for status in (QUEUED, RUNNING, COMPLETED, FAILED)}
+    async for row in db.generations.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+        if row["_id"] in counts:
+            counts[row["_id"]] = row["count"]
+    for status, count in counts.items():
+        GENERATION_JOBS.set(count, status=status)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of every metric"""
+    await refresh_job_metrics()
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -85,15 +284,21 @@ async def root():
             "process_youtube": "/api/youtube/process",
             "generate_book": "/api/generate/book",
             "generate_chapter": "/api/generate/chapter",
+            "generate_chapter_stream": "/api/generate/chapter/stream",
+            "generate_batch": "/api/generate/batch",
+            "batch_status": "/api/generation/batch/{batch_id}",
+            "book_chapters": "/api/books/{book_id}/chapters",
+            "book_chapter": "/api/books/{book_id}/chapters/{chapter_number}",
             "download": "/api/download/{format}/{book_id}",
-            "languages": "/api/languages"
+            "languages": "/api/languages",
+            "cache_stats": "/api/cache/stats",
+            "metrics": "/metrics"
         }
     }
 
 @api_router.get("/languages")
 async def get_supported_languages():
     """Get list of supported languages"""
-    from book_generator import LANGUAGE_CONFIGS
     return {
         "languages": [
             {"code": code, "name": config["name"]}
@@ -102,190 +307,577 @@ async def get_supported_languages():
     }
 
 @api_router.post("/upload/slides")
-async def upload_slides(file: UploadFile = File(...)):
+async def upload_slides(request: Request):
     """Upload lecture slides (PDF/PPT/DOCX)"""
     try:
-        file_id = str(uuid.uuid4())
-        file_ext = file.filename.split('.')[-1].lower()
-        
-        if file_ext not in ['pdf', 'pptx', 'docx']:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Use PDF, PPTX, or DOCX.")
-        
-        file_path = UPLOAD_DIR / f"{file_id}.{file_ext}"
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract text
-        text_content = FileProcessor.process_file(str(file_path), file_ext)
-        
-        # Store in database
-        doc = {
-            "id": file_id,
-            "type": "slides",
-            "filename": file.filename,
-            "file_path": str(file_path),
-            "content": text_content[:5000],  # Store first 5000 chars
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.uploads.insert_one(doc)
+        owner_id = require_session(request.headers.get(SESSION_HEADER))
+        upload = await receive_upload(request, SCRATCH_DIR, ['pdf', 'pptx', 'docx'])
+        doc = await upload_store.ingest(upload, "slides", owner_id)
         
         return {
-            "id": file_id,
+            "id": doc["id"],
             "message": "Slides uploaded successfully",
-            "filename": file.filename,
-            "pages_extracted": len(text_content.split('\n\n'))
+            "filename": doc["filename"],
+            "pages_extracted": doc["pages_extracted"],
+            "duplicate": doc["duplicate"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading slides: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/upload/notes")
-async def upload_notes(file: UploadFile = File(...)):
+async def upload_notes(request: Request):
     """Upload notes (TXT/PDF/DOCX)"""
     try:
-        file_id = str(uuid.uuid4())
-        file_ext = file.filename.split('.')[-1].lower()
-        
-        if file_ext not in ['txt', 'pdf', 'docx']:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Use TXT, PDF, or DOCX.")
-        
-        file_path = UPLOAD_DIR / f"{file_id}.{file_ext}"
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract text
-        text_content = FileProcessor.process_file(str(file_path), file_ext)
-        
-        # Store in database
-        doc = {
-            "id": file_id,
-            "type": "notes",
-            "filename": file.filename,
-            "file_path": str(file_path),
-            "content": text_content[:5000],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.uploads.insert_one(doc)
+        owner_id = require_session(request.headers.get(SESSION_HEADER))
+        upload = await receive_upload(request, SCRATCH_DIR, ['txt', 'pdf', 'docx'])
+        doc = await upload_store.ingest(upload, "notes", owner_id)
         
         return {
-            "id": file_id,
+            "id": doc["id"],
             "message": "Notes uploaded successfully",
-            "filename": file.filename,
-            "word_count": len(text_content.split())
+            "filename": doc["filename"],
+            "word_count": doc["word_count"],
+            "duplicate": doc["duplicate"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading notes: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/uploads")
+async def list_uploads(x_session_id: Optional[str] = Header(None)):
+    """List this session's uploads, newest first"""
+    try:
+        uploads = await upload_store.find(
+            require_session(x_session_id),
+            projection={"_id": 0, "id": 1, "type": 1, "filename": 1, "url": 1, "word_count": 1, "created_at": 1}
+        )
+        return {"uploads": uploads}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing uploads: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/uploads/{upload_id}/text")
+async def get_upload_text(
+    upload_id: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    x_session_id: Optional[str] = Header(None)
+):
+    """Stream the full extracted text of an upload, or characters [start, end) of it"""
+    try:
+        uploads = await upload_store.find(require_session(x_session_id), [upload_id], limit=1)
+        if not uploads:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if start < 0 or (end is not None and end < start):
+            raise HTTPException(status_code=400, detail="Invalid character range")
+        
+        return StreamingResponse(
+            upload_store.iter_text(uploads[0], start, end),
+            media_type="text/plain; charset=utf-8"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading upload text: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.delete("/uploads/{upload_id}")
+async def delete_upload(upload_id: str, x_session_id: Optional[str] = Header(None)):
+    """Delete an upload; the stored file is reclaimed when no other upload shares it"""
+    try:
+        if not await upload_store.release(upload_id, require_session(x_session_id)):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return {"id": upload_id, "message": "Upload deleted"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.post("/youtube/process")
-async def process_youtube(youtube_url: str = Form(...)):
+async def process_youtube(youtube_url: str = Form(...), x_session_id: Optional[str] = Header(None)):
     """Process YouTube video or playlist URL"""
     try:
-        transcript = await FileProcessor.get_youtube_transcript(youtube_url)
+        owner_id = require_session(x_session_id)
+        result = await transcript_fetcher.ingest(youtube_url)
         
-        doc_id = str(uuid.uuid4())
-        doc = {
-            "id": doc_id,
-            "type": "youtube",
+        doc = await upload_store.ingest_text(result["text"], "youtube", owner_id, {
             "url": youtube_url,
-            "content": transcript[:5000],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.uploads.insert_one(doc)
+            "videos": result["videos"],
+            "failed_videos": result["failed"]
+        })
         
         return {
-            "id": doc_id,
+            "id": doc["id"],
             "message": "YouTube transcript extracted successfully",
             "url": youtube_url,
-            "word_count": len(transcript.split())
+            "word_count": doc["word_count"],
+            "videos": len(result["videos"]),
+            "failed_videos": result["failed"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing YouTube: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_upload_sources(owner_id: Optional[str], upload_ids: Optional[List[str]] = None) -> Set[str]:
+    """Retrieval sources for an owner's uploaded material"""
+    uploads = await upload_store.find(owner_id, upload_ids)
+    return await upload_store.index_sources(uploads)
+
+async def load_user_sources(request: BookRequest, owner_id: Optional[str]) -> Set[str]:
+    """Collect retrieval sources for the uploaded material and YouTube transcript of a book request"""
+    sources = set()
+    if request.use_uploaded_content:
+        sources = await load_upload_sources(owner_id, request.upload_ids)
+    
+    if request.youtube_url:
+        try:
+            transcript = await transcript_fetcher.get_transcript(request.youtube_url)
+            sources.add(upload_store.index_text(transcript))
+        except Exception as e:
+            logger.warning(f"Could not process YouTube URL: {str(e)}")
+    
+    return sources
+
+def book_references(sources: Set[str]) -> Dict[str, str]:
+    """User material most relevant to each book section, keyed as in generate_full_book"""
+    if not sources:
+        return {}
+    references = {
+        "toc": chunk_index.context(
+            " ".join(chapter["title"] for chapter in DEFAULT_CHAPTERS),
+            sources,
+            token_budget=TOC_TOKEN_BUDGET
+        )
+    }
+    for chapter in DEFAULT_CHAPTERS:
+        references[f"chapter_{chapter['num']}"] = chunk_index.context(chapter["title"], sources)
+    return references
+
+async def chapter_reference(request: ChapterRequest, owner_id: Optional[str]) -> str:
+    """User material most relevant to a single chapter request"""
+    if not request.use_uploaded_content:
+        return ""
+    sources = await load_upload_sources(owner_id, request.upload_ids)
+    return chunk_index.context(request.chapter_title, sources) if sources else ""
+
+def rate_limited(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many generation requests, please retry later",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+def check_llm_admission():
+    """Turn new generation requests away while the LLM request queue is full"""
+    if llm_limiter.queue_full():
+        raise rate_limited(llm_limiter.retry_after())
+
+async def save_book(book_id: str, language: str, book_data: Dict, fingerprints: Dict[str, str], **fields):
+    """Store a finished book and start rendering its export formats"""
+    # Upsert so a resumed job never duplicates the book
+    book_doc = {
+        "book_id": book_id,
+        "language": language,
+        "data_version": data_version(book_data),
+        "fingerprints": fingerprints,
+        "revision": 1,
+        "parent_book_id": None,
+        "root_book_id": book_id,
+        **fields,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await book_store.save(book_doc, book_data)
+    
+    # Render every export format now so the first download is served from storage
+    artifact_cache.prerender(book_id, book_doc["data_version"], book_data)
+
+async def run_book_job(job: Dict, update):
+    """Generate a queued book, saving each finished section so the job can resume"""
+    book_id = job["book_id"]
+    # Queued jobs wait for LLM budget rather than being turned away
+    current_caller.set(Caller(job.get("owner_id") or "anonymous", reject_when_full=False))
+    if job.get("mode") == "batch":
+        return await run_batch_job(job, update)
+    
+    request = BookRequest(**job["request"])
+    references = book_references(await load_user_sources(request, job.get("owner_id")))
+    fingerprints = get_book_generator().section_fingerprints(request.language, references=references)
+    regenerate = set(job.get("regenerate", []))
+    
+    # A revision copies every section whose inputs are unchanged from its parent
+    completed = {}
+    lineage = {"revision": 1, "parent_book_id": None, "root_book_id": book_id}
+    if job.get("revision_of"):
+        parent = await book_store.get(job["revision_of"])
+        parent_fingerprints = parent.get("fingerprints", {})
+        # Sections of a batch translation match what their pivot sections would translate to
+        translated = {}
+        pivot = parent.get("pivot_language")
+        if pivot and pivot != request.language:
+            translated = get_book_generator().translation_fingerprints(
+                get_book_generator().section_fingerprints(pivot, references=references),
+                request.language
+            )
+        completed = {
+            key: content
+            for key, content in book_sections(await book_store.load(parent["book_id"])).items()
+            if key not in regenerate
+            and parent_fingerprints.get(key) is not None
+            and parent_fingerprints.get(key) in (fingerprints.get(key), translated.get(key))
+        }
+        # A reused section keeps the fingerprint of the inputs it was produced from
+        fingerprints.update({key: parent_fingerprints[key] for key in completed})
+        lineage = {
+            "revision": parent.get("revision", 1) + 1,
+            "parent_book_id": parent["book_id"],
+            "root_book_id": parent.get("root_book_id", parent["book_id"]),
+            "reused_sections": sorted(completed)
+        }
+        if pivot:
+            lineage["pivot_language"] = pivot
+    completed.update(job.get("partial") or {})
+    
+    async def on_section(key: str, content: str, done: int, total: int):
+        # Keep 100 for when the book is actually saved
+        await update({
+            f"partial.{key}": content,
+            "progress": int(done * 99 / total),
+            "sections_done": done,
+            "sections_total": total
+        })
+    
+    logger.info(f"Starting book generation for {book_id} ({len(completed)} sections reused)")
+    book_data = await get_book_generator().generate_full_book(
+        request.language,
+        completed=completed,
+        on_section=on_section,
+        regenerate=regenerate,
+        references=references
+    )
+    
+    await save_book(book_id, request.language, book_data, fingerprints, **lineage)
+
+async def run_batch_job(job: Dict, update):
+    """Generate a book in the pivot language, then produce every other language from it concurrently"""
+    batch_id = job["book_id"]
+    request = BatchRequest(**job["request"])
+    pivot = request.pivot_language
+    languages = job["languages"]
+    partial = job.get("partial") or {}
+    started = time.perf_counter()
+    
+    # Uploaded material is retrieved once, for the pivot book
+    sources = await load_user_sources(
+        BookRequest(
+            language=pivot,
+            use_uploaded_content=request.use_uploaded_content,
+            upload_ids=request.upload_ids,
+            youtube_url=request.youtube_url
+        ),
+        job.get("owner_id")
+    )
+    references = book_references(sources)
+    progress = {language: state.get("progress", 0) for language, state in languages.items()}
+    
+    def on_section_for(language: str):
+        async def on_section(key: str, content: str, done: int, total: int):
+            progress[language] = int(done * 99 / total)
+            await update({
+                f"partial.{language}.{key}": content,
+                f"languages.{language}.status": RUNNING,
+                f"languages.{language}.progress": progress[language],
+                "progress": int(sum(progress.values()) / len(progress))
+            })
+        return on_section
+    
+    async def finish(language: str, book_data: Dict, fingerprints: Dict[str, str], usage, seconds: float):
+        await save_book(
+            languages[language]["book_id"],
+            language,
+            book_data,
+            fingerprints,
+            batch_id=batch_id,
+            pivot_language=pivot
+        )
+        progress[language] = 100
+        await update({
+            f"languages.{language}.status": COMPLETED,
+            f"languages.{language}.progress": 100,
+            f"languages.{language}.usage": usage.as_dict(),
+            f"languages.{language}.seconds": round(seconds, 2),
+            "progress": int(sum(progress.values()) / len(progress))
+        })
+    
+    logger.info(f"Starting batch {batch_id}: {pivot} pivot, {len(languages)} languages")
+    pivot_usage = track_usage()
+    pivot_book = await get_book_generator().generate_full_book(
+        pivot,
+        completed=partial.get(pivot),
+        on_section=on_section_for(pivot),
+        references=references
+    )
+    pivot_seconds = time.perf_counter() - started
+    pivot_fingerprints = get_book_generator().section_fingerprints(pivot, references=references)
+    await finish(pivot, pivot_book, pivot_fingerprints, pivot_usage, pivot_seconds)
+    
+    async def fan_out(language: str):
+        usage = track_usage()
+        language_started = time.perf_counter()
+        try:
+            book_data = await get_book_generator().translate_book(
+                pivot_book,
+                language,
+                completed=partial.get(language),
+                on_section=on_section_for(language)
+            )
+        except Exception as e:
+            # Only this language fails; the others still finish and the job completes
+            logger.error(f"Batch {batch_id}: {language} failed: {str(e)}")
+            await update({f"languages.{language}.status": FAILED, f"languages.{language}.error": str(e)})
+            return None
+        await finish(
+            language,
+            book_data,
+            get_book_generator().translation_fingerprints(pivot_fingerprints, language),
+            usage,
+            time.perf_counter() - language_started
+        )
+        return usage
+    
+    targets = [language for language in languages if language != pivot]
+    results = await asyncio.gather(*(fan_out(language) for language in targets))
+    failed = [language for language, usage in zip(targets, results) if usage is None]
+    batch_usage = [pivot_usage] + [usage for usage in results if usage is not None]
+    
+    # Compare, both without the response cache (sections served from it are counted
+    # at their estimated cost), against one independent book per finished language,
+    # each costing what the pivot book did
+    books = len(batch_usage)
+    independent = {
+        "llm_calls": pivot_usage.sections * books,
+        "tokens": pivot_usage.uncached_tokens * books
+    }
+    uncached = {
+        "llm_calls": sum(u.sections for u in batch_usage),
+        "tokens": sum(u.uncached_tokens for u in batch_usage)
+    }
+    await update({"report": {
+        "languages": books,
+        "failed_languages": failed,
+        "seconds": round(time.perf_counter() - started, 2),
+        "batch": uncached,
+        "independent_estimate": independent,
+        "saved": {key: independent[key] - uncached[key] for key in uncached},
+        # What was actually sent to the LLM after cache hits
+        "llm_usage": {
+            "llm_calls": sum(u.calls for u in batch_usage),
+            "cached": sum(u.cached for u in batch_usage),
+            "tokens": sum(u.tokens for u in batch_usage)
+        }
+    }})
+
+async def run_tracked_job(job: Dict, update):
+    kind = "batch" if job.get("mode") == "batch" else "revision" if job.get("revision_of") else "book"
+    with GENERATIONS_IN_PROGRESS.track_inprogress(kind=kind):
+        await run_book_job(job, update)
+
+job_queue = BookJobQueue(db.generations, run_tracked_job)
+
 @api_router.post("/generate/book", response_model=BookResponse)
-async def generate_book(request: BookRequest):
-    """Generate full book"""
+async def generate_book(request: BookRequest, x_session_id: Optional[str] = Header(None)):
+    """Queue full book generation; poll /generation/status/{book_id} for progress"""
     try:
+        check_llm_admission()
         book_id = str(uuid.uuid4())
         
-        # Get user uploaded content if requested
-        user_content = ""
-        if request.use_uploaded_content:
-            uploads = await db.uploads.find({}, {"_id": 0}).to_list(100)
-            user_content = "\n\n".join([u.get("content", "") for u in uploads])
-        
-        if request.youtube_url:
-            try:
-                transcript = await FileProcessor.get_youtube_transcript(request.youtube_url)
-                user_content += "\n\n" + transcript
-            except Exception as e:
-                logger.warning(f"Could not process YouTube URL: {str(e)}")
-        
-        # Store generation request
-        gen_doc = {
-            "book_id": book_id,
+        await job_queue.enqueue(book_id, {
             "language": request.language,
             "mode": request.generation_mode,
-            "status": "generating",
-            "progress": 0,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.generations.insert_one(gen_doc)
+            "owner_id": x_session_id,
+            "request": request.model_dump()
+        })
         
-        # Generate book (async in background ideally, but for MVP doing synchronously)
-        logger.info(f"Starting book generation for {book_id}")
-        book_data = await book_generator.generate_full_book(
-            request.language,
-            user_content
+        return BookResponse(
+            id=str(uuid.uuid4()),
+            status=QUEUED,
+            message="Book generation queued",
+            book_id=book_id
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error queueing book: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/generate/batch", response_model=BookResponse)
+async def generate_batch(request: BatchRequest, x_session_id: Optional[str] = Header(None)):
+    """Queue one book in several languages; poll /generation/batch/{batch_id} for per-language progress"""
+    try:
+        check_llm_admission()
+        languages = list(dict.fromkeys(request.languages or LANGUAGE_CONFIGS))
+        unknown = [language for language in languages + [request.pivot_language] if language not in LANGUAGE_CONFIGS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unsupported languages: {', '.join(unknown)}")
+        if request.pivot_language not in languages:
+            languages.insert(0, request.pivot_language)
         
-        # Save book data
-        book_doc = {
-            "book_id": book_id,
-            "language": request.language,
-            "data": book_data,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.books.insert_one(book_doc)
+        batch_id = str(uuid.uuid4())
+        await job_queue.enqueue(batch_id, {
+            "language": request.pivot_language,
+            "mode": "batch",
+            "owner_id": x_session_id,
+            "request": request.model_dump(),
+            # Book IDs are assigned up front so clients can link to them while the batch runs
+            "languages": {
+                language: {"book_id": str(uuid.uuid4()), "status": QUEUED, "progress": 0}
+                for language in languages
+            }
+        })
         
-        # Update status
-        await db.generations.update_one(
-            {"book_id": book_id},
-            {"$set": {"status": "completed", "progress": 100}}
+        return BookResponse(
+            id=str(uuid.uuid4()),
+            status=QUEUED,
+            message=f"Batch generation queued for {len(languages)} languages",
+            book_id=batch_id
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error queueing batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/books/{book_id}/revisions", response_model=BookResponse)
+async def create_book_revision(book_id: str, request: RevisionRequest, x_session_id: Optional[str] = Header(None)):
+    """Queue a new revision of a book, regenerating only selected or changed sections"""
+    try:
+        check_llm_admission()
+        parent = await db.books.find_one({"book_id": book_id}, {"_id": 0, "book_id": 1, "language": 1})
+        if not parent:
+            raise HTTPException(status_code=404, detail="Book not found")
+        
+        regenerate = [f"chapter_{n}" for n in request.chapters]
+        if request.regenerate_title_page:
+            regenerate.append("title_page")
+        if request.regenerate_toc:
+            regenerate.append("toc")
+        
+        book_request = BookRequest(
+            language=parent["language"],
+            use_uploaded_content=request.use_uploaded_content,
+            upload_ids=request.upload_ids,
+            youtube_url=request.youtube_url
+        )
+        revision_id = str(uuid.uuid4())
+        await job_queue.enqueue(revision_id, {
+            "language": parent["language"],
+            "mode": "revision",
+            "owner_id": x_session_id,
+            "request": book_request.model_dump(),
+            "revision_of": book_id,
+            "regenerate": regenerate
+        })
         
         return BookResponse(
             id=str(uuid.uuid4()),
-            status="success",
-            message="Book generated successfully",
-            book_id=book_id
+            status=QUEUED,
+            message="Book revision queued",
+            book_id=revision_id
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error queueing revision: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/books/{book_id}/revisions")
+async def list_book_revisions(book_id: str):
+    """List every revision in the lineage of a book, oldest first"""
+    try:
+        book = await db.books.find_one({"book_id": book_id}, {"_id": 0, "book_id": 1, "root_book_id": 1})
+        if not book:
+            raise HTTPException(status_code=404, detail="Book not found")
+        
+        root_book_id = book.get("root_book_id", book["book_id"])
+        revisions = await db.books.find(
+            {"$or": [{"root_book_id": root_book_id}, {"book_id": root_book_id}]},
+            {"_id": 0, "book_id": 1, "revision": 1, "parent_book_id": 1, "reused_sections": 1, "created_at": 1}
+        ).sort("revision", 1).to_list(1000)
+        
+        return {"root_book_id": root_book_id, "revisions": revisions}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing revisions: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/books/{book_id}/chapters")
+async def list_book_chapters(book_id: str, offset: int = 0, limit: int = 20):
+    """Title page, table of contents and a page of the chapter list, without chapter texts"""
+    try:
+        if offset < 0 or not 1 <= limit <= 100:
+            raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 100")
+        
+        front_matter = await book_store.front_matter(book_id)
+        if front_matter is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+        
+        chapters = front_matter["chapters"]
+        return {
+            "book_id": book_id,
+            "title_page": front_matter["title_page"],
+            "toc": front_matter["toc"],
+            "total": len(chapters),
+            "offset": offset,
+            "limit": limit,
+            "chapters": chapters[offset:offset + limit]
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error generating book: {str(e)}")
+        logger.error(f"Error listing chapters: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/books/{book_id}/chapters/{chapter_number}")
+async def get_book_chapter(book_id: str, chapter_number: int):
+    """Get the text of one chapter of a book"""
+    try:
+        chapter = await book_store.get_chapter(book_id, chapter_number)
+        if chapter is None:
+            raise HTTPException(status_code=404, detail="Chapter not found")
+        return {"book_id": book_id, **chapter}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting chapter: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/generate/chapter")
-async def generate_chapter(request: ChapterRequest):
+async def generate_chapter(request: ChapterRequest, x_session_id: Optional[str] = Header(None)):
     """Generate single chapter"""
     try:
-        # Get user uploaded content if requested
-        user_content = ""
-        if request.use_uploaded_content:
-            uploads = await db.uploads.find({}, {"_id": 0}).to_list(100)
-            user_content = "\n\n".join([u.get("content", "") for u in uploads])
+        current_caller.set(Caller(x_session_id or "anonymous"))
+        
+        # Get the uploaded material relevant to this chapter if requested
+        reference = await chapter_reference(request, x_session_id)
         
         # Generate chapter
-        chapter_content = await book_generator.generate_chapter(
-            request.chapter_number,
-            request.chapter_title,
-            request.language,
-            user_content
-        )
+        with GENERATIONS_IN_PROGRESS.track_inprogress(kind="chapter"):
+            chapter_content = await get_book_generator().generate_chapter(
+                request.chapter_number,
+                request.chapter_title,
+                request.language,
+                reference=reference
+            )
         
         chapter_id = str(uuid.uuid4())
         chapter_doc = {
@@ -304,39 +896,156 @@ async def generate_chapter(request: ChapterRequest):
             "message": "Chapter generated successfully",
             "content": chapter_content
         }
+    except RateLimitExceeded as e:
+        raise rate_limited(e.retry_after)
     except Exception as e:
         logger.error(f"Error generating chapter: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@api_router.post("/generate/chapter/stream")
+async def generate_chapter_stream(request: ChapterRequest, x_session_id: Optional[str] = Header(None)):
+    """Generate single chapter, streaming each page as a Server-Sent Event"""
+    check_llm_admission()
+    chapter_id = str(uuid.uuid4())
+    
+    async def events():
+        # Flush headers and a first event before any LLM work starts
+        yield sse_event("start", {"chapter_id": chapter_id})
+        try:
+            current_caller.set(Caller(x_session_id or "anonymous"))
+            reference = await chapter_reference(request, x_session_id)
+            
+            pages = []
+            with GENERATIONS_IN_PROGRESS.track_inprogress(kind="chapter_stream"):
+                async for page in get_book_generator().stream_chapter(
+                    request.chapter_number,
+                    request.chapter_title,
+                    request.language,
+                    reference=reference
+                ):
+                    pages.append(page)
+                    yield sse_event("page", {"page": len(pages), "content": page})
+            
+            chapter_content = "".join(pages)
+            chapter_doc = {
+                "chapter_id": chapter_id,
+                "chapter_number": request.chapter_number,
+                "chapter_title": request.chapter_title,
+                "language": request.language,
+                "content": chapter_content,
+                "created_at": datetime.now(timezone.utc).isoformat()
+            }
+            await db.chapters.insert_one(chapter_doc)
+            
+            yield sse_event("done", {
+                "chapter_id": chapter_id,
+                "status": "success",
+                "message": "Chapter generated successfully",
+                "pages": len(pages)
+            })
+        except RateLimitExceeded as e:
+            yield sse_event("error", {"chapter_id": chapter_id, "detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error streaming chapter: {str(e)}")
+            yield sse_event("error", {"chapter_id": chapter_id, "detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def iter_buffer(buffer, chunk_size: int = 64 * 1024):
+    """Read a rendered export out in chunks, closing (and freeing) it when done"""
+    try:
+        while True:
+            chunk = buffer.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        buffer.close()
+
 @api_router.get("/download/{format}/{book_id}")
-async def download_book(format: str, book_id: str):
-    """Download generated book in specified format"""
+async def download_book(format: str, book_id: str, request: Request, stream: bool = False):
+    """Download generated book in specified format
+    
+    Rendered files are cached in storage. Markdown that is not cached yet, and
+    any format with ``stream=true``, is rendered straight into the response.
+    """
     try:
         if format not in ['pdf', 'docx', 'md']:
             raise HTTPException(status_code=400, detail="Format must be pdf, docx, or md")
         
-        # Get book data
-        book_doc = await db.books.find_one({"book_id": book_id}, {"_id": 0})
+        # Look up the data version first so cached downloads never load the book
+        book_doc = await db.books.find_one({"book_id": book_id}, {"_id": 0, "book_id": 1, "data_version": 1})
         if not book_doc:
             raise HTTPException(status_code=404, detail="Book not found")
         
-        book_data = book_doc["data"]
-        output_filename = f"bollywood_cloud_book_{book_id}.{format}"
-        output_path = OUTPUT_DIR / output_filename
+        version = book_doc.get("data_version")
+        book_data = None
+        if not version:
+            book_data = await book_store.load(book_id)
+            version = data_version(book_data)
         
-        # Generate document
-        if format == 'md':
-            DocumentGenerator.generate_markdown(book_data, str(output_path))
-        elif format == 'docx':
-            DocumentGenerator.generate_docx(book_data, str(output_path))
-        elif format == 'pdf':
-            DocumentGenerator.generate_pdf(book_data, str(output_path))
+        etag = ArtifactCache.etag(format, version)
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+        if request.headers.get("if-none-match") in (etag, "*"):
+            return Response(status_code=304, headers=headers)
         
-        return FileResponse(
-            path=str(output_path),
-            filename=output_filename,
-            media_type='application/octet-stream'
+        filename = f"bollywood_cloud_book_{book_id}.{format}"
+        artifact = await artifact_cache.cached(book_id, format, version)
+        if artifact is None:
+            if book_data is None:
+                book_data = await book_store.load(book_id)
+            
+            if format == 'md' or stream:
+                headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+                if format == 'md':
+                    # Chunked straight from the book data; nothing touches storage
+                    chunks = (chunk.encode("utf-8") for chunk in DocumentGenerator.iter_markdown(book_data))
+                    return StreamingResponse(chunks, media_type='text/markdown; charset=utf-8', headers=headers)
+                
+                # Rendered by the render workers (never a pool forked from this threaded
+                # process) into a scratch file that is unlinked once it is open
+                fd, temp_name = tempfile.mkstemp(suffix=f".{format}", dir=SCRATCH_DIR)
+                os.close(fd)
+                try:
+                    with RENDER_SECONDS.time(format=format, mode="stream"):
+                        await asyncio.get_running_loop().run_in_executor(
+                            render_pool, RENDERERS[format], book_data, temp_name
+                        )
+                    buffer = open(temp_name, "rb")
+                finally:
+                    os.unlink(temp_name)
+                return StreamingResponse(iter_buffer(buffer), media_type='application/octet-stream', headers=headers)
+            
+            artifact = await artifact_cache.get_or_render(book_id, format, version, book_data)
+        
+        output_path = storage.local_path(artifact["key"])
+        if output_path is not None:
+            return FileResponse(
+                path=str(output_path),
+                filename=filename,
+                media_type='application/octet-stream',
+                headers=headers
+            )
+        
+        # Remote storage: relay the object in chunks
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        if artifact.get("size") is not None:
+            headers["Content-Length"] = str(artifact["size"])
+        return StreamingResponse(
+            storage.iter_chunks(artifact["key"]),
+            media_type='application/octet-stream',
+            headers=headers
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error downloading book: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -345,20 +1054,99 @@ async def download_book(format: str, book_id: str):
 async def get_generation_status(book_id: str):
     """Get book generation status"""
     try:
-        gen_doc = await db.generations.find_one({"book_id": book_id}, {"_id": 0})
+        gen_doc = await db.generations.find_one(
+            {"book_id": book_id},
+            {"_id": 0, "partial": 0, "request": 0}
+        )
         if not gen_doc:
             raise HTTPException(status_code=404, detail="Generation not found")
         
+        status = gen_doc.get("status", "unknown")
+        if status == FAILED:
+            message = f"Generation failed: {gen_doc.get('error', 'unknown error')}"
+        elif status == RUNNING and gen_doc.get("sections_total"):
+            message = f"Generated {gen_doc['sections_done']} of {gen_doc['sections_total']} sections"
+        else:
+            message = f"Generation {status}"
+        
+        formats_ready = []
+        if status == COMPLETED:
+            book_doc = await db.books.find_one({"book_id": book_id}, {"_id": 0, "data_version": 1})
+            if book_doc and book_doc.get("data_version"):
+                formats_ready = await artifact_cache.ready_formats(book_id, book_doc["data_version"])
+        
         return GenerationStatus(
             book_id=book_id,
-            status=gen_doc.get("status", "unknown"),
+            status=status,
             progress=gen_doc.get("progress", 0),
-            message=f"Generation {gen_doc.get('status', 'in progress')}"
+            message=message,
+            formats_ready=formats_ready
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/generation/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Get per-language progress of a batch and, once finished, its cost report"""
+    try:
+        gen_doc = await db.generations.find_one(
+            {"book_id": batch_id, "mode": "batch"},
+            {"_id": 0, "partial": 0, "request": 0}
+        )
+        if not gen_doc:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        
+        return {
+            "batch_id": batch_id,
+            "status": gen_doc.get("status", "unknown"),
+            "progress": gen_doc.get("progress", 0),
+            "pivot_language": gen_doc.get("language"),
+            "languages": gen_doc.get("languages", {}),
+            "error": gen_doc.get("error"),
+            "report": gen_doc.get("report")
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting batch status: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """List stored request profiles, newest first"""
+    require_admin(x_admin_token)
+    return {"profiles": request_profiler.store.list()}
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Get a profile's metadata and summary (top functions, or cProfile's report)"""
+    require_admin(x_admin_token)
+    profile = request_profiler.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@api_router.get("/admin/profiles/{profile_id}/raw")
+async def download_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Download the raw profile: collapsed stacks (flame graph input) or pstats data"""
+    require_admin(x_admin_token)
+    path = request_profiler.store.raw_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path=str(path), filename=path.name, media_type='application/octet-stream')
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Get LLM response cache hit/miss metrics and client pool usage"""
+    return {
+        **llm_cache.stats(),
+        "llm_pool": get_book_generator().client_pool.stats(),
+        "rate_limiter": llm_limiter.stats()
+    }
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -370,6 +1158,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def ensure_indexes():
+    """Create the indexes every hot query relies on (no-op when they exist)"""
+    await book_store.ensure_indexes()
+    await db.chapters.create_index("chapter_id", unique=True)
+    await job_queue.ensure_indexes()
+    await upload_store.ensure_indexes()
+    await upload_store.migrate_legacy_uploads()
+    await extraction_pool.ensure_indexes()
+    await transcript_fetcher.ensure_indexes()
+    await llm_cache.ensure_indexes()
+    await artifact_cache.ensure_indexes()
+
+@app.on_event("startup")
+async def start_background_services():
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Could not create indexes: {str(e)}")
+    job_queue.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await job_queue.stop()
+    extraction_pool.shutdown()
+    transcript_fetcher.shutdown()
+    if _book_generator is not None:
+        await _book_generator.client_pool.aclose()
+    render_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Test setup: the fake LLM and mongomock from fakes.py, with storage and
+scratch files in a temp directory. Configured before any backend module is
+imported, since settings are read at import time.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fakes import FakeLlmChat, install_fake_llm, use_mock_mongo  # noqa: E402
+
+_data_dir = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.setdefault("STORAGE_ROOT", _data_dir)
+os.environ.setdefault("SCRATCH_DIR", os.path.join(_data_dir, "scratch"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_data_dir, "profiles"))
+os.environ.setdefault("PRERENDER_FORMATS", "")
+install_fake_llm()
+use_mock_mongo()
+
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    FakeLlmChat.prompts = []
+    FakeLlmChat.fail_with = None
+    return FakeLlmChat
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    """A fresh in-memory database"""
+    import mongomock_motor
+
+    return mongomock_motor.AsyncMongoMockClient()[f"test_{os.urandom(4).hex()}"]
+
+
+@pytest.fixture
+def server():
+    import server
+
+    return server
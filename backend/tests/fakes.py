@@ -0,0 +1,119 @@
+"""
+Stand-ins for external services: an LlmChat that answers instantly and
+counts what it was asked, an in-memory S3 client, and motor backed by mongomock
+"""
+import io
+import os
+import re
+import sys
+import types
+
+
+class FakeLlmChat:
+    """Replaces emergentintegrations' LlmChat; replies echo the prompt"""
+    prompts = []
+    fail_with = None  # exception raised instead of replying
+
+    def __init__(self, api_key, session_id, system_message):
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        FakeLlmChat.prompts.append(message.text)
+        if FakeLlmChat.fail_with is not None:
+            raise FakeLlmChat.fail_with
+        return f"Answer to: {message.text[:60]}"
+
+
+class FakeUserMessage:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeS3ClientError(Exception):
+    """Shaped like botocore's ClientError: the error code is in ``response``"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Body:
+    """Stand-in for botocore's StreamingBody"""
+
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+        self.closed = False
+
+    def read(self) -> bytes:
+        return self._stream.read()
+
+    def iter_chunks(self, chunk_size: int):
+        while True:
+            chunk = self._stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeS3Client:
+    """The part of the boto3 S3 client that S3Storage uses, over a dict of buckets"""
+    exceptions = types.SimpleNamespace(ClientError=FakeS3ClientError)
+
+    def __init__(self, *buckets: str):
+        self.buckets = {bucket: {} for bucket in buckets}
+        self.bodies = []  # every body handed out, to check they get closed
+
+    def _bucket(self, bucket: str) -> dict:
+        if bucket not in self.buckets:
+            raise FakeS3ClientError("NoSuchBucket")
+        return self.buckets[bucket]
+
+    def upload_file(self, filename: str, bucket: str, key: str):
+        with open(filename, "rb") as f:
+            self._bucket(bucket)[key] = f.read()
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        if Key not in self._bucket(Bucket):
+            raise FakeS3ClientError("404")
+        return {"ContentLength": len(self.buckets[Bucket][Key])}
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None) -> dict:
+        if Key not in self._bucket(Bucket):
+            raise FakeS3ClientError("NoSuchKey")
+        data = self.buckets[Bucket][Key]
+        if Range is not None:
+            start, end = re.fullmatch(r"bytes=(\d+)-(\d*)", Range).groups()
+            data = data[int(start):int(end) + 1 if end else None]
+        body = FakeS3Body(data)
+        self.bodies.append(body)
+        return {"Body": body}
+
+    def delete_object(self, Bucket: str, Key: str):
+        self._bucket(Bucket).pop(Key, None)
+
+
+def install_fake_llm():
+    """Register the fake client under the emergentintegrations import path"""
+    chat_module = types.ModuleType("emergentintegrations.llm.chat")
+    chat_module.LlmChat = FakeLlmChat
+    chat_module.UserMessage = FakeUserMessage
+    sys.modules["emergentintegrations"] = types.ModuleType("emergentintegrations")
+    sys.modules["emergentintegrations.llm"] = types.ModuleType("emergentintegrations.llm")
+    sys.modules["emergentintegrations.llm.chat"] = chat_module
+    os.environ.setdefault("EMERGENT_LLM_KEY", "test")
+
+
+def use_mock_mongo():
+    """Swap motor's client for mongomock_motor's before server is imported"""
+    import motor.motor_asyncio
+    import mongomock_motor
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "test")
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import artifact_cache
+from artifact_cache import ArtifactCache, READY, data_version
+from object_storage import LocalStorage
+
+pytestmark = pytest.mark.anyio
+
+BOOK = {"title": "Cloud Computing", "chapters": [{"number": 1, "content": "Regions"}]}
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Renderers that write 100 bytes and record what they rendered"""
+    calls = []
+
+    def render(fmt):
+        def write(book_data, path):
+            calls.append(fmt)
+            with open(path, "wb") as f:
+                f.write(fmt.encode().ljust(100, b"."))
+        return write
+
+    monkeypatch.setattr(artifact_cache, "RENDERERS", {fmt: render(fmt) for fmt in ("md", "docx", "pdf")})
+    return calls
+
+
+@pytest.fixture
+async def cache(db, tmp_path):
+    cache = ArtifactCache(LocalStorage(tmp_path / "storage"), db.artifacts, scratch_dir=tmp_path,
+                          max_bytes=250, poll_interval=0.01)
+    await cache.ensure_indexes()
+    return cache
+
+
+async def test_concurrent_downloads_render_once(cache, renders):
+    version = data_version(BOOK)
+    docs = await asyncio.gather(*(cache.get_or_render("book-1", "md", version, BOOK) for _ in range(5)))
+
+    assert renders == ["md"]
+    assert all(doc == {"key": cache.key_for("book-1", "md", version), "size": 100} for doc in docs)
+    assert cache.storage.read_range(docs[0]["key"]).startswith(b"md")
+    assert await cache.cached("book-1", "md", version) == docs[0]
+    assert await cache.cached("book-1", "md", data_version({**BOOK, "title": "Edited"})) is None
+
+
+async def test_other_workers_wait_for_the_render_lease(cache, renders):
+    other = ArtifactCache(cache.storage, cache.collection, scratch_dir=cache.scratch_dir, poll_interval=0.01)
+    key = cache.key_for("book-1", "pdf", "v1")
+    assert await cache._claim(key)
+    assert not await other._claim(key)
+
+    waiting = asyncio.ensure_future(other.get_or_render("book-1", "pdf", "v1", BOOK))
+    await asyncio.sleep(0.05)
+    assert not waiting.done()
+    await cache._render("book-1", "pdf", "v1", BOOK)
+
+    assert (await waiting)["key"] == key
+    assert renders == ["pdf"]
+
+
+async def test_expired_lease_is_taken_over(cache, renders):
+    cache.lease_seconds = -1
+    key = cache.key_for("book-1", "docx", "v1")
+    assert await cache._claim(key)
+
+    other = ArtifactCache(cache.storage, cache.collection, scratch_dir=cache.scratch_dir)
+    doc = await other.get_or_render("book-1", "docx", "v1", BOOK)
+    assert doc["key"] == key
+
+
+async def test_least_recently_used_artifacts_are_evicted_over_quota(cache, renders):
+    for book_id in ("old", "middle"):
+        await cache.get_or_render(book_id, "md", "v1", BOOK)
+        # Mongo keeps timestamps to the millisecond
+        await asyncio.sleep(0.01)
+    # Reading "old" makes "middle" the least recently used
+    assert await cache.cached("old", "md", "v1")
+    await asyncio.sleep(0.01)
+    await cache.get_or_render("new", "md", "v1", BOOK)
+
+    assert await cache.cached("middle", "md", "v1") is None
+    assert not cache.storage.exists(cache.key_for("middle", "md", "v1"))
+    assert await cache.cached("old", "md", "v1") and await cache.cached("new", "md", "v1")
+    assert await cache.total_size() == 200
+    assert await cache.reconcile_total() == 200
+
+
+async def test_prerender_makes_every_format_ready(cache, renders):
+    cache.max_bytes = 1000
+    cache.prerender("book-1", "v1", BOOK, formats=["pdf", "docx", "md"])
+    await asyncio.gather(*cache._background)
+
+    assert sorted(renders) == ["docx", "md", "pdf"]
+    assert await cache.ready_formats("book-1", "v1") == ["md", "docx", "pdf"]
+    assert await cache.collection.count_documents({"status": READY}) == 3
@@ -0,0 +1,111 @@
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+LANGUAGES = ["english", "hindi", "tamil"]
+
+
+@pytest.fixture
+async def client(server):
+    await server.ensure_indexes()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def run_batch(server, client) -> dict:
+    """Queue a batch and run it to the end on this task instead of a worker"""
+    response = await client.post("/api/generate/batch", json={"languages": LANGUAGES},
+                                 headers={"X-Session-Id": "alice"})
+    assert response.status_code == 200
+    batch_id = response.json()["book_id"]
+
+    job = await server.job_queue._claim()
+    assert job["book_id"] == batch_id
+    await server.job_queue._run(job)
+
+    response = await client.get(f"/api/generation/batch/{batch_id}")
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_batch_report_compares_against_independent_books(server, client):
+    batch = await run_batch(server, client)
+
+    assert batch["status"] == "completed"
+    assert all(state["status"] == "completed" for state in batch["languages"].values())
+    report = batch["report"]
+    assert report["languages"] == len(LANGUAGES)
+    assert report["failed_languages"] == []
+
+    pivot_usage = batch["languages"]["english"]["usage"]
+    pivot_calls = pivot_usage["calls"] + pivot_usage["cached"]
+    pivot_tokens = pivot_usage["tokens"] + pivot_usage["cached_tokens"]
+    assert report["independent_estimate"] == {
+        "llm_calls": pivot_calls * len(LANGUAGES),
+        "tokens": pivot_tokens * len(LANGUAGES)
+    }
+    for key in ("llm_calls", "tokens"):
+        assert report["saved"][key] == report["independent_estimate"][key] - report["batch"][key]
+    assert report["saved"]["tokens"] > 0
+
+
+async def test_batch_report_does_not_depend_on_the_cache(server, client):
+    first = (await run_batch(server, client))["report"]
+    # Every section of the second run is answered from the response cache
+    second = (await run_batch(server, client))["report"]
+
+    assert second["llm_usage"]["llm_calls"] == 0
+    assert second["llm_usage"]["cached"] > 0
+    assert second["batch"] == first["batch"]
+    assert second["independent_estimate"] == first["independent_estimate"]
+    assert second["saved"] == first["saved"]
+
+
+async def test_failed_language_does_not_fail_the_batch(server, client, monkeypatch):
+    generator = server.get_book_generator()
+    translate_book = generator.translate_book
+
+    async def failing_translate(pivot_book, language, **kwargs):
+        if language == "tamil":
+            raise RuntimeError("translation backend unavailable")
+        return await translate_book(pivot_book, language, **kwargs)
+
+    monkeypatch.setattr(generator, "translate_book", failing_translate)
+    batch = await run_batch(server, client)
+
+    assert batch["status"] == "completed"
+    assert batch["languages"]["tamil"]["status"] == "failed"
+    assert "unavailable" in batch["languages"]["tamil"]["error"]
+    assert batch["languages"]["hindi"]["status"] == "completed"
+    report = batch["report"]
+    assert report["failed_languages"] == ["tamil"]
+    assert report["languages"] == len(LANGUAGES) - 1
+
+
+async def test_revision_of_translated_book_reuses_unchanged_sections(server, client):
+    batch = await run_batch(server, client)
+    book_id = batch["languages"]["hindi"]["book_id"]
+    book = await server.book_store.get(book_id)
+    pivot = await server.book_store.get(batch["languages"]["english"]["book_id"])
+    assert book["fingerprints"]
+    assert book["fingerprints"] == server.get_book_generator().translation_fingerprints(
+        pivot["fingerprints"], "hindi"
+    )
+
+    response = await client.post(f"/api/books/{book_id}/revisions", json={"chapters": [2]},
+                                 headers={"X-Session-Id": "alice"})
+    assert response.status_code == 200
+    revision_id = response.json()["book_id"]
+    job = await server.job_queue._claim()
+    await server.job_queue._run(job)
+
+    revision = await server.book_store.get(revision_id)
+    sections = set(book["fingerprints"])
+    assert set(revision["reused_sections"]) == sections - {"chapter_2"}
+    assert revision["pivot_language"] == "english"
+    # Reused sections keep their translation fingerprints, so the next revision reuses them too
+    for key in sections - {"chapter_2"}:
+        assert revision["fingerprints"][key] == book["fingerprints"][key]
+    assert revision["fingerprints"]["chapter_2"] != book["fingerprints"]["chapter_2"]
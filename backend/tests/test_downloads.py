@@ -0,0 +1,50 @@
+import uuid
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+BOOK = {
+    "title_page": "Cloud Computing, Bollywood Style",
+    "toc": "1. Cloud Basics",
+    "chapters": [{"number": 1, "title": "Cloud Basics", "content": "Regions and availability zones.\n\nAutoscaling."}]
+}
+
+
+@pytest.fixture
+async def client(server):
+    await server.ensure_indexes()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def book_id(server):
+    book_id = str(uuid.uuid4())
+    await server.save_book(book_id, "english", BOOK, {})
+    return book_id
+
+
+@pytest.mark.parametrize("fmt, magic", [("pdf", b"%PDF"), ("docx", b"PK")])
+async def test_streamed_export_is_rendered_by_the_render_workers(server, client, book_id, fmt, magic):
+    scratch_before = set(server.SCRATCH_DIR.iterdir())
+    response = await client.get(f"/api/download/{fmt}/{book_id}", params={"stream": "true"})
+
+    assert response.status_code == 200
+    assert response.content.startswith(magic)
+    assert "attachment" in response.headers["content-disposition"]
+    # Nothing is cached or left behind
+    assert await server.db.artifacts.count_documents({"book_id": book_id}) == 0
+    assert set(server.SCRATCH_DIR.iterdir()) == scratch_before
+
+
+async def test_cached_export_is_stored_and_revalidated(server, client, book_id):
+    response = await client.get(f"/api/download/pdf/{book_id}")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert await server.db.artifacts.count_documents({"book_id": book_id, "status": "ready"}) == 1
+
+    again = await client.get(f"/api/download/pdf/{book_id}", headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
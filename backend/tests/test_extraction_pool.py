@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+import pytest
+from pptx import Presentation
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+import file_processor
+from file_processor import ExtractionPool, FileProcessor
+
+pytestmark = pytest.mark.anyio
+
+
+def make_pdf(path, pages: int):
+    pdf = canvas.Canvas(str(path), pagesize=letter)
+    for n in range(pages):
+        pdf.drawString(72, 720, f"Page {n + 1}: regions and availability zones")
+        pdf.showPage()
+    pdf.save()
+
+
+async def test_inline_extraction_matches_the_serial_extractor(db, tmp_path):
+    path = tmp_path / "slides.pdf"
+    make_pdf(path, 7)
+    pool = ExtractionPool(max_workers=0, pages_per_shard=3, page_cache=db.extracted_pages)
+    await pool.ensure_indexes()
+
+    text = await pool.process_file(str(path), "pdf", "hash-1")
+    assert text == FileProcessor.extract_pdf_text(str(path))
+    assert "Page 7" in text
+    assert await db.extracted_pages.count_documents({"content_hash": "hash-1"}) == 7
+
+    # A repeat only extracts the pages missing from the cache
+    await db.extracted_pages.delete_many({"page": {"$gte": 5}})
+    assert await pool.process_file(str(path), "pdf", "hash-1") == text
+    assert await db.extracted_pages.count_documents({"content_hash": "hash-1"}) == 7
+
+
+def make_pptx(path, slides: int):
+    deck = Presentation()
+    for n in range(slides):
+        slide = deck.slides.add_slide(deck.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {n + 1}"
+        slide.placeholders[1].text = "Public, private and hybrid clouds"
+    deck.save(str(path))
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Count how often files are parsed"""
+    counts = {"pdf": 0, "pptx": 0}
+    pdf_reader, presentation = file_processor.PyPDF2.PdfReader, file_processor.Presentation
+
+    def counting_pdf_reader(*args, **kwargs):
+        counts["pdf"] += 1
+        return pdf_reader(*args, **kwargs)
+
+    def counting_presentation(*args, **kwargs):
+        counts["pptx"] += 1
+        return presentation(*args, **kwargs)
+
+    monkeypatch.setattr(file_processor.PyPDF2, "PdfReader", counting_pdf_reader)
+    monkeypatch.setattr(file_processor, "Presentation", counting_presentation)
+    monkeypatch.setattr(file_processor, "_last_parsed", None)
+    return counts
+
+
+@pytest.mark.parametrize("file_type, make", [("pdf", make_pdf), ("pptx", make_pptx)])
+async def test_shards_of_a_file_share_one_parse(tmp_path, parses, file_type, make):
+    path = tmp_path / f"deck.{file_type}"
+    make(path, 9)
+    pool = ExtractionPool(max_workers=0, pages_per_shard=2)
+
+    text = await pool.process_file(str(path), file_type)
+    assert "Slide 9" in text or "Page 9" in text
+    assert parses[file_type] == 1
+
+
+async def test_inline_extraction_of_plain_text(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Serverless functions scale to zero.", encoding="utf-8")
+    pool = ExtractionPool(max_workers=0)
+
+    assert await pool.process_file(str(path), "txt") == "Serverless functions scale to zero."
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+async def test_timeout_stops_only_the_stuck_worker(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_text("IaaS, PaaS and SaaS", encoding="utf-8")
+    # Reading a FIFO blocks until someone writes to it
+    stuck = tmp_path / "stuck.txt"
+    slow = tmp_path / "slow.txt"
+    os.mkfifo(stuck)
+    os.mkfifo(slow)
+
+    pool = ExtractionPool(max_workers=2, max_concurrent=2, timeout=3)
+    try:
+        # Start both workers before the clock matters
+        await asyncio.gather(*(pool.process_file(str(notes), "txt") for _ in range(2)))
+        assert len(pool._idle) == 2
+        workers = {worker.process.pid: worker.process for worker in pool._idle}
+
+        stuck_job = asyncio.ensure_future(pool.process_file(str(stuck), "txt"))
+        await asyncio.sleep(1)
+        slow_job = asyncio.ensure_future(pool.process_file(str(slow), "txt"))
+
+        with pytest.raises(Exception, match="timed out"):
+            await stuck_job
+        # The other file, still being read when the stuck one was stopped, finishes normally
+        await asyncio.to_thread(slow.write_text, "still here", encoding="utf-8")
+        assert await slow_job == "still here"
+
+        assert sum(process.is_alive() for process in workers.values()) == 1
+        assert await pool.process_file(str(notes), "txt") == "IaaS, PaaS and SaaS"
+    finally:
+        pool.shutdown()
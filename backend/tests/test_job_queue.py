@@ -0,0 +1,113 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from job_queue import BookJobQueue, COMPLETED, FAILED, QUEUED, RUNNING
+
+pytestmark = pytest.mark.anyio
+
+
+def make_queue(db, handler, **kwargs):
+    return BookJobQueue(db.generations, handler, workers=1, lease_seconds=60, **kwargs)
+
+
+async def test_claimed_job_runs_to_completion(db):
+    seen = []
+
+    async def handler(job, update):
+        seen.append(job["book_id"])
+        await update({"progress": 50})
+
+    queue = make_queue(db, handler)
+    await queue.ensure_indexes()
+    await queue.enqueue("book-1", {"language": "english"})
+
+    job = await queue._claim()
+    assert job["status"] == RUNNING and job["attempts"] == 1 and job["worker_id"] == queue.worker_id
+    await queue._run(job)
+
+    doc = await db.generations.find_one({"book_id": "book-1"})
+    assert seen == ["book-1"]
+    assert doc["status"] == COMPLETED and doc["progress"] == 100
+    assert "lease_expires_at" not in doc
+    assert await queue._claim() is None
+
+
+async def test_live_lease_is_not_claimed(db):
+    queue = make_queue(db, None)
+    await db.generations.insert_one({
+        "book_id": "book-1",
+        "status": RUNNING,
+        "worker_id": "other",
+        "attempts": 1,
+        "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=60),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    assert await queue._claim() is None
+
+
+async def test_expired_lease_is_resumed_from_partial(db):
+    resumed = []
+
+    async def handler(job, update):
+        resumed.append(job.get("partial"))
+
+    queue = make_queue(db, handler)
+    await db.generations.insert_one({
+        "book_id": "book-1",
+        "status": RUNNING,
+        "worker_id": "crashed",
+        "attempts": 1,
+        "partial": {"title_page": "done"},
+        "lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+
+    job = await queue._claim()
+    assert job["attempts"] == 2 and job["worker_id"] == queue.worker_id
+    await queue._run(job)
+
+    assert resumed == [{"title_page": "done"}]
+    doc = await db.generations.find_one({"book_id": "book-1"})
+    assert doc["status"] == COMPLETED and "partial" not in doc
+
+
+async def test_gives_up_after_max_attempts(db):
+    async def handler(job, update):
+        raise AssertionError("must not run")
+
+    queue = make_queue(db, handler, max_attempts=2)
+    await db.generations.insert_one({
+        "book_id": "book-1",
+        "status": RUNNING,
+        "worker_id": "crashed",
+        "attempts": 2,
+        "lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+
+    await queue._run(await queue._claim())
+
+    doc = await db.generations.find_one({"book_id": "book-1"})
+    assert doc["status"] == FAILED and "2 attempts" in doc["error"]
+
+
+async def test_failed_job_is_not_claimed_again(db):
+    async def handler(job, update):
+        raise RuntimeError("LLM down")
+
+    queue = make_queue(db, handler)
+    await queue.enqueue("book-1", {})
+    await queue._run(await queue._claim())
+
+    doc = await db.generations.find_one({"book_id": "book-1"})
+    assert doc["status"] == FAILED and doc["error"] == "LLM down"
+    assert await queue._claim() is None
+
+
+async def test_jobs_are_claimed_oldest_first(db):
+    queue = make_queue(db, None)
+    await queue.enqueue("first", {})
+    await queue.enqueue("second", {})
+    assert (await queue._claim())["book_id"] == "first"
+    assert (await db.generations.find_one({"book_id": "second"}))["status"] == QUEUED
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from book_generator import BollywoodBookGenerator
+from llm_cache import LlmResponseCache, MemoryCacheTier, MongoCacheTier, make_cache_key
+
+pytestmark = pytest.mark.anyio
+
+
+class BrokenTier:
+    name = "broken"
+
+    async def get(self, key):
+        raise ConnectionError("cache is down")
+
+    async def set(self, key, value):
+        raise ConnectionError("cache is down")
+
+
+def test_key_covers_every_field():
+    key = make_cache_key("openai/gpt", "system", "prompt")
+
+    assert key == make_cache_key("openai/gpt", "system", "prompt")
+    assert key != make_cache_key("openai/gpt-mini", "system", "prompt")
+    assert key != make_cache_key("openai/gpt", "system", "prompt!")
+    # Moving text across the system/prompt boundary changes the key
+    assert make_cache_key("m", "ab", "c") != make_cache_key("m", "a", "bc")
+
+
+async def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryCacheTier(max_entries=2)
+    await tier.set("a", "1")
+    await tier.set("b", "2")
+    assert await tier.get("a") == "1"
+    await tier.set("c", "3")
+
+    assert await tier.get("b") is None
+    assert await tier.get("a") == "1" and await tier.get("c") == "3"
+
+
+async def test_memory_tier_is_bounded_by_bytes_and_ttl():
+    tier = MemoryCacheTier(max_bytes=10)
+    await tier.set("big", "x" * 11)
+    await tier.set("a", "x" * 6)
+    await tier.set("b", "x" * 6)
+    assert await tier.get("big") is None
+    assert await tier.get("a") is None and await tier.get("b") == "x" * 6
+
+    expired = MemoryCacheTier(ttl_seconds=-1)
+    await expired.set("a", "1")
+    assert await expired.get("a") is None
+    assert len(expired) == 0
+
+
+async def test_mongo_tier_round_trip_and_expiry(db):
+    tier = MongoCacheTier(db.llm_cache)
+    await tier.ensure_indexes()
+    await tier.set("a", "answer")
+    assert await tier.get("a") == "answer"
+
+    # The TTL monitor runs once a minute, so expired entries are also skipped on read
+    await db.llm_cache.update_one({"key": "a"}, {"$set": {"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    assert await tier.get("a") is None
+
+
+async def test_mongo_tier_trims_least_recently_used(db):
+    tier = MongoCacheTier(db.llm_cache, max_entries=3, trim_every=5)
+    for n in range(5):
+        await tier.set(f"k{n}", str(n))
+
+    assert await db.llm_cache.count_documents({}) == 3
+    assert await tier.get("k0") is None and await tier.get("k4") == "4"
+
+
+async def test_hits_in_slower_tiers_fill_faster_ones(db):
+    memory, mongo = MemoryCacheTier(), MongoCacheTier(db.llm_cache)
+    await mongo.set("a", "answer")
+    cache = LlmResponseCache([memory, mongo])
+
+    assert await cache.get("a") == "answer"
+    assert await memory.get("a") == "answer"
+    assert await cache.get("missing") is None
+    assert cache.stats()["hits_by_tier"] == {"memory": 0, "mongo": 1}
+    assert cache.stats()["misses"] == 1
+
+
+async def test_failing_tier_is_a_miss():
+    memory = MemoryCacheTier()
+    cache = LlmResponseCache([BrokenTier(), memory])
+    await cache.set("a", "answer")
+
+    assert await cache.get("a") == "answer"
+    assert await cache.get("b") is None
+
+
+async def test_identical_prompts_are_answered_from_the_cache(fake_llm):
+    generator = BollywoodBookGenerator(cache=LlmResponseCache([MemoryCacheTier()]))
+
+    first = await generator.generate_chapter(1, "Cloud Basics", "english")
+    assert await generator.generate_chapter(1, "Cloud Basics", "english") == first
+    assert len(fake_llm.prompts) == 1
+
+    await generator.generate_chapter(1, "Cloud Basics", "hindi")
+    await generator.generate_chapter(1, "Cloud Basics", "english", use_cache=False)
+    assert len(fake_llm.prompts) == 3
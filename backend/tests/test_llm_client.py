@@ -0,0 +1,80 @@
+import importlib
+import sys
+import types
+
+import httpx
+import pytest
+
+import llm_client
+from llm_client import LlmClientPool
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fake_litellm(monkeypatch):
+    module = types.ModuleType("litellm")
+    module.aclient_session = None
+    monkeypatch.setitem(sys.modules, "litellm", module)
+    return module
+
+
+async def test_pool_installs_its_client_as_litellm_session(fake_litellm):
+    pool = LlmClientPool("key", "openai", "gpt-4o", pool_size=2)
+    async with pool.slot():
+        assert fake_litellm.aclient_session is pool.http_client()
+        assert not fake_litellm.aclient_session.is_closed
+
+    # The same client serves later calls, so their connections are reused
+    client = fake_litellm.aclient_session
+    async with pool.slot():
+        assert fake_litellm.aclient_session is client
+
+    await pool.aclose()
+    assert fake_litellm.aclient_session is None
+    assert client.is_closed
+
+
+def chat_completion(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "Namaste, cloud!"},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+    })
+
+
+async def test_llm_chat_sends_through_the_pooled_client(monkeypatch):
+    """Needs the real emergentintegrations and litellm (requirements.txt), not the test fakes"""
+    for name in [m for m in sys.modules if m.split(".")[0] in ("emergentintegrations", "litellm")]:
+        monkeypatch.delitem(sys.modules, name)
+    try:
+        chat = importlib.import_module("emergentintegrations.llm.chat")
+    except ImportError:
+        pytest.skip("emergentintegrations is not installed")
+    pytest.importorskip("litellm")
+    monkeypatch.setattr(llm_client, "LlmChat", chat.LlmChat)
+    monkeypatch.setattr(llm_client, "UserMessage", chat.UserMessage)
+
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return chat_completion(request)
+
+    pool = LlmClientPool("sk-test", "openai", "gpt-4o")
+    pool._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pool._install()
+    try:
+        answer = await pool.send("You are a professor.", "title_english", "Say hello", timeout=30)
+    finally:
+        await pool.aclose()
+
+    assert "Namaste" in answer
+    assert len(requests) == 1
@@ -0,0 +1,36 @@
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def scrape_jobs(server) -> dict:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/metrics")
+    assert response.status_code == 200
+    jobs = {}
+    for line in response.text.splitlines():
+        if line.startswith("generation_jobs{"):
+            labels, value = line.rsplit(" ", 1)
+            jobs[labels.split('"')[1]] = float(value)
+    return jobs
+
+
+async def test_job_gauges_are_counted_once_per_ttl(server, db, monkeypatch):
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "_job_metrics_expire_at", 0.0)
+    await db.generations.insert_many([
+        {"book_id": "a", "status": server.QUEUED},
+        {"book_id": "b", "status": server.QUEUED},
+        {"book_id": "c", "status": server.COMPLETED}
+    ])
+    first = await scrape_jobs(server)
+    assert first == {"queued": 2, "running": 0, "completed": 1, "failed": 0}
+
+    # A scrape within the TTL reuses the counts
+    await db.generations.insert_one({"book_id": "d", "status": server.FAILED})
+    assert await scrape_jobs(server) == first
+
+    monkeypatch.setattr(server, "_job_metrics_expire_at", 0.0)
+    assert (await scrape_jobs(server))["failed"] == 1
@@ -0,0 +1,74 @@
+import pytest
+
+from fakes import FakeS3Client
+from object_storage import S3Storage
+
+BUCKET = "books"
+
+
+@pytest.fixture(params=["fake", "moto"])
+def s3(request, monkeypatch):
+    """S3Storage over the in-memory fake client, and over moto when it is installed"""
+    if request.param == "fake":
+        client = FakeS3Client(BUCKET)
+        yield S3Storage(BUCKET, prefix="/tenant/", client=client)
+        # Every body S3Storage opened was closed again
+        assert all(body.closed for body in client.bodies)
+        return
+
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    mock = moto.mock_aws() if hasattr(moto, "mock_aws") else moto.mock_s3()
+    with mock:
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield S3Storage(BUCKET, prefix="/tenant/", client=client)
+
+
+def test_put_get_exists_delete(s3, tmp_path):
+    source = tmp_path / "book.pdf"
+    data = bytes(range(256)) * 1000
+    source.write_bytes(data)
+
+    assert not s3.exists("outputs/book.pdf")
+    assert s3.size("outputs/book.pdf") is None
+    s3.put_file("outputs/book.pdf", source)
+
+    # The local file is consumed, like LocalStorage.put_file moves it
+    assert not source.exists()
+    assert s3.exists("outputs/book.pdf")
+    assert s3.size("outputs/book.pdf") == len(data)
+    assert s3.local_path("outputs/book.pdf") is None
+    assert b"".join(s3.iter_chunks("outputs/book.pdf", chunk_size=4096)) == data
+    assert s3.read_range("outputs/book.pdf") == data
+    assert s3.read_range("outputs/book.pdf", 10, 20) == data[10:20]
+    assert s3.read_range("outputs/book.pdf", 255_000) == data[255_000:]
+    assert s3.read_range("outputs/book.pdf", 20, 20) == b""
+
+    s3.delete("outputs/book.pdf")
+    assert not s3.exists("outputs/book.pdf")
+    # Deleting a missing object is not an error, as for LocalStorage
+    s3.delete("outputs/book.pdf")
+
+
+def test_keys_are_stored_under_the_prefix(s3, tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_bytes(b"IaaS")
+    s3.put_file("uploads/notes.txt", source)
+
+    assert s3.client.head_object(Bucket=BUCKET, Key="tenant/uploads/notes.txt")["ContentLength"] == 4
+
+
+def test_missing_objects_raise_file_not_found(s3):
+    with pytest.raises(FileNotFoundError):
+        s3.read_range("uploads/missing.pdf")
+    with pytest.raises(FileNotFoundError):
+        list(s3.iter_chunks("uploads/missing.pdf"))
+
+
+def test_other_client_errors_are_not_treated_as_missing(tmp_path):
+    s3 = S3Storage("no-such-bucket", client=FakeS3Client(BUCKET))
+    with pytest.raises(FakeS3Client.exceptions.ClientError):
+        s3.exists("uploads/notes.txt")
@@ -0,0 +1,21 @@
+from profiling import ProfileStore
+
+
+def test_profile_store_creates_its_directory_on_first_save(tmp_path):
+    root = tmp_path / "profiles"
+    store = ProfileStore(root, max_profiles=2)
+    assert not root.exists()
+    assert store.list() == []
+    assert store.get("missing") is None
+
+    for n in range(3):
+        store.save({"id": f"p{n}", "path": "/api/download/pdf"}, {"top": []}, b"raw", "prof")
+
+    assert root.is_dir()
+    assert len(store.list()) == 2
+    assert store.raw_path(store.list()[0]["id"]).read_bytes() == b"raw"
+
+
+def test_server_keeps_profiles_in_the_configured_directory(server):
+    assert server.PROFILE_DIR == server.Path(server.os.environ["PROFILE_DIR"])
+    assert server.request_profiler.store.root_dir == server.PROFILE_DIR
@@ -0,0 +1,81 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+
+from book_generator import BollywoodBookGenerator
+from rate_limiter import Caller, LlmRateLimiter, RateLimitExceeded
+from retrieval import estimate_tokens
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def client(server):
+    transport = httpx.ASGITransport(app=server.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.fixture
+def full_queue(server, monkeypatch):
+    monkeypatch.setattr(server.llm_limiter, "max_queue", 0)
+
+
+async def test_book_request_is_turned_away_when_queue_is_full(server, client, full_queue):
+    session_id = str(uuid.uuid4())
+    async with client:
+        response = await client.post("/api/generate/book", json={"language": "english"},
+                                     headers={"X-Session-Id": session_id})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert await server.db.generations.count_documents({"owner_id": session_id}) == 0
+
+
+async def test_chapter_request_is_turned_away_when_queue_is_full(client, full_queue):
+    async with client:
+        response = await client.post("/api/generate/chapter", json={
+            "language": "english",
+            "chapter_number": 1,
+            # Never cached, so the call has to reach the limiter
+            "chapter_title": f"Cloud Basics {uuid.uuid4()}"
+        })
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+async def test_interactive_callers_are_rejected_while_others_wait():
+    limiter = LlmRateLimiter(rpm=1, tpm=100000, max_queue=1)
+    await limiter.acquire(100, Caller("alice"))
+    # The bucket is empty now, so the next call has to wait for a refill
+    waiting = asyncio.ensure_future(limiter.acquire(100, Caller("bob")))
+    await asyncio.sleep(0)
+    assert limiter.queue_full()
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        await limiter.acquire(100, Caller("carol"))
+    assert excinfo.value.retry_after >= 1
+
+    job = asyncio.ensure_future(limiter.acquire(100, Caller("job", reject_when_full=False)))
+    await asyncio.sleep(0)
+    assert not job.done()
+    assert limiter.stats()["rejected"] == 1
+    waiting.cancel()
+    job.cancel()
+    await asyncio.gather(waiting, job, return_exceptions=True)
+    assert limiter.stats()["waiting"] == 0
+
+
+async def test_failed_attempts_only_keep_their_prompt_tokens(fake_llm):
+    limiter = LlmRateLimiter(rpm=600, tpm=1000000)
+    generator = BollywoodBookGenerator(max_retries=2, retry_backoff=0, limiter=limiter)
+    fake_llm.fail_with = RuntimeError("upstream error")
+
+    with pytest.raises(Exception, match="after 3 attempts"):
+        await generator.generate_chapter(1, "Cloud Basics", "english")
+
+    prompt_tokens = estimate_tokens(generator._system_message("english") + fake_llm.prompts[0])
+    assert len(fake_llm.prompts) == 3
+    assert limiter.stats()["tokens_available"] >= limiter.tpm - 3 * prompt_tokens
@@ -0,0 +1,92 @@
+from retrieval import ChunkIndex, chunk_text, estimate_tokens
+
+CLOUD = [
+    "Virtual machines run on a hypervisor that shares one physical server.",
+    "Object storage keeps files as objects in buckets with metadata.",
+    "Autoscaling adds virtual machines when load grows and removes them later.",
+    "A hypervisor isolates virtual machines from each other.",
+]
+UNRELATED = [
+    "Hypervisor hypervisor hypervisor: the word, repeated in a long chapter about history.",
+    "Machines of the industrial revolution ran on steam.",
+] * 20
+
+
+def test_chunks_overlap_and_break_at_paragraphs():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 60 for i in range(10))
+    chunks = chunk_text(text, chunk_chars=600, overlap=100)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 600 for chunk in chunks)
+    for chunk, following in zip(chunks, chunks[1:]):
+        end = text.index(chunk) + len(chunk)
+        assert text[end:].lstrip(" ").startswith("\n\n")
+        # The next chunk repeats the end of this one
+        assert text.index(following) < end
+    assert chunk_text("   ") == []
+
+
+def test_search_ranks_the_matching_chunks_first():
+    index = ChunkIndex()
+    index.add("s1", CLOUD)
+
+    results = index.search("virtual machines hypervisor", {"s1"}, top_k=2)
+    assert [index.chunks[i] for i in results] == [CLOUD[3], CLOUD[0]]
+    assert index.search("kubernetes", {"s1"}) == []
+
+
+def test_ranking_ignores_sources_outside_the_query():
+    index = ChunkIndex()
+    index.add("s1", CLOUD)
+    before = [index.chunks[i] for i in index.search("virtual machines hypervisor", {"s1"})]
+
+    index.add("s2", UNRELATED)
+    after = [index.chunks[i] for i in index.search("virtual machines hypervisor", {"s1"})]
+
+    assert after == before
+    # A process that indexed the sources in another order ranks the same way
+    other = ChunkIndex()
+    other.add("s2", UNRELATED)
+    other.add("s1", CLOUD)
+    assert [other.chunks[i] for i in other.search("virtual machines hypervisor", {"s1"})] == before
+
+
+def test_ties_are_broken_by_source_and_position():
+    first, second = ChunkIndex(), ChunkIndex()
+    first.add("b", ["cloud storage"] * 2)
+    first.add("a", ["cloud storage"])
+    second.add("a", ["cloud storage"])
+    second.add("b", ["cloud storage"] * 2)
+
+    expected = [("a", 0), ("b", 0), ("b", 1)]
+    for index in (first, second):
+        results = index.search("cloud", {"a", "b"}, top_k=3)
+        located = [
+            (source_id, chunk_id - index._ranges[source_id].start)
+            for chunk_id in results
+            for source_id in index._ranges
+            if chunk_id in index._ranges[source_id]
+        ]
+        assert located == expected
+
+
+def test_removed_and_evicted_sources_leave_the_results():
+    index = ChunkIndex(max_chunks=8)
+    index.add("old", ["cloud billing"] * 4)
+    index.add("s1", CLOUD)
+    index.remove("s1")
+    assert index.search("hypervisor") == []
+
+    index.add("new", ["cloud billing"] * 6)
+    assert not index.has_source("old")
+    assert len(index) <= 8
+    assert {index.chunks[i] for i in index.search("billing", top_k=10)} == {"cloud billing"}
+
+
+def test_context_stays_within_the_token_budget():
+    index = ChunkIndex()
+    index.add("s1", ["cloud " * 400, "cloud computing " * 100])
+
+    context = index.context("cloud", {"s1"}, token_budget=300)
+    assert context
+    assert estimate_tokens(context) <= 300
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import uuid
+
+import pytest
+
+from object_storage import LocalStorage
+from retrieval import ChunkIndex
+from upload_store import UploadStore
+from upload_stream import StreamedUpload
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeExtractionPool:
+    """Text uploads never reach extraction; release only asks to drop cached pages"""
+
+    def __init__(self):
+        self.discarded = []
+
+    async def discard_pages(self, content_hash):
+        self.discarded.append(content_hash)
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    return UploadStore(db, LocalStorage(tmp_path), FakeExtractionPool(), ChunkIndex())
+
+
+def streamed(tmp_path, text: str) -> StreamedUpload:
+    data = text.encode("utf-8")
+    temp_path = tmp_path / f".{uuid.uuid4()}.part"
+    temp_path.write_bytes(data)
+    return StreamedUpload(
+        filename="notes.txt",
+        file_ext="txt",
+        temp_path=temp_path,
+        sha256=hashlib.sha256(data).hexdigest(),
+        size=len(data),
+        text=text
+    )
+
+
+async def test_identical_uploads_share_one_blob(store, db, tmp_path):
+    await store.ensure_indexes()
+    text = "Virtualization lets one server host many machines. " * 50
+    first = await store.ingest(streamed(tmp_path, text), "notes", "alice")
+    second = await store.ingest(streamed(tmp_path, text), "notes", "bob")
+
+    assert not first["duplicate"] and second["duplicate"]
+    assert first["content_hash"] == second["content_hash"]
+    blob = await db.upload_blobs.find_one({"content_hash": first["content_hash"]})
+    assert blob["refcount"] == 2
+    assert await db.upload_blobs.count_documents({}) == 1
+    assert store.storage.exists(blob["storage_key"])
+    assert await store.load_texts([first]) == [text]
+    assert not list(tmp_path.glob(".*.part"))
+
+
+async def test_blob_is_reclaimed_with_its_last_reference(store, db, tmp_path):
+    await store.ensure_indexes()
+    text = "Containers package an application with its dependencies. " * 50
+    first = await store.ingest(streamed(tmp_path, text), "notes", "alice")
+    second = await store.ingest(streamed(tmp_path, text), "notes", "bob")
+    content_hash = first["content_hash"]
+    blob = await db.upload_blobs.find_one({"content_hash": content_hash})
+    text_key = store.text_store._object_key(blob["text"]["key"])
+
+    assert await store.release(first["id"], "alice")
+    blob = await db.upload_blobs.find_one({"content_hash": content_hash})
+    assert blob["refcount"] == 1
+    assert store.storage.exists(blob["storage_key"])
+    assert store.chunk_index.has_source(f"blob:{content_hash}")
+
+    assert await store.release(second["id"], "bob")
+    assert await db.upload_blobs.find_one({"content_hash": content_hash}) is None
+    assert not store.storage.exists(blob["storage_key"])
+    assert not store.storage.exists(text_key)
+    assert await db.upload_chunks.count_documents({"content_hash": content_hash}) == 0
+    assert not store.chunk_index.has_source(f"blob:{content_hash}")
+    assert store.extraction_pool.discarded == [content_hash]
+
+
+async def test_release_checks_the_owner(store, tmp_path):
+    doc = await store.ingest(streamed(tmp_path, "load balancers spread traffic"), "notes", "alice")
+
+    assert not await store.release(doc["id"], "bob")
+    assert not await store.release(doc["id"], None)
+    assert await store.release(doc["id"], "alice")
+    assert not await store.release(doc["id"], "alice")
+
+
+async def test_find_is_scoped_to_the_owner(store, db, tmp_path):
+    alice = await store.ingest(streamed(tmp_path, "alice's notes on IaaS"), "notes", "alice")
+    bob = await store.ingest(streamed(tmp_path, "bob's notes on PaaS"), "notes", "bob")
+
+    assert [u["id"] for u in await store.find("alice")] == [alice["id"]]
+    assert [u["id"] for u in await store.find("bob")] == [bob["id"]]
+    assert await store.find("alice", [bob["id"]]) == []
+    assert await store.find("mallory") == []
+
+
+async def test_without_an_owner_only_migrated_legacy_uploads_are_found(store, db, tmp_path):
+    await store.ingest(streamed(tmp_path, "alice's notes"), "notes", "alice")
+    # From before uploads had owners (no owner_id field at all)
+    await db.uploads.insert_one({"id": "legacy", "type": "notes", "content": "SaaS", "created_at": "2024-01-01"})
+    # Stored without a session after owners existed
+    await db.uploads.insert_one({"id": "anonymous", "owner_id": None, "type": "notes", "content": "FaaS",
+                                 "created_at": "2024-01-02"})
+
+    assert await store.find(None) == []
+    assert await store.migrate_legacy_uploads() == 1
+    assert [u["id"] for u in await store.find(None)] == ["legacy"]
+    assert not await store.release("legacy", None)
+    assert await db.uploads.count_documents({"id": "legacy"}) == 1
+
+
+async def test_legacy_migration_runs_once(store, db):
+    await db.uploads.insert_one({"id": "legacy", "type": "notes", "content": "SaaS", "created_at": "2024-01-01"})
+    assert await store.migrate_legacy_uploads() == 1
+
+    # Another worker starting up (or a restart) finds the marker and does nothing
+    await db.uploads.insert_one({"id": "later", "type": "notes", "content": "FaaS", "created_at": "2024-01-02"})
+    assert await store.migrate_legacy_uploads() == 0
+    assert [u["id"] for u in await store.find(None)] == ["legacy"]
+    marker = await db.migrations.find_one({"_id": "legacy_upload_owners"})
+    assert marker["modified"] == 1 and marker["completed_at"]
+
+
+async def test_failed_legacy_migration_can_run_again(store, db, monkeypatch):
+    await db.uploads.insert_one({"id": "legacy", "type": "notes", "content": "SaaS", "created_at": "2024-01-01"})
+
+    async def failing_update(*args, **kwargs):
+        raise RuntimeError("primary stepped down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(store.uploads, "update_many", failing_update)
+        with pytest.raises(RuntimeError):
+            await store.migrate_legacy_uploads()
+
+    assert await store.migrate_legacy_uploads() == 1
+
+
+async def test_blobs_of_the_same_content_never_share_objects(store, db, tmp_path):
+    await store.ensure_indexes()
+    text = "Edge locations cache content close to users. " * 50
+    first = await store.ingest(streamed(tmp_path, text), "notes", "alice")
+    old_blob = await db.upload_blobs.find_one({"content_hash": first["content_hash"]})
+    await store.release(first["id"], "alice")
+
+    again = await store.ingest(streamed(tmp_path, text), "notes", "alice")
+    blob = await db.upload_blobs.find_one({"content_hash": again["content_hash"]})
+    # Whatever a late reclaim of the old blob deletes, the new one is untouched
+    store.storage.delete(old_blob["storage_key"])
+    await store.text_store.delete(old_blob["text"])
+
+    assert blob["storage_key"] != old_blob["storage_key"]
+    assert store.storage.exists(blob["storage_key"])
+    assert await store.load_texts([again]) == [text]
+
+
+async def test_concurrent_first_uploads_keep_one_copy(store, db, tmp_path):
+    await store.ensure_indexes()
+    text = "Spot instances are cheap but can be reclaimed. " * 50
+    docs = await asyncio.gather(*(store.ingest(streamed(tmp_path, text), "notes", owner) for owner in ("alice", "bob")))
+
+    blob = await db.upload_blobs.find_one({"content_hash": docs[0]["content_hash"]})
+    assert blob["refcount"] == 2
+    stored = [p for p in (tmp_path / "uploads").rglob("*") if p.is_file()]
+    assert sorted(p.name for p in stored) == sorted([
+        blob["storage_key"].rsplit("/", 1)[-1],
+        store.text_store._object_key(blob["text"]["key"]).rsplit("/", 1)[-1]
+    ])
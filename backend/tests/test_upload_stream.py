@@ -0,0 +1,102 @@
+import hashlib
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from upload_stream import receive_upload
+
+pytestmark = pytest.mark.anyio
+
+BOUNDARY = "test-boundary"
+
+
+def multipart(filename: str, data: bytes, field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="description"\r\n\r\n'
+        f"lecture notes\r\n"
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def in_chunks(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        upload = await receive_upload(request, tmp_path, ["txt", "pdf"], max_bytes=1024)
+        return {
+            "filename": upload.filename,
+            "file_ext": upload.file_ext,
+            "sha256": upload.sha256,
+            "size": upload.size,
+            "text": upload.text,
+            "stored": upload.temp_path.read_bytes().decode("utf-8", "replace")
+        }
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def post(client, body, **headers):
+    return client.post("/upload", content=body, headers={
+        "Content-Type": f"multipart/form-data; boundary={BOUNDARY}", **headers
+    })
+
+
+async def test_text_upload_is_hashed_and_decoded_while_streaming(client):
+    # Split into 7-byte pieces so multi-byte characters straddle chunks
+    data = "Cloud ☁️ computing: बादल कंप्यूटिंग\n".encode("utf-8") * 10
+    async with client:
+        response = await post(client, in_chunks(multipart("notes.txt", data), 7))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["filename"] == "notes.txt" and body["file_ext"] == "txt"
+    assert body["sha256"] == hashlib.sha256(data).hexdigest()
+    assert body["size"] == len(data)
+    assert body["text"] == body["stored"] == data.decode("utf-8")
+
+
+async def test_binary_formats_are_not_decoded(client):
+    async with client:
+        response = await post(client, multipart("slides.pdf", b"%PDF-1.4 fake"))
+
+    assert response.status_code == 200
+    assert response.json()["text"] is None
+
+
+async def test_oversized_upload_is_rejected_without_leftovers(client, tmp_path):
+    async with client:
+        response = await post(client, in_chunks(multipart("notes.txt", b"x" * 2000), 256))
+
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_declared_length_over_the_limit_is_rejected_up_front(client):
+    async with client:
+        response = await post(client, multipart("notes.txt", b"short"), **{"Content-Length": str(10 ** 9)})
+
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (multipart("slides.pptx", b"data"), f"multipart/form-data; boundary={BOUNDARY}"),
+    (multipart("notes.txt", b"data", field="attachment"), f"multipart/form-data; boundary={BOUNDARY}"),
+    (b'{"file": "notes.txt"}', "application/json"),
+])
+async def test_bad_requests_are_rejected(client, tmp_path, body, content_type):
+    async with client:
+        response = await client.post("/upload", content=body, headers={"Content-Type": content_type})
+
+    assert response.status_code == 400
+    assert list(tmp_path.iterdir()) == []
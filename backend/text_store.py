@@ -0,0 +1,88 @@
+"""
+Compressed on-disk storage for extracted text
+Text is written as a sequence of gzip members of BLOCK_CHARS characters each,
+so the file is an ordinary .gz while any character range can be read by
+decompressing only the blocks it covers. Mongo documents keep just the pointer
+returned by ``put`` (key, length and block offsets). Files are kept in an
+object storage backend, read back with ranged reads.
+"""
+import asyncio
+import gzip
+import os
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+BLOCK_CHARS = int(os.environ.get('TEXT_STORE_BLOCK_CHARS', str(64 * 1024)))
+COMPRESS_LEVEL = int(os.environ.get('TEXT_STORE_COMPRESS_LEVEL', '6'))
+
+
+class TextStore:
+    def __init__(
+        self,
+        storage,
+        prefix: str = "uploads/text",
+        scratch_dir: Optional[Path] = None,
+        block_chars: int = BLOCK_CHARS
+    ):
+        self.storage = storage
+        self.prefix = prefix
+        self.scratch_dir = scratch_dir  # None uses the system temp directory
+        self.block_chars = block_chars
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}.txt.gz"
+
+    def _write(self, key: str, text: str) -> Dict:
+        fd, temp_name = tempfile.mkstemp(suffix=".part", dir=self.scratch_dir)
+        offsets = []
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for start in range(0, len(text), self.block_chars):
+                    offsets.append(f.tell())
+                    f.write(gzip.compress(text[start:start + self.block_chars].encode("utf-8"), COMPRESS_LEVEL))
+                size = f.tell()
+            self.storage.put_file(self._object_key(key), Path(temp_name))
+        finally:
+            Path(temp_name).unlink(missing_ok=True)
+        return {
+            "key": key,
+            "chars": len(text),
+            "bytes": size,
+            "block_chars": self.block_chars,
+            "offsets": offsets
+        }
+
+    async def put(self, key: str, text: str) -> Dict:
+        """Store text under key (replacing any previous text) and return its pointer"""
+        return await asyncio.to_thread(self._write, key, text)
+
+    def _read_blocks(self, pointer: Dict, first: int, last: int) -> str:
+        offsets = pointer["offsets"]
+        end = offsets[last + 1] if last + 1 < len(offsets) else None
+        data = self.storage.read_range(self._object_key(pointer["key"]), offsets[first], end)
+        # Concatenated gzip members decompress as one stream
+        return gzip.decompress(data).decode("utf-8")
+
+    async def read(self, pointer: Dict, start: int = 0, end: Optional[int] = None) -> str:
+        """Characters [start, end) of the stored text, decompressing only the blocks they span"""
+        end = pointer["chars"] if end is None else min(end, pointer["chars"])
+        if start >= end:
+            return ""
+        block_chars = pointer["block_chars"]
+        first, last = start // block_chars, (end - 1) // block_chars
+        text = await asyncio.to_thread(self._read_blocks, pointer, first, last)
+        offset = first * block_chars
+        return text[start - offset:end - offset]
+
+    async def iter_text(self, pointer: Dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[str]:
+        """Stream characters [start, end) one block at a time"""
+        end = pointer["chars"] if end is None else min(end, pointer["chars"])
+        block_chars = pointer["block_chars"]
+        while start < end:
+            block_end = min(end, (start // block_chars + 1) * block_chars)
+            yield await self.read(pointer, start, block_end)
+            start = block_end
+
+    async def delete(self, pointer: Dict):
+        await asyncio.to_thread(self.storage.delete, self._object_key(pointer["key"]))
@@ -0,0 +1,341 @@
+"""
+Content-addressed storage for uploaded files
+Identical uploads share one stored file and one extracted text (db.upload_blobs),
+reference-counted by the per-user records in db.uploads. Files are kept in an
+object storage backend under ``uploads/``, keyed by content hash and a blob ID
+unique to each blob. The full extracted text lives
+compressed in the text store (documents hold a pointer) and as retrieval
+chunks (db.upload_chunks) for the chunk index.
+"""
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set, Union
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from retrieval import ChunkIndex, chunk_text
+from text_store import TextStore
+from upload_stream import StreamedUpload
+
+logger = logging.getLogger(__name__)
+
+# Marker in db.migrations of the one-off owner migration
+LEGACY_MIGRATION_ID = "legacy_upload_owners"
+
+
+class UploadStore:
+    def __init__(
+        self,
+        db,
+        storage,
+        extraction_pool,
+        chunk_index: Optional[ChunkIndex] = None,
+        text_store: Optional[TextStore] = None
+    ):
+        self.uploads = db.uploads
+        self.blobs = db.upload_blobs
+        self.chunks = db.upload_chunks
+        self.migrations = db.migrations
+        self.storage = storage
+        self.extraction_pool = extraction_pool
+        self.chunk_index = chunk_index if chunk_index is not None else ChunkIndex()
+        self.text_store = text_store if text_store is not None else TextStore(storage)
+
+    async def ensure_indexes(self):
+        await self.blobs.create_index("content_hash", unique=True)
+        await self.chunks.create_index([("content_hash", 1), ("seq", 1)], unique=True)
+        await self.uploads.create_index("id", unique=True)
+        await self.uploads.create_index([("owner_id", 1), ("created_at", -1)])
+
+    async def migrate_legacy_uploads(self) -> int:
+        """Mark records from before uploads had owners as shared legacy material
+
+        Only these are readable without a session; nobody can delete them
+        through the API. Records stored later without an owner stay unreachable.
+        Runs once per database: the first worker to insert the marker document
+        migrates, every later call (in any worker) returns 0 at once.
+        """
+        try:
+            await self.migrations.insert_one(
+                {"_id": LEGACY_MIGRATION_ID, "started_at": datetime.now(timezone.utc)}
+            )
+        except DuplicateKeyError:
+            return 0
+        try:
+            result = await self.uploads.update_many(
+                {"owner_id": {"$exists": False}},
+                {"$set": {"owner_id": None, "legacy": True}}
+            )
+        except BaseException:
+            # Let the next worker start try again
+            await asyncio.shield(self.migrations.delete_one({"_id": LEGACY_MIGRATION_ID}))
+            raise
+        await self.migrations.update_one(
+            {"_id": LEGACY_MIGRATION_ID},
+            {"$set": {"completed_at": datetime.now(timezone.utc), "modified": result.modified_count}}
+        )
+        return result.modified_count
+
+    async def _acquire_blob(self, content_hash: str) -> Optional[Dict]:
+        """Take a reference on an existing blob, if there is one"""
+        return await self.blobs.find_one_and_update(
+            {"content_hash": content_hash},
+            {"$inc": {"refcount": 1}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def ingest(self, upload: StreamedUpload, upload_type: str, owner_id: Optional[str] = None) -> Dict:
+        """Record an upload, sharing the stored file and extracted text with identical uploads"""
+        blob = await self._acquire_blob(upload.sha256)
+        duplicate = blob is not None
+
+        if blob is None:
+            # Keys are unique per blob, so reclaiming an old blob of the same
+            # content can never delete the objects this one points at
+            blob_id = uuid.uuid4().hex
+            storage_key = f"uploads/{upload.sha256}.{blob_id}.{upload.file_ext}"
+            try:
+                # Extract text from the local temp file, before it moves to storage
+                if upload.text is not None:
+                    text_content = upload.text
+                else:
+                    text_content = await self.extraction_pool.process_file(
+                        str(upload.temp_path), upload.file_ext, upload.sha256
+                    )
+                await asyncio.to_thread(self.storage.put_file, storage_key, upload.temp_path)
+            finally:
+                upload.temp_path.unlink(missing_ok=True)
+            text_pointer = await self.text_store.put(f"{upload.sha256}.{blob_id}", text_content)
+
+            # Upsert so two first-time uploads of the same file end up with one blob
+            blob = await self.blobs.find_one_and_update(
+                {"content_hash": upload.sha256},
+                {
+                    "$setOnInsert": {
+                        "content_hash": upload.sha256,
+                        "blob_id": blob_id,
+                        "storage_key": storage_key,
+                        "file_ext": upload.file_ext,
+                        "size": upload.size,
+                        "text": text_pointer,
+                        "word_count": len(text_content.split()),
+                        "pages_extracted": len(text_content.split('\n\n')),
+                        "created_at": datetime.now(timezone.utc).isoformat()
+                    },
+                    "$inc": {"refcount": 1}
+                },
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            if blob.get("blob_id") != blob_id:
+                # A concurrent first upload of the same file won; drop our copies
+                await asyncio.to_thread(self.storage.delete, storage_key)
+                await self.text_store.delete(text_pointer)
+            await self._store_chunks(upload.sha256, text_content)
+        else:
+            upload.temp_path.unlink(missing_ok=True)
+
+        doc = {
+            "id": str(uuid.uuid4()),
+            "owner_id": owner_id,
+            "type": upload_type,
+            "filename": upload.filename,
+            "content_hash": upload.sha256,
+            "word_count": blob["word_count"],
+            "pages_extracted": blob["pages_extracted"],
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await self.uploads.insert_one(doc)
+        doc.pop("_id", None)
+        doc["duplicate"] = duplicate
+        return doc
+
+    async def ingest_text(
+        self,
+        text: str,
+        upload_type: str,
+        owner_id: Optional[str] = None,
+        fields: Optional[Dict] = None
+    ) -> Dict:
+        """Record material that arrives as text (e.g. a transcript) rather than as a file"""
+        upload_id = str(uuid.uuid4())
+        doc = {
+            **(fields or {}),
+            "id": upload_id,
+            "owner_id": owner_id,
+            "type": upload_type,
+            "text": await self.text_store.put(upload_id, text),
+            "word_count": len(text.split()),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await self.uploads.insert_one(doc)
+        doc.pop("_id", None)
+        return doc
+
+    async def find(
+        self,
+        owner_id: Optional[str],
+        upload_ids: Optional[List[str]] = None,
+        limit: int = 100,
+        projection: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Newest uploads of one owner, optionally restricted to specific upload IDs
+
+        Without an owner, only migrated legacy records are found.
+        """
+        query = {"owner_id": owner_id} if owner_id is not None else {"owner_id": None, "legacy": True}
+        if upload_ids is not None:
+            query["id"] = {"$in": upload_ids}
+        return await self.uploads.find(
+            query,
+            projection or {"_id": 0, "id": 1, "content_hash": 1, "content": 1, "text": 1}
+        ).sort("created_at", -1).limit(limit).to_list(limit)
+
+    async def release(self, upload_id: str, owner_id: Optional[str]) -> bool:
+        """Delete an owner's upload record and reclaim its blob once no upload references it
+
+        Records without an owner are never deleted.
+        """
+        if owner_id is None:
+            return False
+        doc = await self.uploads.find_one_and_delete({"id": upload_id, "owner_id": owner_id})
+        if doc is None:
+            return False
+
+        content_hash = doc.get("content_hash")
+        if not content_hash:
+            # Text uploads and uploads recorded before blobs existed own their files outright
+            if doc.get("file_path"):
+                Path(doc["file_path"]).unlink(missing_ok=True)
+            if doc.get("text"):
+                await self.text_store.delete(doc["text"])
+            self.chunk_index.remove(f"upload:{upload_id}")
+            return True
+
+        blob = await self.blobs.find_one_and_update(
+            {"content_hash": content_hash},
+            {"$inc": {"refcount": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob and blob["refcount"] <= 0:
+            result = await self.blobs.delete_one({"content_hash": content_hash, "refcount": {"$lte": 0}})
+            if result.deleted_count:
+                if blob.get("storage_key"):
+                    await asyncio.to_thread(self.storage.delete, blob["storage_key"])
+                elif blob.get("file_path"):
+                    # Blobs stored before the storage backends kept a local path
+                    Path(blob["file_path"]).unlink(missing_ok=True)
+                if blob.get("text"):
+                    await self.text_store.delete(blob["text"])
+                # Chunks are the same for any blob of this content; keep them if the
+                # file was uploaded again meanwhile (a blob left without chunks is
+                # chunked again from its text when it is next indexed)
+                if not await self.blobs.count_documents({"content_hash": content_hash}, limit=1):
+                    await self.chunks.delete_many({"content_hash": content_hash})
+                # Other worker processes drop it from their index by LRU eviction
+                self.chunk_index.remove(f"blob:{content_hash}")
+                await self.extraction_pool.discard_pages(content_hash)
+                logger.info(f"Reclaimed upload blob {content_hash}")
+        return True
+
+    async def _resolve_texts(self, uploads: List[Dict]) -> List[Union[Dict, str]]:
+        """Text store pointer (or legacy inline text) for each upload record, in order"""
+        hashes = list({u["content_hash"] for u in uploads if u.get("content_hash")})
+        blobs = {}
+        if hashes:
+            async for blob in self.blobs.find(
+                {"content_hash": {"$in": hashes}},
+                {"_id": 0, "content_hash": 1, "text": 1, "content": 1}
+            ):
+                # Blobs stored before the text store only kept a 5000-character preview
+                blobs[blob["content_hash"]] = blob.get("text") or blob.get("content", "")
+        resolved = []
+        for u in uploads:
+            if "text" in u:
+                resolved.append(u["text"])
+            elif "content" in u:
+                resolved.append(u["content"])
+            else:
+                resolved.append(blobs.get(u.get("content_hash"), ""))
+        return resolved
+
+    async def load_texts(self, uploads: List[Dict]) -> List[str]:
+        """Resolve the full extracted text for upload records, in order"""
+        return [
+            text if isinstance(text, str) else await self.text_store.read(text)
+            for text in await self._resolve_texts(uploads)
+        ]
+
+    async def iter_text(self, upload: Dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[str]:
+        """Stream characters [start, end) of one upload's extracted text"""
+        text = (await self._resolve_texts([upload]))[0]
+        if isinstance(text, str):
+            if text[start:end]:
+                yield text[start:end]
+            return
+        async for block in self.text_store.iter_text(text, start, end):
+            yield block
+
+    async def _store_chunks(self, content_hash: str, text: str):
+        """Persist the full text of a new blob as retrieval chunks and index them"""
+        chunks = chunk_text(text)
+        if chunks:
+            try:
+                await self.chunks.insert_many(
+                    [{"content_hash": content_hash, "seq": n, "text": chunk} for n, chunk in enumerate(chunks)],
+                    ordered=False
+                )
+            except BulkWriteError:
+                # A concurrent first upload of the same file stored them already
+                pass
+        self.chunk_index.add(f"blob:{content_hash}", chunks)
+
+    def index_text(self, text: str) -> str:
+        """Index ad hoc material (e.g. a transcript) and return its retrieval source ID"""
+        source_id = f"text:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+        if not self.chunk_index.has_source(source_id):
+            self.chunk_index.add(source_id, chunk_text(text))
+        return source_id
+
+    async def index_sources(self, uploads: List[Dict]) -> Set[str]:
+        """Make sure the uploads' text is in the chunk index and return their source IDs"""
+        sources = set()
+        missing = set()
+        for upload in uploads:
+            if "text" in upload or "content" in upload:
+                # Text uploads and uploads recorded before blobs existed have no blob
+                source_id = f"upload:{upload['id']}"
+                if not self.chunk_index.has_source(source_id):
+                    text = (await self.load_texts([upload]))[0]
+                    self.chunk_index.add(source_id, chunk_text(text))
+            elif upload.get("content_hash"):
+                source_id = f"blob:{upload['content_hash']}"
+                if not self.chunk_index.has_source(source_id):
+                    missing.add(upload["content_hash"])
+            else:
+                continue
+            sources.add(source_id)
+
+        if missing:
+            # Indexed by another process, or before a restart
+            stored: Dict[str, List[str]] = {}
+            async for chunk in self.chunks.find(
+                {"content_hash": {"$in": list(missing)}},
+                {"_id": 0, "content_hash": 1, "text": 1}
+            ).sort([("content_hash", 1), ("seq", 1)]):
+                stored.setdefault(chunk["content_hash"], []).append(chunk["text"])
+            for content_hash, chunks in stored.items():
+                self.chunk_index.add(f"blob:{content_hash}", chunks)
+
+            # Blobs stored before chunking
+            unchunked = [{"content_hash": content_hash} for content_hash in missing - stored.keys()]
+            for blob, text in zip(unchunked, await self.load_texts(unchunked)):
+                self.chunk_index.add(f"blob:{blob['content_hash']}", chunk_text(text))
+        return sources
@@ -0,0 +1,203 @@
+"""
+Streaming multipart upload ingestion
+The request body is parsed as it arrives: the file part is hashed, written to
+disk and (for text files) decoded chunk by chunk, and uploads are rejected as
+soon as they cross the size limit
+"""
+import asyncio
+import codecs
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+import python_multipart
+from python_multipart.multipart import parse_options_header
+from fastapi import HTTPException, Request
+
+MAX_UPLOAD_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Formats whose text can be extracted while the upload is still streaming
+STREAMING_TEXT_FORMATS = {"txt"}
+
+
+@dataclass
+class StreamedUpload:
+    filename: str
+    file_ext: str
+    temp_path: Path
+    sha256: str
+    size: int
+    text: Optional[str] = None  # set for STREAMING_TEXT_FORMATS
+
+
+@dataclass
+class _FilePart:
+    filename: str
+    file_ext: str
+    temp_path: Path
+    handle: object
+    digest: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    size: int = 0
+    decoder: Optional[codecs.IncrementalDecoder] = None
+    text: List[str] = field(default_factory=list)
+
+
+def _format_list(exts: List[str]) -> str:
+    names = [ext.upper() for ext in exts]
+    return names[0] if len(names) == 1 else f"{', '.join(names[:-1])}, or {names[-1]}"
+
+
+class _UploadParser:
+    """Collects the single file field of a multipart body via parser callbacks"""
+
+    def __init__(self, dest_dir: Path, allowed_exts: List[str], max_bytes: int, field_name: str):
+        self.dest_dir = dest_dir
+        self.allowed_exts = allowed_exts
+        self.max_bytes = max_bytes
+        self.field_name = field_name
+        self.file: Optional[_FilePart] = None
+        self.pending: List[bytes] = []
+        self._headers: List[tuple] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._in_file = False
+
+    def on_part_begin(self):
+        self._headers = []
+        self._in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers.append((self._header_name.lower(), self._header_value))
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        disposition = dict(self._headers).get(b"content-disposition", b"")
+        _, options = parse_options_header(disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name != self.field_name or b"filename" not in options or self.file is not None:
+            return
+
+        filename = options[b"filename"].decode("utf-8", "replace")
+        file_ext = filename.split('.')[-1].lower()
+        if file_ext not in self.allowed_exts:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file format. Use {_format_list(self.allowed_exts)}."
+            )
+
+        temp_path = self.dest_dir / f".{uuid.uuid4()}.part"
+        self.file = _FilePart(
+            filename=filename,
+            file_ext=file_ext,
+            temp_path=temp_path,
+            handle=open(temp_path, "wb"),
+            decoder=codecs.getincrementaldecoder("utf-8")() if file_ext in STREAMING_TEXT_FORMATS else None
+        )
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_file:
+            return
+        chunk = data[start:end]
+        part = self.file
+        part.size += len(chunk)
+        if part.size > self.max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum upload size is {self.max_bytes // (1024 * 1024)} MB."
+            )
+        part.digest.update(chunk)
+        if part.decoder is not None:
+            part.text.append(part.decoder.decode(chunk))
+        self.pending.append(chunk)
+
+    def on_part_end(self):
+        self._in_file = False
+
+    def close(self, discard: bool):
+        if self.file is None:
+            return
+        self.file.handle.close()
+        if discard:
+            self.file.temp_path.unlink(missing_ok=True)
+
+
+async def receive_upload(
+    request: Request,
+    dest_dir: Path,
+    allowed_exts: List[str],
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    field_name: str = "file"
+) -> StreamedUpload:
+    """Stream the ``file`` field of a multipart request to a temp file in ``dest_dir``
+
+    Raises HTTPException 413 as soon as the file (or a declared Content-Length)
+    exceeds ``max_bytes`` and 400 for a missing file or unsupported extension.
+    The caller owns ``temp_path`` and must move or delete it.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum upload size is {max_bytes // (1024 * 1024)} MB."
+        )
+
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    sink = _UploadParser(dest_dir, allowed_exts, max_bytes, field_name)
+    parser = python_multipart.MultipartParser(boundary, {
+        "on_part_begin": sink.on_part_begin,
+        "on_header_field": sink.on_header_field,
+        "on_header_value": sink.on_header_value,
+        "on_header_end": sink.on_header_end,
+        "on_headers_finished": sink.on_headers_finished,
+        "on_part_data": sink.on_part_data,
+        "on_part_end": sink.on_part_end,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if sink.pending:
+                data = b"".join(sink.pending)
+                sink.pending.clear()
+                await asyncio.to_thread(sink.file.handle.write, data)
+        parser.finalize()
+    except BaseException:
+        sink.close(discard=True)
+        raise
+    sink.close(discard=False)
+
+    part = sink.file
+    if part is None:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    text = None
+    if part.decoder is not None:
+        part.text.append(part.decoder.decode(b"", final=True))
+        text = "".join(part.text)
+
+    return StreamedUpload(
+        filename=part.filename,
+        file_ext=part.file_ext,
+        temp_path=part.temp_path,
+        sha256=part.digest.hexdigest(),
+        size=part.size,
+        text=text
+    )
@@ -0,0 +1,198 @@
+"""
+YouTube transcript ingestion for single videos and playlists
+Transcripts are fetched on a bounded thread pool (the transcript API is
+blocking), cached by video ID in Mongo with a TTL, and playlist videos are
+fetched concurrently with failures reported per video
+"""
+import asyncio
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from file_processor import FileProcessor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCH_CONCURRENCY = int(os.environ.get('YOUTUBE_FETCH_CONCURRENCY', '8'))
+DEFAULT_FETCH_TIMEOUT = float(os.environ.get('YOUTUBE_FETCH_TIMEOUT', '30'))
+DEFAULT_TRANSCRIPT_TTL = float(os.environ.get('YOUTUBE_TRANSCRIPT_TTL_SECONDS', str(7 * 24 * 3600)))
+MAX_PLAYLIST_VIDEOS = int(os.environ.get('YOUTUBE_PLAYLIST_MAX_VIDEOS', '200'))
+YOUTUBE_API_KEY = os.environ.get('YOUTUBE_API_KEY')
+
+PLAYLIST_ITEMS_URL = "https://www.googleapis.com/youtube/v3/playlistItems"
+PLAYLIST_PAGE_URL = "https://www.youtube.com/playlist"
+PLAYLIST_VIDEO_PATTERN = re.compile(r'"playlistVideoRenderer":\{"videoId":"([a-zA-Z0-9_-]{11})"')
+
+PlaylistResolver = Callable[[str], Awaitable[List[str]]]
+
+
+async def list_playlist_videos(playlist_id: str, limit: int = MAX_PLAYLIST_VIDEOS) -> List[str]:
+    """Video IDs of a playlist, in playlist order
+
+    Uses the YouTube Data API when YOUTUBE_API_KEY is set, otherwise reads the
+    public playlist page (which lists the first 100 videos).
+    """
+    video_ids: List[str] = []
+    async with httpx.AsyncClient(timeout=DEFAULT_FETCH_TIMEOUT, follow_redirects=True) as client:
+        if YOUTUBE_API_KEY:
+            page_token = None
+            while len(video_ids) < limit:
+                params = {
+                    "part": "contentDetails",
+                    "playlistId": playlist_id,
+                    "maxResults": 50,
+                    "key": YOUTUBE_API_KEY
+                }
+                if page_token:
+                    params["pageToken"] = page_token
+                response = await client.get(PLAYLIST_ITEMS_URL, params=params)
+                response.raise_for_status()
+                data = response.json()
+                video_ids.extend(item["contentDetails"]["videoId"] for item in data.get("items", []))
+                page_token = data.get("nextPageToken")
+                if not page_token:
+                    break
+        else:
+            response = await client.get(
+                PLAYLIST_PAGE_URL,
+                params={"list": playlist_id, "hl": "en"},
+                headers={"Accept-Language": "en-US,en;q=0.9"}
+            )
+            response.raise_for_status()
+            video_ids = PLAYLIST_VIDEO_PATTERN.findall(response.text)
+
+    # A video can appear in a playlist more than once
+    return list(dict.fromkeys(video_ids))[:limit]
+
+
+class TranscriptFetcher:
+    """Fetches and caches video transcripts
+
+    ``transcript_api`` is any object with ``fetch(video_id)`` returning
+    snippets with a ``text`` attribute (or dicts with a ``text`` key), like
+    ``YouTubeTranscriptApi``; pass a stand-in to run without network access.
+    """
+
+    def __init__(
+        self,
+        cache_collection=None,
+        transcript_api=None,
+        playlist_resolver: PlaylistResolver = list_playlist_videos,
+        concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+        timeout: float = DEFAULT_FETCH_TIMEOUT,
+        ttl_seconds: float = DEFAULT_TRANSCRIPT_TTL
+    ):
+        self.cache = cache_collection
+        self.transcript_api = transcript_api
+        self.playlist_resolver = playlist_resolver
+        self.timeout = timeout
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="youtube")
+
+    async def ensure_indexes(self):
+        if self.cache is not None:
+            await self.cache.create_index("video_id", unique=True)
+            await self.cache.create_index("expires_at", expireAfterSeconds=0)
+
+    def _fetch_blocking(self, video_id: str) -> str:
+        api = self.transcript_api or YouTubeTranscriptApi()
+        snippets = api.fetch(video_id)
+        return " ".join(
+            snippet["text"] if isinstance(snippet, dict) else snippet.text
+            for snippet in snippets
+        )
+
+    async def _cached(self, video_id: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        try:
+            doc = await self.cache.find_one(
+                {"video_id": video_id, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+                {"_id": 0, "text": 1}
+            )
+        except Exception as e:
+            logger.warning(f"Transcript cache read failed: {str(e)}")
+            return None
+        return doc["text"] if doc else None
+
+    async def _store(self, video_id: str, text: str):
+        if self.cache is None:
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            await self.cache.update_one(
+                {"video_id": video_id},
+                {"$set": {
+                    "video_id": video_id,
+                    "text": text,
+                    "fetched_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Transcript cache write failed: {str(e)}")
+
+    async def get_video(self, video_id: str) -> str:
+        """Transcript text of one video, from the cache when fresh"""
+        text = await self._cached(video_id)
+        if text is not None:
+            return text
+        loop = asyncio.get_running_loop()
+        text = await asyncio.wait_for(
+            loop.run_in_executor(self._executor, self._fetch_blocking, video_id),
+            timeout=self.timeout
+        )
+        await self._store(video_id, text)
+        return text
+
+    async def get_playlist(self, playlist_id: str) -> Dict:
+        """Transcripts of every video in a playlist, fetched concurrently
+
+        Returns the joined text plus the IDs of videos that were fetched and
+        the errors of those that failed.
+        """
+        video_ids = await self.playlist_resolver(playlist_id)
+        if not video_ids:
+            raise ValueError(f"No videos found in playlist {playlist_id}")
+
+        results = await asyncio.gather(*(self.get_video(v) for v in video_ids), return_exceptions=True)
+        texts, videos, failed = [], [], []
+        for video_id, result in zip(video_ids, results):
+            if isinstance(result, BaseException):
+                error = str(result) or type(result).__name__
+                logger.warning(f"Skipping playlist video {video_id}: {error}")
+                failed.append({"video_id": video_id, "error": error})
+            else:
+                texts.append(result)
+                videos.append(video_id)
+        if not videos:
+            raise ValueError(f"No transcripts available for the {len(video_ids)} videos in playlist {playlist_id}")
+        return {"text": "\n\n".join(texts), "videos": videos, "failed": failed}
+
+    async def ingest(self, url: str) -> Dict:
+        """Transcript text for a video or playlist URL, with per-video results"""
+        try:
+            playlist_id = FileProcessor.extract_playlist_id(url)
+            if playlist_id:
+                return await self.get_playlist(playlist_id)
+
+            video_id = FileProcessor.extract_youtube_video_id(url)
+            if not video_id:
+                raise ValueError("Invalid YouTube URL")
+            return {"text": await self.get_video(video_id), "videos": [video_id], "failed": []}
+        except Exception as e:
+            raise Exception(f"Error getting YouTube transcript: {str(e)}")
+
+    async def get_transcript(self, url: str) -> str:
+        """Transcript text for a video or playlist URL"""
+        return (await self.ingest(url))["text"]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
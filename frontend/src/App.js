@@ -7,6 +7,17 @@ import YouTubeProcessor from "@/components/YouTubeProcessor";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Uploads are scoped to this browser's session on the backend
+const getSessionId = () => {
+  let sessionId = localStorage.getItem('sessionId');
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    localStorage.setItem('sessionId', sessionId);
+  }
+  return sessionId;
+};
+axios.defaults.headers.common['X-Session-Id'] = getSessionId();
+
 function App() {
   const [languages, setLanguages] = useState([]);
   const [selectedLanguage, setSelectedLanguage] = useState('english');
@@ -33,6 +44,19 @@ function App() {
     }
   };
 
+  const waitForBook = async (id) => {
+    // Book generation runs as a background job; poll until it finishes
+    while (true) {
+      const response = await axios.get(`${API}/generation/status/${id}`);
+      const status = response.data;
+      if (status.status === 'completed' || status.status === 'failed') {
+        return status;
+      }
+      setMessage(`🎬 Generating your Bollywood-style book... ${status.progress}% (${status.message})`);
+      await new Promise((resolve) => setTimeout(resolve, 3000));
+    }
+  };
+
   const handleGenerateBook = async () => {
     setGenerating(true);
     setMessage('🎬 Generating your Bollywood-style book... This may take a few minutes!');
@@ -46,8 +70,13 @@ function App() {
         youtube_url: youtubeUrl || null
       });
 
-      setBookId(response.data.book_id);
-      setMessage('✅ Book generated successfully! Download below.');
+      const status = await waitForBook(response.data.book_id);
+      if (status.status === 'completed') {
+        setBookId(response.data.book_id);
+        setMessage('✅ Book generated successfully! Download below.');
+      } else {
+        setMessage(`❌ Error: ${status.message}`);
+      }
     } catch (error) {
       setMessage(`❌ Error: ${error.response?.data?.detail || error.message}`);
     } finally {